@@ -1,231 +1,53 @@
 import streamlit as st
-from io import BytesIO
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import threading
 import time
 import os
-import re
-import google.generativeai as genai
 from dotenv import load_dotenv
 
-from googleapiclient.discovery import build
-
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-
-# ✅ Load environment variables from .env file
-load_dotenv()
-
-# ✅ Configure Gemini API with the loaded key
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-
-def generate_content(prompt, temperature=0.7):
-    start_time = time.time()
-
-    try:
-        # Step 1: Check if the prompt is programming-related using Gemini
-        classifier_model = genai.GenerativeModel('gemini-1.5-flash')
-        classifier_prompt = f"Is the following topic related to programming or software development? Answer only 'yes' or 'no'. Topic: {prompt}"
-        classifier_response = classifier_model.generate_content(classifier_prompt).text.strip().lower()
-
-        # Only allow exact match
-        if classifier_response != "yes":
-            return {
-                'error': f"🚫 This topic does not appear to be related to programming or software development. Gemini said: {classifier_response}"
-            }
-
-        # Step 2: If valid, generate the actual content
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content(prompt, generation_config={"temperature": temperature})
-
-        end_time = time.time()
-        return {
-            'output': response.text,
-            'generation_time': round(end_time - start_time, 2),
-            'token_usage': {
-                'prompt_tokens': "N/A",
-                'completion_tokens': "N/A",
-                'total_tokens': "N/A"
-            }
-        }
-
-    except Exception as e:
-        return {'error': str(e)}
-
-    
-#Function | Remove the asterisk
-def remove_all_asterisks(text):
-    # Remove **double asterisks**
-    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
-
-    # Remove *single asterisks*
-    text = re.sub(r'\*(.*?)\*', r'\1', text)
-
-    return text
-
-#Function | Convert to pdf
-def text_to_pdf(text, filename):
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    
-    # Set initial position and font
-    x, y = A4[0]/8, A4[1]-50
-    font_name = "Helvetica"
-    font_size = 12
-    c.setFont(font_name, font_size)
-    
-    # Line height calculation
-    line_height = font_size * 1.2  # Adjust multiplier as needed
-    # Split the text into lines
-    lines = text.splitlines()
-    
-    # Maximum characters per line (adjust as needed based on font and margins)
-    max_chars_per_line = 90
-    
-    for line in lines:
-        # If the line is too long, split it into multiple lines
-        while len(line) > max_chars_per_line:
-            # Find the last space within the limit
-            split_index = line[:max_chars_per_line].rfind(' ')
-            if split_index == -1:
-                # If no space is found, force split at the limit
-                split_index = max_chars_per_line
-            
-            part = line[:split_index]
-            line = line[split_index+1:]  # +1 to remove the space
-            
-            # Check if we need a new page
-            if y < 50:  # 50 is the bottom margin
-                c.showPage()
-                x, y = A4[0]/8, A4[1]-50
-                c.setFont(font_name, font_size)
-            
-            c.drawString(x, y, part)
-            y -= line_height
-        
-        # Writes the remaining part of the line
-        # Check if we need a new page
-        if y < 50:  # 50 is the bottom margin
-            c.showPage()
-            x, y = A4[0]/8, A4[1]-50
-            c.setFont(font_name, font_size)
-            
-        c.drawString(x, y, line)
-        y -= line_height
-    c.save()
-    buffer.seek(0)
-    return buffer
-
-# Function to search for YouTube videos
-def search_youtube_videos(query):
-    youtube = build('youtube', 'v3', developerKey=os.getenv("YOUTUBE_API_KEY"))
-   
-    request = youtube.search().list(
-        part='snippet',
-        q=query,
-        type='video',
-        maxResults=1  # Adjust as needed
-    )
-   
-    response = request.execute()
-   
-    if response['items']:
-        video = response['items'][0]
-        video_id = video['id']['videoId']
-        title = video['snippet']['title']
-        thumbnail = video['snippet']['thumbnails']['default']['url']
-        video_url = f'https://www.youtube.com/watch?v={video_id}'
-       
-        return {
-            'url': video_url,
-            'title': title,
-            'thumbnail': thumbnail
-        }
-    else:
-        return None
-    
-
-# Prompt templates specifically for Software Development Education
-def get_prompt_template(template_type, topic, learner_level, context):
-    base_prompt = ""
-    if template_type == "Lesson Plan":
-        base_prompt = f"Create a comprehensive 1-hour lesson plan on '{topic}' for {learner_level} youth learning software development. Include learning objectives, materials needed, and step-by-step teaching activities. Context: {context}"
-    elif template_type == "Study Guide":
-        base_prompt = f"Generate a study guide summarizing the key points of '{topic}' for {learner_level} students studying software development. Include bullet points and 5 quiz questions. Context: {context}"
-    elif template_type == "Tutorials":
-        return None
-    elif template_type == "Quiz Answer Sheet":
-        base_prompt = f"Provide an answer sheet for a 5-question quiz on the topic '{topic}' in software development. Context: {context}"
-    elif template_type == "Topic Summary":
-        base_prompt = f"Summarize the topic '{topic}' in simple terms for {learner_level} students beginning their software development journey. Context: {context}"
-    elif template_type == "Try it yourself":
-        base_prompt = f"Generate a hands-on practice exercise for learners on the topic '{topic}' in software development. The activity should include a description, starter code, and instructions to complete the task. Target Level: {learner_level}. Context: {context}"
-           
-    #instructions to add emojis that's relevant where needed
-    base_prompt += "\n\nMake sure to add relevant emojis next to important points or headings instead of using bold formatting. If there are lists, use either unordered lists (bullets) or ordered lists (numbers) — do not use asterisks (*) for lists. Ensure the text is presented cleanly and neatly."
-    return base_prompt
-
-# --- Streamlit UI ---
-st.set_page_config(page_title="CodeSnack", page_icon="favicon.ico", layout="centered")
-st.image("codesnack.png")
-
-# Global variable to store performance data
-if 'performance_data' not in st.session_state:
-    st.session_state.performance_data = {}
-    
-# Practice Arena toggle
-show_practice_arena = st.sidebar.checkbox("🧪 Practice Arena")
-
-# Sidebar Input
-with st.sidebar:
-    st.header("🧠 Start Learning")
-    template_type = st.selectbox("Select Content Type:", ["Lesson Plan", "Try it yourself", "Tutorials", "Quiz Answer Sheet", "Topic Summary"])
-    topic = st.text_input("Software Dev Topic:", "")
-    learner_level = st.selectbox("Learning Level:", ["Beginner", "Intermediate", "Advanced"])
-    context = st.text_area("Add Context (Optional):", "")
-   
-    generate_btn = st.button("🚀 Generate Content")
-    evaluate_btn = st.button("📊 Evaluate Performance")
-
-# Content Generation Section
-if generate_btn:
-    if template_type == "Tutorials":
-        # Handle tutorials via YouTube video
-        video_info = search_youtube_videos(topic)
-        st.subheader("🎥 Tutorial Video")
-        if video_info:
-            st.video(video_info["url"])
-            st.caption(video_info["title"])
-        else:
-            st.warning("No tutorial video found for this topic.")
-    else:
-        # Safe to generate the prompt now
-        prompt = get_prompt_template(template_type, topic, learner_level, context)
-
-        # Show the prompt being sent to Gemini
-        st.subheader("Prompt Sent to Gemini:")
-        st.code(prompt, language='markdown')
-
-        with st.spinner("Generating content..."):
-            import time
-            start_time = time.time()
-            result = generate_content(prompt)
-            end_time = time.time()
-            elapsed_time = round(end_time - start_time, 2)
-
-        # Store performance data
-        st.session_state.performance_data = {
-            "response_time": elapsed_time,
-            "content_length": len(result['output']) if 'output' in result else 0
-        }
-
-        # Handle the response
-        if 'error' in result:
-            st.error(f"❌ Error: {result['error']}")
-        else:
-            st.success("✅ Content generated successfully!")
-            st.subheader("Output:")
-
-            clean_output = remove_all_asterisks(result['output'])
-            st.markdown(f"""
+# Streamlit re-executes this script on every interaction, so one-time setup lives in cached resources.
+# The Gemini SDK is no longer imported here: resources.py imports and configures it on first use.
+
+#Function | Load environment variables from .env (once per process)
+@st.cache_resource(show_spinner=False)
+def load_environment():
+    load_dotenv()
+
+load_environment()
+
+# Local modules read their settings from the environment, so they are imported after load_environment()
+from assets import get_favicon, get_logo
+from content import (
+    COURSE_PACK_TYPES, MODEL_NAME, PRACTICE_ACTIVITIES, SECTIONED_MODE, SECTIONED_TEMPLATES, OutputSanitizer,
+    ask_gemini_classifier, build_course_pack, build_sectioned_document, cached_code_explanation, explain_code,
+    generate_content, get_prompt_template, get_warm_pack, precompute_copilot_answers, remove_all_asterisks, sanitize_output_html,
+    search_youtube_videos
+)
+from copilot_cache import COPILOT_PRECOMPUTE, get_copilot_cache
+from dispatcher import get_gemini_dispatcher
+from history import get_generation_history
+from jobs import CANCELLED, DONE, QUEUED, get_job_queue
+from pdf_cache import get_pdf_cache, pdf_artifact_key
+from resources import warm_up_in_background
+from response_cache import get_response_cache
+from router import get_model_router
+from semantic_cache import SEMANTIC_CACHE, get_semantic_cache
+from session_memory import get_session_memory
+from topic_classifier import lookup_topic_verdict, record_remote_verdict
+from token_usage import SESSION_TOKEN_BUDGET, get_token_ledger
+from tracing import get_tracer, metrics_text, span, start_metrics_server, trace_labels
+from youtube_cache import get_youtube_search_cache
+
+STREAM_OUTPUT = os.getenv("CODESNACK_STREAMING", "true").lower() in ("1", "true", "yes", "on")
+ADMIN_REFRESH_SECONDS = float(os.getenv("CODESNACK_ADMIN_REFRESH", 5))
+JOB_POLL_SECONDS = float(os.getenv("CODESNACK_JOB_POLL", 0.5))        # how often a running job's progress is redrawn
+
+# Prometheus scrape endpoint, only when CODESNACK_METRICS_PORT is set (started once per process)
+start_metrics_server()
+
+#Function | Styled box for the sidebar flow output (escaped comes from sanitize_output_html / OutputSanitizer)
+def output_box_html(escaped):
+    return f"""
     <div style='
         padding: 20px;
         background-color: #f8f9fa;
@@ -237,175 +59,743 @@ if generate_btn:
         font-size: 16px;
         line-height: 1.6;
     '>
-        {clean_output.replace('<', '&lt;').replace('>', '&gt;').replace('\n', '<br>')}
+        {escaped}
     </div>
-""", unsafe_allow_html=True)
-
-            pdf_buffer = text_to_pdf(clean_output, f"{template_type}_{topic}.pdf")
-            st.download_button("📥 Download Output", data=pdf_buffer, file_name=f"{template_type}_{topic}.pdf", mime="application/pdf")
+"""
 
+#Function | Styled box for the custom prompt output
+def custom_output_box_html(styled_output):
+    return f"""
+                <div style="
+                    background-color: #f0f2f6;
+                    padding: 16px;
+                    border-radius: 8px;
+                    font-size: 16px;
+                    line-height: 1.6;
+                    white-space: pre-wrap;
+                    width: 100%;
+                    overflow-x: auto;
+                ">
+                    {styled_output}
+                </div>
+                """
+
+#Function | Download button whose PDF is only rendered once the user asks for it
+# Runs as a fragment, so "Prepare PDF" reruns just this button and the output above stays on screen;
+# the PDF itself is built by a background job.
+@st.fragment
+def pdf_download_button(label, text, file_name, key):
+    pdf_cache = get_pdf_cache()
+    artifact_key = pdf_artifact_key(text)
+    pdf_cache.offer(artifact_key)
+    slot = f"pdf_{key}"
+    # Already rendered (by this or any other session): offer the download straight away
+    if st.session_state.get(f"pdf_ready_{key}") != artifact_key and artifact_key not in pdf_cache:
+        building = get_job_queue().get(st.session_state.jobs.get(slot))
+        if building is not None and building.meta['artifact_key'] != artifact_key:
+            # Still building the PDF of an output that has since been replaced
+            cancel_job(slot)
+        if slot not in st.session_state.jobs:
+            if not st.button("📄 Prepare PDF", key=f"prepare_{key}"):
+                return
+            start_job(slot, "pdf", pdf_job, text, artifact_key, key=key, artifact_key=artifact_key)
+        job_progress(slot)
+        return
+    cancel_job(slot)
+    st.download_button(label, data=pdf_cache.get(text, artifact_key), file_name=file_name,
+                       mime="application/pdf", key=key, on_click="ignore")
+
+#Function | Background job: render a PDF into the shared PDF cache
+def pdf_job(job, text, artifact_key):
+    get_pdf_cache().get(text, artifact_key)
+
+#Function | PDF being built
+def show_pdf_progress(job):
+    st.info(job_status_text(job, "Preparing PDF..."))
+
+#Function | PDF finished: the download button replaces the progress
+def finish_pdf(job):
+    if job.status == DONE:
+        st.session_state[f"pdf_ready_{job.meta['key']}"] = job.meta['artifact_key']
+    elif job.status != CANCELLED:
+        st.toast(f"❌ PDF could not be built: {job.error}")
+
+#Function | Live latency table for every traced stage (the fragment refreshes itself, the rest of the page is untouched)
+@st.fragment(run_every=ADMIN_REFRESH_SECONDS)
+def latency_admin_panel():
+    tracer = get_tracer()
+    rows = tracer.snapshot()
+    if not rows:
+        st.info("No spans recorded yet. Generate some content first.")
+        return
+    st.caption(f"Seconds per stage, percentiles over the last {tracer.window} calls. Refreshes every {ADMIN_REFRESH_SECONDS:g}s.")
+    st.dataframe(rows, hide_index=True, use_container_width=True)
+    dispatch = get_gemini_dispatcher().stats()
+    queue_col, flight_col, coalesced_col, retry_col = st.columns(4)
+    queue_col.metric("Gemini queue depth", dispatch['queue_depth'], help=f"Mean wait {dispatch['mean_queue_wait_seconds']}s, max {dispatch['max_queue_wait_seconds']}s")
+    flight_col.metric("In flight", dispatch['in_flight'])
+    coalesced_col.metric("Coalesced", dispatch['coalesced'], help=f"{dispatch['coalesced_waiting']} waiting right now")
+    retry_col.metric("Retries", dispatch['retries'], help=f"{dispatch['gave_up']} gave up")
+    routing = get_model_router(MODEL_NAME).stats()
+    st.caption(f"Backends: {routing['hedged']} of {routing['requests']} generations hedged, {routing['fallback_wins']} answered by "
+               f"a fallback backend, {routing['failovers']} failed over, {routing['failed']} failed everywhere.")
+    st.dataframe(routing['backends'], hide_index=True, use_container_width=True)
+    copilot = get_copilot_cache().stats()
+    st.caption(f"Copilot: {copilot['hits']} of {copilot['hits'] + copilot['misses']} requests answered from the code "
+               f"fingerprint cache, {copilot['precomputed']} starter snippets explained at startup, {copilot['entries']} explanations stored.")
+    memory = get_session_memory().stats()
+    sessions_col, referenced_col, stored_col, evicted_col = st.columns(4)
+    sessions_col.metric("Sessions", memory['session_count'], help=f"{memory['idle_sessions_dropped']} dropped after going idle")
+    referenced_col.metric("Outputs kept", f"{memory['referenced_bytes'] / 1024:.0f} KB", help=f"Budget {memory['budget'] / 1024:.0f} KB per session")
+    stored_col.metric("Stored", f"{memory['stored_bytes'] / 1024:.0f} KB", help=f"{memory['blob_count']} compressed texts, {memory['shared']} shared")
+    evicted_col.metric("Outputs evicted", memory['evictions'])
+    if memory['sessions']:
+        st.dataframe(memory['sessions'], hide_index=True, use_container_width=True)
+    jobs = get_job_queue().stats()
+    waiting_col, running_col, busy_col, cancelled_col = st.columns(4)
+    waiting_col.metric("Jobs waiting", jobs['queue_depth'], help=f"Mean wait {jobs['mean_wait_seconds']}s")
+    running_col.metric("Jobs running", f"{jobs['running']} / {jobs['workers']}")
+    busy_col.metric("Worker utilization", f"{jobs['utilization']:.0%}", help=f"{jobs['mean_utilization']:.0%} since start")
+    cancelled_col.metric("Jobs cancelled", jobs['cancelled'], help=f"{jobs['failed']} failed, {jobs['completed']} completed")
+    if jobs['lanes']:
+        st.dataframe(jobs['lanes'], hide_index=True, use_container_width=True)
+    with st.expander("Prometheus text format"):
+        st.code(metrics_text(), language="text")
 
+# --- Streamlit UI ---
+st.set_page_config(page_title="CodeSnack", page_icon=get_favicon(), layout="centered")
+st.image(get_logo())
 
-# Evaluate Performance
-if evaluate_btn:
-    if st.session_state.performance_data:
-        st.sidebar.markdown("### 📈 Performance Report")
-        st.sidebar.write(f"🕒 Response Time: `{st.session_state.performance_data['response_time']}s`")
-        st.sidebar.write(f"📝 Output Length: `{st.session_state.performance_data['content_length']} characters`")
+# Global variable to store performance data
+if 'performance_data' not in st.session_state:
+    st.session_state.performance_data = {}
+# Tokens this browser session has spent (cache hits are free)
+if 'token_totals' not in st.session_state:
+    st.session_state.token_totals = {'requests': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'classifier_tokens': 0}
+# Background jobs this session is waiting for: slot ("sidebar", "custom", "copilot", "pdf_<button key>") -> job id
+if 'jobs' not in st.session_state:
+    st.session_state.jobs = {}
+
+# Long work (Gemini calls, YouTube lookups, PDF builds) runs on the process-wide job queue rather than inside
+# the script, so a rerun while it runs does not abandon it. Each part of the page has at most one job; its
+# progress is polled by job_progress and the finished result is moved into session state.
+
+#Function | Stop waiting for a slot's job: cancel it if it is still running, forget it if it has finished
+def cancel_job(slot):
+    job_id = st.session_state.jobs.pop(slot, None)
+    if job_id:
+        get_job_queue().cancel(job_id)
+        get_job_queue().collect(job_id)
+
+#Function | Queue fn(job, *args) for one slot of the page, cancelling the job it replaces
+def start_job(slot, kind, fn, *args, **meta):
+    cancel_job(slot)
+    st.session_state.jobs[slot] = get_job_queue().submit(kind, fn, *args, **meta).id
+
+#Function | "Waiting"/"working" line for a job that has no partial output to show yet
+def job_status_text(job, running_text):
+    if job.status == QUEUED:
+        return f"⏳ Waiting for a free worker... ({job.elapsed()}s)"
+    return f"⏳ {running_text} ({job.elapsed()}s)"
+
+#Function | If a slot's job has ended, hand it to its finisher (which stores the result in session state); True if it had
+def collect_job(slot):
+    queue = get_job_queue()
+    job = queue.get(st.session_state.jobs[slot])
+    if job is not None and not job.finished:
+        return False
+    del st.session_state.jobs[slot]
+    if job is not None:
+        queue.collect(job.id)
+        JOB_FINISHERS[job.kind](job)
+    return True
+
+#Function | Progress of a slot's job, redrawn every JOB_POLL_SECONDS until it ends; then the page reruns to show the result
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_progress(slot):
+    if slot not in st.session_state.jobs:
+        return
+    if collect_job(slot):
+        st.rerun()
+    queue = get_job_queue()
+    job = queue.get(st.session_state.jobs[slot])
+    JOB_VIEWS[job.kind](job)
+    if job.cancel_requested:
+        st.caption("⏹️ Cancelling...")
     else:
-        st.sidebar.warning("⚠️ No performance data yet. Generate content first.")
+        st.button("⏹️ Cancel", key=f"cancel_{slot}", on_click=queue.cancel, args=(job.id,))
 
-# --- Custom Prompt Feature ---
-st.header("✍️ What would you like to ask?")
-# Initialize session state for the custom prompt if it doesn't exist
-if "custom_prompt" not in st.session_state:
-    st.session_state.custom_prompt = ""
+# Finished outputs ("sidebar_output", "custom_output", "copilot_output") stay in session state between reruns
+# with their long texts swapped for handles into the process-wide blob store (session_memory.py): students
+# shown the same cached lesson share one compressed copy, and each session keeps at most
+# CODESNACK_SESSION_MEMORY_BYTES of outputs, dropping the least recently shown first.
 
-# Text input for the prompt
-custom_prompt = st.text_area("", value=st.session_state.custom_prompt)
-st.session_state.custom_prompt = custom_prompt  # Sync session state with user input
-# New Prompt button clears everything
+#Function | Id of this browser session
+def session_id():
+    return get_script_run_ctx().session_id
 
-# Initialize session state variables
-if "user_prompt" not in st.session_state:
-    st.session_state.user_prompt = ""
-if "output" not in st.session_state:
-    st.session_state.output = ""
+#Function | Keep a finished output for the next reruns
+def keep_output(name, output):
+    st.session_state[name] = get_session_memory().store(session_id(), name, output)
 
-# Button layout
-col1, spacer, col2 = st.columns([1, 0.96, 1])
+#Function | An output kept with keep_output, or None; says so when it was dropped to save memory
+def load_output(name):
+    compact = st.session_state.get(name)
+    if not compact:
+        return None
+    output = get_session_memory().load(session_id(), name, compact)
+    if output is None:
+        del st.session_state[name]
+        st.info("🧹 This output was cleared to save server memory. Generate it again: it is served from the cache.")
+    return output
+
+#Function | Drop a kept output
+def forget_output(name):
+    st.session_state.pop(name, None)
+    get_session_memory().forget(session_id(), name)
+
+#Function | Background job: one Gemini answer, streamed into job.progress['html'] when stream is on
+# (a streamed answer stops as soon as it is cancelled; otherwise the cancel takes effect once Gemini replies)
+# history (template_type, topic, learner_level) saves a fresh answer to the generation history
+def generation_job(job, prompt, refresh, topic, stream, history=None):
+    sanitizer = OutputSanitizer()
+
+    def show_chunk(chunk):
+        job.report(html=sanitizer.feed(chunk))
+
+    result = generate_content(prompt, refresh=refresh, topic=topic, on_chunk=show_chunk if stream else None)
+    job.check_cancelled()
+    if 'output' in result:
+        with span("sanitize"):
+            # Answers from the warm-start content pack come with their cleaned text
+            result['clean'] = result.get('clean') or remove_all_asterisks(result['output'])
+            result['html'] = sanitize_output_html(result['output'])
+        if history is not None:
+            get_generation_history().record(prompt=prompt, result=result, **history)
+    return result
+
+#Function | What a finished generation job produced, in generate_content's result format
+def job_result(job):
+    if job.status == DONE:
+        return job.result
+    if job.status == CANCELLED:
+        return {'error': "Cancelled", 'cancelled': True}
+    return {'error': job.error}
+
+#Function | Add a finished request to the session's token totals (cache hits and coalesced answers cost nothing)
+def track_session_tokens(result):
+    if 'token_usage' not in result or result.get('cached') or result.get('coalesced'):
+        return
+    totals = st.session_state.token_totals
+    totals['requests'] += 1
+    totals['prompt_tokens'] += result['token_usage']['prompt_tokens']
+    totals['completion_tokens'] += result['token_usage']['completion_tokens']
+    totals['classifier_tokens'] += result.get('classifier_tokens', 0)
+
+#Function | Error message once the session has used up CODESNACK_SESSION_TOKEN_BUDGET, otherwise None
+def session_budget_error():
+    used = sum(value for name, value in st.session_state.token_totals.items() if name != 'requests')
+    if SESSION_TOKEN_BUDGET and used >= SESSION_TOKEN_BUDGET:
+        return f"🪙 This session has used its {SESSION_TOKEN_BUDGET} token budget ({used} tokens)."
+    return None
+    
+# Sections are fragments: a widget inside one only reruns that section, and generated outputs are kept in
+# session state so the reruns that do happen redraw them instead of asking Gemini again.
 
-# Buttons
-with col1:
-    generate_clicked = st.button("✨ Start Generating")
-with col2:
-    clear_clicked = st.button("🔄 Clear", key="clear_button")
+#Function | Performance report for the last sidebar request plus the process-wide caches (drawn in the sidebar)
+def performance_report():
+    cache_stats = get_response_cache().stats()
+    if st.session_state.performance_data:
+        st.markdown("### 📈 Performance Report")
+        st.write(f"🕒 Response Time: `{st.session_state.performance_data['response_time']}s`")
+        st.write(f"📝 Output Length: `{st.session_state.performance_data['content_length']} characters`")
+        classifier = st.session_state.performance_data.get('classifier')
+        if classifier:
+            st.write(f"🧭 Topic check: `{classifier['source']}` (confidence `{classifier['confidence']}`)")
+        speculation = st.session_state.performance_data.get('speculation')
+        if speculation and 'time_saved' in speculation:
+            st.write(f"🔀 Speculative run: `{speculation['wall_time']}s` instead of `{speculation['sequential_time']}s` (saved `{speculation['time_saved']}s`)")
+        parallel = st.session_state.performance_data.get('parallel')
+        if parallel:
+            st.write(f"🧩 Parallel sections: `{parallel['wall_time']}s` instead of `{parallel['sequential_time']}s` one after another (saved `{parallel['time_saved']}s`)")
+            for section in st.session_state.performance_data['sections']:
+                cached = ", cached" if section['cached'] else ""
+                st.write(f"- {section['heading']}: `{section['generation_time']}s` ({section['completion_tokens']} tokens{cached})")
+        streaming = st.session_state.performance_data.get('streaming')
+        if streaming:
+            st.write(f"⏱️ Time to First Token: `{streaming['time_to_first_token']}s`")
+            st.write(f"🏎️ Tokens/sec: `{streaming['tokens_per_sec']}` (total `{streaming['total_time']}s`)")
+        route = st.session_state.performance_data.get('route')
+        if route:
+            how = f" (hedged after `{route['hedged_after']}s`)" if route['hedged'] else " (after a failover)" if route['failover'] else ""
+            st.write(f"🛰️ Answered by: `{route['backend']}`{how}")
+        st.write(f"⚡ Served from cache: `{'yes' if st.session_state.performance_data.get('cached') else 'no'}`")
+        if st.session_state.performance_data.get('packed'):
+            st.write("📦 Prebuilt in the warm-start content pack")
+        semantic = st.session_state.performance_data.get('semantic')
+        if semantic:
+            st.write(f"🧲 Answer reused from the similar topic `{semantic['topic']}` (similarity `{semantic['similarity']}`)")
+        if st.session_state.performance_data.get('coalesced'):
+            st.write("🤝 Shared with an identical request from another session")
+        token_usage = st.session_state.performance_data.get('token_usage')
+        if token_usage:
+            estimated = " (estimated)" if token_usage.get('estimated') else ""
+            st.write(f"🔢 Tokens: `{token_usage['prompt_tokens']}` prompt + `{token_usage['completion_tokens']}` completion{estimated}, "
+                     f"`{st.session_state.performance_data['classifier_tokens']}` for the topic check")
+            preflight = st.session_state.performance_data.get('preflight_prompt_tokens')
+            if preflight:
+                truncated = " (prompt truncated to fit the budget)" if st.session_state.performance_data.get('prompt_truncated') else ""
+                st.write(f"🧮 Pre-flight count: `{preflight}` prompt tokens{truncated}")
+            if st.session_state.performance_data.get('tokens_per_sec'):
+                st.write(f"🚄 Generation speed: `{st.session_state.performance_data['tokens_per_sec']}` tokens/sec")
+    else:
+        st.warning("⚠️ No performance data yet. Generate content first.")
+    st.markdown("### 🗄️ Response Cache")
+    st.write(f"✅ Hits: `{cache_stats['memory_hits']}` memory / `{cache_stats['disk_hits']}` disk")
+    st.write(f"❌ Misses: `{cache_stats['misses']}` (hit rate `{cache_stats['hit_rate']:.0%}`)")
+    st.write(f"📦 Entries: `{cache_stats['memory_entries']}` memory / `{cache_stats['disk_entries']}` disk")
+    pack_stats = get_warm_pack().stats()
+    if pack_stats['status'] not in ("disabled", "missing"):
+        built = time.strftime('%Y-%m-%d', time.localtime(pack_stats['built_at'])) if pack_stats['built_at'] else "n/a"
+        st.write(f"📦 Content pack: `{pack_stats['status']}`, `{pack_stats['entries']}` entries built {built} "
+                 f"(`{pack_stats['hits']}` served)")
+    if SEMANTIC_CACHE:
+        semantic_stats = get_semantic_cache().stats()
+        st.write(f"🧲 Similar-topic hits: `{semantic_stats['hits']}` (hit rate `{semantic_stats['hit_rate']:.0%}`, "
+                 f"`{semantic_stats['mean_lookup_ms']}ms` per lookup over `{semantic_stats['entries']}` topics)")
+    session_tokens = st.session_state.token_totals
+    day_tokens = get_token_ledger().today()
+    st.markdown("### 🪙 Token Usage")
+    st.write(f"👤 This session: `{session_tokens['prompt_tokens'] + session_tokens['completion_tokens']}` generation + "
+             f"`{session_tokens['classifier_tokens']}` classifier tokens over `{session_tokens['requests']}` requests"
+             + (f" (budget `{SESSION_TOKEN_BUDGET}`)" if SESSION_TOKEN_BUDGET else ""))
+    st.write(f"📅 Today (all sessions): `{day_tokens['prompt_tokens'] + day_tokens['completion_tokens']}` generation + "
+             f"`{day_tokens['classifier_tokens']}` classifier tokens over `{day_tokens['requests']}` requests"
+             + (f" (budget `{day_tokens['daily_budget']}`)" if day_tokens['daily_budget'] else ""))
+    youtube_stats = get_youtube_search_cache().stats()
+    st.markdown("### 🎥 Tutorial Search")
+    st.write(f"✅ Cache hit rate: `{youtube_stats['hit_rate']:.0%}` ({youtube_stats['hits']} hits / {youtube_stats['misses']} misses)")
+    st.write(f"💰 Quota saved: `{youtube_stats['units_saved']}` units ({youtube_stats['coalesced']} searches shared "
+             f"with an identical one in flight), spent `{youtube_stats['units_spent']}`")
+    st.write(f"📊 Quota used today: `{youtube_stats['quota_used_today']}` / `{youtube_stats['quota_limit']}` units")
+    pdf_stats = get_pdf_cache().stats()
+    st.markdown("### 📄 PDF Artifacts")
+    st.write(f"🖨️ Rendered: `{pdf_stats['renders']}` in `{pdf_stats['render_seconds']}s`, never requested: `{pdf_stats['renders_deferred']}`")
+    st.write(f"✅ Reused: `{pdf_stats['hits']}` (saved `{pdf_stats['render_seconds_saved']}s` and `{pdf_stats['bytes_served_from_cache'] / 2**20:.1f} MB` of new buffers)")
+    st.write(f"📦 Cached: `{pdf_stats['entries']}` PDFs, `{pdf_stats['bytes'] / 2**20:.1f}` / `{pdf_stats['max_bytes'] / 2**20:.0f} MB`")
+
+#Function | Sidebar inputs; typing here reruns only this fragment
+# Generate and Course Pack queue the request and rerun the whole page, because their output goes in the main area
+@st.fragment
+def sidebar_controls():
+    st.header("🧠 Start Learning")
+    st.selectbox("Select Content Type:", ["Lesson Plan", "Try it yourself", "Tutorials", "Quiz Answer Sheet", "Topic Summary"], key="template_type")
+    st.text_input("Software Dev Topic:", "", key="topic")
+    st.selectbox("Learning Level:", ["Beginner", "Intermediate", "Advanced"], key="learner_level")
+    st.text_area("Add Context (Optional):", "", key="context")
+
+    st.checkbox("♻️ Skip cached results", help="Ask Gemini again and replace the cached answer.", key="refresh_cache")
+    st.checkbox("📡 Show output while it is written", value=STREAM_OUTPUT, key="stream_output")
+    st.checkbox("🧩 Write long content in parallel sections", value=SECTIONED_MODE, key="parallel_sections",
+                help="Lesson plans: objectives, materials, activities and assessment are written at the same time from a shared outline.")
+
+    if st.button("🚀 Generate Content"):
+        st.session_state.pending_request = "generate"
+        st.rerun()
+    if st.button("📚 Generate Course Pack", help="Lesson plan, exercise, quiz answers, summary and a tutorial video in one go."):
+        st.session_state.pending_request = "course_pack"
+        st.rerun()
+    if st.button("📊 Evaluate Performance"):
+        performance_report()
+
+#Function | Tutorial video with its alternates
+def show_tutorial(video_info):
+    st.subheader("🎥 Tutorial Video")
+    if video_info and "url" in video_info:
+        st.video(video_info["url"])
+        st.caption(video_info["title"])
+        if video_info["source"] == "stale":
+            st.info(f"ℹ️ Showing a saved result: {youtube_unavailable_text(video_info.get('reason'))}.")
+        if video_info["alternates"]:
+            with st.expander("🎞️ More tutorials on this topic"):
+                for alternate in video_info["alternates"]:
+                    st.markdown(f"- [{alternate['title']}]({alternate['url']})")
+    else:
+        st.warning(no_tutorial_text(video_info))
+
+#Function | Why YouTube was not searched (search cache reason: 'quota' or 'error')
+def youtube_unavailable_text(reason):
+    if reason == "error":
+        return "YouTube search is not answering right now"
+    return "the daily YouTube quota is nearly used up"
+
+#Function | Warning shown in place of a tutorial video: nothing found, or the search never ran and why
+def no_tutorial_text(video_info):
+    if video_info and video_info.get("reason"):
+        return f"No tutorial video: YouTube was not searched because {youtube_unavailable_text(video_info['reason'])}. Try again later."
+    return "No tutorial video found for this topic."
+
+#Function | Result of a sidebar generation
+def show_generated_text(output):
+    st.subheader("Prompt Sent to Gemini:")
+    st.code(output['prompt'], language='markdown')
+    if 'error' in output:
+        st.error(f"❌ Error: {output['error']}")
+        return
+    saved = output.get('saved')
+    if saved:
+        st.info(f"📜 Reopened from history: generated {time.strftime('%Y-%m-%d %H:%M', time.localtime(saved['created_at']))} "
+                f"in {saved['generation_time']}s ({(saved['prompt_tokens'] or 0) + (saved['completion_tokens'] or 0)} tokens)")
+    else:
+        st.success("✅ Content generated successfully!")
+    st.subheader("Output:")
+    st.markdown(output_box_html(output['html']), unsafe_allow_html=True)
+    pdf_download_button("📥 Download Output", output['clean'], output['file_name'], key="download_output")
 
+#Function | Queue the sidebar's content type for the topic (a YouTube lookup for Tutorials, otherwise Gemini)
+def start_sidebar_generation(template_type, topic, learner_level, context):
+    if template_type == "Tutorials":
+        # Handle tutorials via YouTube video
+        start_job("sidebar", "tutorial", tutorial_job, topic)
+        return
+
+    # Safe to generate the prompt now
+    prompt = get_prompt_template(template_type, topic, learner_level, context)
+    budget_error = session_budget_error()
+    if budget_error:
+        cancel_job("sidebar")
+        keep_output("sidebar_output", {'kind': 'text', 'prompt': prompt, 'error': budget_error})
+        return
+    history = {'template_type': template_type, 'topic': topic, 'learner_level': learner_level}
+    if template_type in SECTIONED_TEMPLATES and st.session_state.parallel_sections:
+        with trace_labels(template=template_type):
+            start_job("sidebar", "generate", sectioned_job, template_type, topic, learner_level, context,
+                      st.session_state.refresh_cache, st.session_state.stream_output, prompt, history,
+                      prompt=prompt, file_name=f"{template_type}_{topic}.pdf")
+        return
+    with trace_labels(template=template_type):
+        start_job("sidebar", "generate", generation_job, prompt, st.session_state.refresh_cache, topic,
+                  st.session_state.stream_output, history, prompt=prompt, file_name=f"{template_type}_{topic}.pdf")
+
+#Function | Background job: a long document written section by section at the same time (content.build_sectioned_document)
+# Sections show up in job.progress['html'] in template order, each one as soon as it starts arriving (streamed) or
+# is finished; prompt is the single-call prompt, under which the document is saved to the history
+def sectioned_job(job, template_type, topic, learner_level, context, refresh, stream, prompt, history):
+    headings = [heading for heading, _ in SECTIONED_TEMPLATES[template_type]]
+    sanitizers = {heading: OutputSanitizer() for heading in headings}
+    html = {}
+    lock = threading.Lock()
+
+    # Called from every section's thread at once
+    def show(heading, section_html):
+        with lock:
+            html[heading] = sanitize_output_html(f"{heading}\n") + section_html
+            job.report(html="<br><br>".join(html[heading] for heading in headings if heading in html))
+
+    def show_chunk(heading, chunk):
+        show(heading, sanitizers[heading].feed(chunk))
+
+    def show_section(heading, result):
+        job.check_cancelled()
+        if not stream and 'output' in result:
+            show(heading, sanitize_output_html(result['output'].strip()))
+
+    result = build_sectioned_document(template_type, topic, learner_level, context, refresh=refresh,
+                                      on_chunk=show_chunk if stream else None, on_section=show_section)
+    job.check_cancelled()
+    if 'output' in result:
+        with span("sanitize"):
+            result['clean'] = result.get('clean') or remove_all_asterisks(result['output'])
+            result['html'] = sanitize_output_html(result['output'])
+        get_generation_history().record(prompt=prompt, result=result, **history)
+    return result
+
+#Function | Background job: tutorial videos for the topic
+def tutorial_job(job, topic):
+    return search_youtube_videos(topic)
+
+#Function | Sidebar generation in progress: the prompt sent to Gemini, then the answer so far
+def show_generation_progress(job):
+    st.subheader("Prompt Sent to Gemini:")
+    st.code(job.meta['prompt'], language='markdown')
+    if 'html' in job.progress:
+        st.markdown(output_box_html(job.progress['html']), unsafe_allow_html=True)
+    else:
+        st.info(job_status_text(job, "Generating content..."))
+
+#Function | Tutorial lookup in progress
+def show_tutorial_progress(job):
+    st.subheader("🎥 Tutorial Video")
+    st.info(job_status_text(job, "Looking for tutorials..."))
+
+#Function | Sidebar generation finished: keep the output and its performance data for the page to show
+def finish_sidebar_generation(job):
+    result = job_result(job)
+    if result.get('cancelled'):
+        keep_output("sidebar_output", {'kind': 'cancelled'})
+        return
+    track_session_tokens(result)
+
+    # Store performance data
+    st.session_state.performance_data = {
+        "response_time": job.elapsed(),
+        "content_length": len(result['output']) if 'output' in result else 0,
+        "cached": result.get('cached', False),
+        "packed": result.get('packed', False),
+        "coalesced": result.get('coalesced', False),
+        "semantic": result.get('semantic'),
+        "route": result.get('route'),
+        "token_usage": result.get('token_usage'),
+        "tokens_per_sec": result.get('tokens_per_sec'),
+        "classifier_tokens": result.get('classifier_tokens', 0),
+        "preflight_prompt_tokens": result.get('preflight_prompt_tokens'),
+        "prompt_truncated": result.get('prompt_truncated', False),
+        "classifier": result.get('classifier'),
+        "speculation": result.get('speculation'),
+        "streaming": result.get('streaming'),
+        "parallel": result.get('parallel'),
+        "sections": result.get('sections')
+    }
+
+    output = {'kind': 'text', 'prompt': job.meta['prompt']}
+    if 'error' in result:
+        output['error'] = result['error']
+    else:
+        output.update(clean=result['clean'], html=result['html'], file_name=job.meta['file_name'])
+    keep_output("sidebar_output", output)
+
+#Function | Tutorial lookup finished
+def finish_tutorial(job):
+    if job.status == CANCELLED:
+        keep_output("sidebar_output", {'kind': 'cancelled'})
+    elif job.status == DONE:
+        keep_output("sidebar_output", {'kind': 'tutorial', 'video_info': job.result})
+    else:
+        keep_output("sidebar_output", {'kind': 'tutorial', 'video_info': None, 'error': job.error})
+
+#Function | One finished course pack item
+def show_pack_item(pack_type, item, topic):
+    if pack_type == "Tutorials":
+        st.markdown("#### 🎥 Tutorials")
+        if item and "url" in item:
+            st.video(item["url"])
+            st.caption(item["title"])
+        elif item and 'error' in item:
+            st.warning(f"No tutorial video: {item['error']}")
+        else:
+            st.warning(no_tutorial_text(item))
+    elif 'error' in item:
+        st.error(f"❌ {pack_type}: {item['error']}")
+    else:
+        with st.expander(f"✅ {pack_type}", expanded=False):
+            st.markdown(output_box_html(item['html']), unsafe_allow_html=True)
+            pdf_download_button(f"📥 Download {pack_type}", item['clean'], f"{pack_type}_{topic}.pdf",
+                                key=f"course_pack_{pack_type}")
+
+#Function | Summary line and combined download under a course pack
+def show_pack_summary(pack):
+    if pack['combined']:
+        st.success(pack['summary'])
+        pdf_download_button("📥 Download Course Pack", pack['combined'], f"Course_Pack_{pack['topic']}.pdf", key="course_pack_all")
+
+#Function | Queue every content type for the topic at once
+def start_course_pack(topic, learner_level, context):
+    budget_error = session_budget_error()
+    if budget_error:
+        cancel_job("sidebar")
+        keep_output("sidebar_output", {'kind': 'course_pack', 'topic': topic, 'learner_level': learner_level,
+                                           'items': {}, 'combined': "", 'error': f"❌ Error: {budget_error}"})
+        return
+    start_job("sidebar", "course_pack", course_pack_job, topic, learner_level, context, st.session_state.refresh_cache,
+              topic=topic, learner_level=learner_level)
+
+#Function | Background job: the whole course pack, publishing each item to job.progress['items'] as it finishes
+def course_pack_job(job, topic, learner_level, context, refresh):
+    # Decide the topic once up front so the parallel calls all reuse the cached verdict
+    classifier_usage = {}
+    try:
+        classification = lookup_topic_verdict(topic) or record_remote_verdict(topic, ask_gemini_classifier(topic, classifier_usage))
+    except Exception as e:
+        classification = {'verdict': 'error', 'answer': str(e)}
 
-# Display output
-if st.session_state.output:
-    st.write(st.session_state.output)
+    # results and classifier_tokens are the session's token usage, added up (and removed) when the job is collected
+    pack = {'kind': 'course_pack', 'topic': topic, 'learner_level': learner_level, 'items': {}, 'combined': "",
+            'results': [], 'classifier_tokens': classifier_usage.get('total_tokens', 0)}
+    if classification['verdict'] != "yes":
+        pack['error'] = "❌ Error: 🚫 This topic does not appear to be related to programming or software development."
+        return pack
 
-# Clear action
-if clear_clicked:
-    st.session_state.user_prompt = ""
-    st.session_state.output = ""
-    st.rerun()
+    call_times = []
+    start_time = time.time()
+    # Streaming the calls lets a cancel stop them mid-answer instead of waiting for every one to finish
+    for pack_type, result in build_course_pack(topic, learner_level, context, refresh=refresh,
+                                               on_chunk=lambda pack_type, chunk: job.check_cancelled()):
+        job.check_cancelled()
+        if pack_type == "Tutorials" or 'error' in result:
+            item = result
+        else:
+            pack['results'].append(result)
+            call_times.append(result['generation_time'])
+            get_generation_history().record(pack_type, topic, learner_level,
+                                            get_prompt_template(pack_type, topic, learner_level, context), result)
+            with span("sanitize", template=pack_type):
+                item = {'clean': remove_all_asterisks(result['output']), 'html': sanitize_output_html(result['output'])}
+        pack['items'][pack_type] = item
+        job.report(items=dict(pack['items']))
+    elapsed_time = round(time.time() - start_time, 2)
+
+    texts = {pack_type: item['clean'] for pack_type, item in pack['items'].items() if item and 'clean' in item}
+    if texts:
+        pack['summary'] = f"✅ Course pack ready in {elapsed_time}s (the calls add up to {round(sum(call_times), 2)}s, slowest {max(call_times, default=0)}s)"
+        pack['combined'] = "\n\n".join(f"{pack_type}\n{'=' * len(pack_type)}\n{texts[pack_type]}" for pack_type in COURSE_PACK_TYPES if pack_type in texts)
+    return pack
+
+#Function | Course pack in progress: one line per content type, ticked off as each call finishes
+def show_course_pack_progress(job):
+    st.subheader(f"📚 Course Pack: {job.meta['topic']} ({job.meta['learner_level']})")
+    items = job.progress.get('items', {})
+    for pack_type in COURSE_PACK_TYPES + ["Tutorials"]:
+        if pack_type not in items:
+            st.info(job_status_text(job, f"{pack_type}: generating..."))
+        elif items[pack_type] and 'error' in items[pack_type] and pack_type != "Tutorials":
+            st.error(f"❌ {pack_type}: {items[pack_type]['error']}")
+        else:
+            st.success(f"✅ {pack_type}: ready")
+
+#Function | Course pack finished: add its tokens to the session and keep the pack
+def finish_course_pack(job):
+    if job.status == CANCELLED:
+        keep_output("sidebar_output", {'kind': 'cancelled'})
+        return
+    if job.status != DONE:
+        keep_output("sidebar_output", {'kind': 'course_pack', 'topic': job.meta['topic'], 'learner_level': job.meta['learner_level'],
+                                           'items': {}, 'combined': "", 'error': f"❌ Error: {job.error}"})
+        return
+    pack = job.result
+    st.session_state.token_totals['classifier_tokens'] += pack.pop('classifier_tokens')
+    for result in pack.pop('results'):
+        track_session_tokens(result)
+    keep_output("sidebar_output", pack)
+
+#Function | Redraw the last sidebar output (tutorial, generated text or course pack) without regenerating it
+def show_sidebar_output(output):
+    if output['kind'] == 'cancelled':
+        st.info("⏹️ Generation cancelled.")
+    elif output['kind'] == 'tutorial' and 'error' in output:
+        st.error(f"❌ Error: {output['error']}")
+    elif output['kind'] == 'tutorial':
+        show_tutorial(output['video_info'])
+    elif output['kind'] == 'text':
+        show_generated_text(output)
+    else:
+        st.subheader(f"📚 Course Pack: {output['topic']} ({output['learner_level']})")
+        if 'error' in output:
+            st.error(output['error'])
+            return
+        for pack_type in COURSE_PACK_TYPES + ["Tutorials"]:
+            if pack_type in output['items']:
+                show_pack_item(pack_type, output['items'][pack_type], output['topic'])
+        show_pack_summary(output)
+
+#Function | Clear button: empty the prompt box and forget (or cancel) the answer
+def clear_custom_prompt():
+    st.session_state.custom_prompt = ""
+    forget_output("custom_output")
+    cancel_job("custom")
+
+#Function | Answer to a custom prompt
+def show_custom_output(output):
+    if output.get('cancelled'):
+        st.info("⏹️ Generation cancelled.")
+        return
+    if 'error' in output:
+        st.error(f"❌ Error: {output['error']}")
+        return
+    st.success("✅ Custom content generated successfully!")
+    st.markdown("### Custom Output:")
+    st.markdown(custom_output_box_html(output['html']), unsafe_allow_html=True)
+
+    # Show performance data
+    st.json(output['stats'])
+
+    # PDF is rendered on request (and shared with other sessions through the PDF cache)
+    pdf_download_button("📥 Download Custom Output", output['clean'], "custom_prompt_output.pdf", key="download_custom_output")
+
+#Function | "What would you like to ask?" box; typing or generating here reruns only this fragment
+@st.fragment
+def custom_prompt_section():
+    # Text input for the prompt
+    custom_prompt = st.text_area("", key="custom_prompt")
+
+    # Button layout
+    col1, spacer, col2 = st.columns([1, 0.96, 1])
+
+    # Buttons (Clear empties the prompt and the answer)
+    with col1:
+        generate_clicked = st.button("✨ Start Generating")
+    with col2:
+        st.button("🔄 Clear", key="clear_button", on_click=clear_custom_prompt)
 
-# Generate action (outside columns = full width output)
-if generate_clicked:
-    if custom_prompt.strip() == "":
+    # Generate action (outside columns = full width output)
+    if generate_clicked and custom_prompt.strip() == "":
         st.warning("Please enter a valid prompt before generating.")
-    else:
-        with st.spinner("Generating custom response..."):
-            custom_result = generate_content(custom_prompt)
+        return
 
-        if 'error' in custom_result:
-            st.error(f"❌ Error: {custom_result['error']}")
+    if generate_clicked:
+        budget_error = session_budget_error()
+        if budget_error:
+            cancel_job("custom")
+            keep_output("custom_output", {'error': budget_error})
         else:
-            st.success("✅ Custom content generated successfully!")
-            st.markdown("### Custom Output:")
-
-            # Sanitize and format output
-            clean_custom_output = remove_all_asterisks(custom_result['output'])
-            styled_output = clean_custom_output.replace('<', '&lt;').replace('>', '&gt;').replace('\n', '<br>')
-            st.markdown(
-                f"""
-                <div style="
-                    background-color: #f0f2f6;
-                    padding: 16px;
-                    border-radius: 8px;
-                    font-size: 16px;
-                    line-height: 1.6;
-                    white-space: pre-wrap;
-                    width: 100%;
-                    overflow-x: auto;
-                ">
-                    {styled_output}
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
-
-            # Show performance data
-            st.json({
-                "Generation Time (s)": custom_result['generation_time'],
-                "Prompt Tokens": custom_result['token_usage']['prompt_tokens'],
-                "Completion Tokens": custom_result['token_usage']['completion_tokens'],
-                "Total Tokens": custom_result['token_usage']['total_tokens']
-            })
-
-            # Allow download
-          
-
-         
-            
-            #replace asterisk with nothing
-            remove_asterisk_from_file = remove_all_asterisks(custom_result['output'])
-            
-            # Convert text to PDF
-            pdf_buffer_custom = text_to_pdf(remove_asterisk_from_file, "custom_prompt_output.pdf")
-            
-            st.download_button("📥 Download Custom Output", data=pdf_buffer_custom, file_name="custom_prompt_output.pdf", mime="application/pdf")
+            with trace_labels(template="Custom prompt"):
+                start_job("custom", "custom", generation_job, custom_prompt, st.session_state.refresh_cache, None,
+                          st.session_state.stream_output, {'template_type': "Custom prompt", 'topic': custom_prompt.strip()[:200], 'learner_level': None})
 
+    if "custom" in st.session_state.jobs:
+        job_progress("custom")
+    else:
+        output = load_output("custom_output")
+        if output:
+            show_custom_output(output)
+
+#Function | Custom prompt in progress: the answer so far
+def show_custom_progress(job):
+    if 'html' in job.progress:
+        st.markdown(custom_output_box_html(job.progress['html']), unsafe_allow_html=True)
+    else:
+        st.info(job_status_text(job, "Generating custom response..."))
+
+#Function | Custom prompt finished: keep the answer and its stats
+def finish_custom_prompt(job):
+    custom_result = job_result(job)
+    track_session_tokens(custom_result)
+    if 'error' in custom_result:
+        keep_output("custom_output", {'error': custom_result['error'], 'cancelled': custom_result.get('cancelled', False)})
+        return
+    # The PDF gets the text with the asterisks removed
+    keep_output("custom_output", {
+        'html': custom_result['html'],
+        'clean': custom_result['clean'],
+        'stats': {
+            "Generation Time (s)": custom_result['generation_time'],
+            "Prompt Tokens": custom_result['token_usage']['prompt_tokens'],
+            "Completion Tokens": custom_result['token_usage']['completion_tokens'],
+            "Total Tokens": custom_result['token_usage']['total_tokens'],
+            "Classifier Tokens": custom_result.get('classifier_tokens', 0),
+            "Served From Cache": custom_result.get('cached', False),
+            "Shared With Identical Request": custom_result.get('coalesced', False),
+            "Speculative Time Saved (s)": (custom_result.get('speculation') or {}).get('time_saved', "N/A"),
+            "Time to First Token (s)": (custom_result.get('streaming') or {}).get('time_to_first_token', "N/A"),
+            "Tokens/sec": custom_result.get('tokens_per_sec') or "N/A",
+            "Queue Wait (s)": round(job.started_at - job.submitted_at, 2) if job.started_at else "N/A"
+        }
+    })
 
-# --- PRACTICE ARENA ---
-if show_practice_arena:
-    st.markdown("---")
-    st.header("🧪 Practice Arena: HTML/CSS/JS Exercises")
-
-    activity = st.selectbox("Choose an Activity:", [
-        "Basic HTML Page",
-        "CSS Styling Example",
-        "Simple JS Alert",
-        "Interactive Button"
-    ])
-
-    if activity == "Basic HTML Page":
-        starter_code = """
-<!DOCTYPE html>
-<html>
-  <body>
-    <h1>Welcome!</h1>
-    <p>This is a basic HTML page.</p>
-  </body>
-</html>
-"""
-    elif activity == "CSS Styling Example":
-        starter_code = """
-<!DOCTYPE html>
-<html>
-  <head>
-    <style>
-      p { color: blue; font-size: 20px; }
-    </style>
-  </head>
-  <body>
-    <p>This paragraph is styled with CSS!</p>
-  </body>
-</html>
-"""
-    elif activity == "Simple JS Alert":
-        starter_code = """
-<!DOCTYPE html>
-<html>
-  <body>
-    <h2>Click the button for a message</h2>
-    <button onclick="alert('Hello from JavaScript!')">Click Me</button>
-  </body>
-</html>
-"""
-    elif activity == "Interactive Button":
-        starter_code = """
-<!DOCTYPE html>
-<html>
-  <body>
-    <button onclick="document.getElementById('demo').innerHTML='You clicked me!'">Click me</button>
-    <p id="demo"></p>
-  </body>
-</html>
-"""
-    user_code = st.text_area("✍️ Edit Your Code Below", starter_code, height=300)
+#Function | Practice Arena exercises; editing code or asking the Copilot reruns only this fragment
+@st.fragment
+def practice_arena():
+    activity = st.selectbox("Choose an Activity:", list(PRACTICE_ACTIVITIES))
+    user_code = st.text_area("✍️ Edit Your Code Below", PRACTICE_ACTIVITIES[activity], height=300)
 
     col1, col2 = st.columns(2)
     with col1:
@@ -419,13 +809,176 @@ if show_practice_arena:
 
     with col2:
         if st.button("🤖 Get Help from Gemini Copilot"):
-            with st.spinner("Sending code to Gemini..."):
-                gemini_prompt = f"Explain and improve the following HTML/CSS/JavaScript code for a beginner:\n\n{user_code}"
-                gemini_result = generate_content(gemini_prompt)
+            # Code explained before (the starter snippets, even re-spaced or commented) is answered here and then
+            cached = cached_code_explanation(user_code)
+            budget_error = None if cached else session_budget_error()
+            if cached or budget_error:
+                cancel_job("copilot")
+                keep_output("copilot_output", cached or {'error': budget_error})
+            else:
+                with trace_labels(template="Copilot"):
+                    start_job("copilot", "copilot", copilot_job, user_code, st.session_state.stream_output)
+
+        # The last answer stays on screen while the code is edited
+        gemini_result = None if "copilot" in st.session_state.jobs else load_output("copilot_output")
+        if "copilot" in st.session_state.jobs:
+            job_progress("copilot")
+        elif gemini_result and gemini_result.get('cancelled'):
+            st.info("⏹️ Copilot request cancelled.")
+        elif gemini_result and 'error' in gemini_result:
+            st.error(f"❌ Gemini Error: {gemini_result['error']}")
+        elif gemini_result:
+            st.success("✅ Gemini Response:")
+            if gemini_result.get('fingerprint_match'):
+                st.caption("⚡ This code was explained before (whitespace and comments aside): answered instantly, no tokens used.")
+            st.text_area("🔍 Explanation & Suggestions", gemini_result['output'], height=300)
+
+#Function | Background job: the Copilot's answer for the code
+def copilot_job(job, code, stream):
+    sanitizer = OutputSanitizer()
+
+    def show_chunk(chunk):
+        job.report(html=sanitizer.feed(chunk))
+
+    with span("copilot"):
+        result = explain_code(code, on_chunk=show_chunk if stream else None)
+    job.check_cancelled()
+    return result
+
+#Function | Copilot request in progress
+def show_copilot_progress(job):
+    characters = len(job.progress.get('html', ""))
+    st.info(job_status_text(job, f"Gemini is reading your code... ({characters} characters so far)" if characters else "Sending code to Gemini..."))
+
+#Function | Copilot answer arrived
+def finish_copilot(job):
+    gemini_result = job_result(job)
+    track_session_tokens(gemini_result)
+    keep_output("copilot_output", gemini_result)
+
+# Progress view and finisher for each kind of job (used by job_progress)
+JOB_VIEWS = {
+    "generate": show_generation_progress,
+    "tutorial": show_tutorial_progress,
+    "course_pack": show_course_pack_progress,
+    "custom": show_custom_progress,
+    "copilot": show_copilot_progress,
+    "pdf": show_pdf_progress,
+}
+JOB_FINISHERS = {
+    "generate": finish_sidebar_generation,
+    "tutorial": finish_tutorial,
+    "course_pack": finish_course_pack,
+    "custom": finish_custom_prompt,
+    "copilot": finish_copilot,
+    "pdf": finish_pdf,
+}
+
+HISTORY_TYPES = ["Lesson Plan", "Try it yourself", "Quiz Answer Sheet", "Topic Summary", "Custom prompt"]
+
+#Function | Show a saved generation in the main area in place of the sidebar output
+def open_history_entry(entry_id):
+    entry = get_generation_history().get(entry_id)
+    if entry is None:
+        st.toast("This result is no longer in the history.")
+        return
+    cancel_job("sidebar")
+    keep_output("sidebar_output", {
+        'kind': 'text',
+        'prompt': entry['prompt'],
+        'clean': remove_all_asterisks(entry['output']),
+        'html': sanitize_output_html(entry['output']),
+        'file_name': f"{entry['template_type']}_{entry['topic'][:60]}.pdf",
+        'saved': {name: entry[name] for name in ('created_at', 'generation_time', 'prompt_tokens', 'completion_tokens')}
+    })
+
+#Function | Past generations from every session, searchable; searching or filtering reruns only this fragment
+@st.fragment
+def history_panel():
+    with st.expander("📜 History"):
+        query = st.text_input("Search past results:", key="history_query", placeholder="e.g. list comprehension")
+        type_col, level_col = st.columns(2)
+        template_type = type_col.selectbox("Type", ["All"] + HISTORY_TYPES, key="history_type")
+        learner_level = level_col.selectbox("Level", ["All", "Beginner", "Intermediate", "Advanced"], key="history_level")
+        current_topic = st.checkbox("Only the current topic", key="history_current_topic")
+        with span("history_search"):
+            entries = get_generation_history().search(
+                query, topic=st.session_state.topic if current_topic else None,
+                template_type=None if template_type == "All" else template_type,
+                learner_level=None if learner_level == "All" else learner_level)
+        if not entries:
+            st.caption("No saved results match." if query or current_topic else "Generated content will be saved here.")
+        for entry in entries:
+            label = " · ".join(part for part in (entry['template_type'], entry['topic'][:40], entry['learner_level']) if part)
+            saved_at = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['created_at']))
+            if st.button(label, key=f"history_{entry['id']}", help=f"Generated {saved_at}", use_container_width=True):
+                open_history_entry(entry['id'])
+                # The result goes in the main area, outside this fragment
+                st.rerun()
+            if entry.get('snippet'):
+                st.caption(entry['snippet'])
+
+# Keeps this session's outputs alive (sessions idle for CODESNACK_SESSION_IDLE are dropped along the way)
+get_session_memory().touch(session_id())
+
+# Jobs that finished since the last run hand over their results before anything is drawn, so this run shows
+# them without another rerun (which would drop a click made in this run)
+for slot in list(st.session_state.jobs):
+    collect_job(slot)
+
+# Practice Arena toggle (reruns the whole page: it adds or removes a section)
+show_practice_arena = st.sidebar.checkbox("🧪 Practice Arena")
+
+# Sidebar Input
+with st.sidebar:
+    sidebar_controls()
+    history_panel()
+    show_latency_admin = st.checkbox("🛠️ Stage latency (admin)", help="Live p50/p95/p99 per stage across all sessions.")
+
+# Content Generation Section (a request queued by the sidebar starts its job here; the job's progress or the
+# last output is shown)
+pending_request = st.session_state.pop("pending_request", None)
+if pending_request == "generate":
+    start_sidebar_generation(st.session_state.template_type, st.session_state.topic,
+                             st.session_state.learner_level, st.session_state.context)
+elif pending_request == "course_pack":
+    start_course_pack(st.session_state.topic, st.session_state.learner_level, st.session_state.context)
+if "sidebar" in st.session_state.jobs:
+    job_progress("sidebar")
+else:
+    sidebar_output = load_output("sidebar_output")
+    if sidebar_output:
+        show_sidebar_output(sidebar_output)
+
+# Stage latency admin panel
+if show_latency_admin:
+    st.header("🛠️ Stage Latency")
+    latency_admin_panel()
+
+# --- Custom Prompt Feature ---
+st.header("✍️ What would you like to ask?")
+custom_prompt_section()
+
+# --- PRACTICE ARENA ---
+if show_practice_arena:
+    st.markdown("---")
+    st.header("🧪 Practice Arena: HTML/CSS/JS Exercises")
+    practice_arena()
+
+# The page is on screen by now; build the Gemini client in the background so the first request does not
+# pay for importing the SDK (runs once per process)
+@st.cache_resource(show_spinner=False)
+def start_warm_up():
+    warm_up_in_background(MODEL_NAME)
+    # Maps the warm-start content pack (reads its header only, whatever its size)
+    get_warm_pack()
+
+start_warm_up()
 
-                if 'error' in gemini_result:
-                    st.error(f"❌ Gemini Error: {gemini_result['error']}")
-                else:
-                    st.success("✅ Gemini Response:")
-                    st.text_area("🔍 Explanation & Suggestions", gemini_result['output'], height=300)
+# Explain the Practice Arena starter snippets that are not in the Copilot cache yet (runs once per process)
+@st.cache_resource(show_spinner=False)
+def start_copilot_precompute():
+    if COPILOT_PRECOMPUTE:
+        threading.Thread(target=precompute_copilot_answers, name="copilot-precompute", daemon=True).start()
 
+start_copilot_precompute()
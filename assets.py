@@ -0,0 +1,49 @@
+import io
+import os
+import threading
+
+# Static images shown on every page. Given a file path, Streamlit reads the file again on every rerun and,
+# when the image is wider than the page, resizes and re-encodes it each time (about 0.7s for the logo),
+# so the bytes are prepared once per process and handed over ready to use.
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+LOGO_PATH = os.path.join(ASSET_DIR, "codesnack.png")
+FAVICON_PATH = os.path.join(ASSET_DIR, "favicon.ico")
+
+MAX_IMAGE_WIDTH = 1460     # Streamlit's widest image (2 x the 730px content width); wider images get resized
+FAVICON_SIZE = 64          # the .ico holds sizes up to 256px; browsers show 16-64px
+
+_lock = threading.Lock()
+_assets = {}
+
+
+#Function | PNG bytes of an image, shrunk to max_width (aspect ratio kept) when it is wider
+def _png_bytes(path, max_width=None, size=None):
+    from PIL import Image
+
+    with Image.open(path) as image:
+        if size is not None:
+            image = image.resize((size, size), resample=Image.LANCZOS)
+        elif max_width is not None and image.width > max_width:
+            height = round(image.height * max_width / image.width)
+            image = image.resize((max_width, height), resample=Image.BILINEAR)
+        buffer = io.BytesIO()
+        # A light compression level: a little larger than the default, but several times faster to encode
+        image.save(buffer, format="PNG", compress_level=3)
+    return buffer.getvalue()
+
+
+def _cached(name, build):
+    with _lock:
+        if name not in _assets:
+            _assets[name] = build()
+        return _assets[name]
+
+
+#Function | Header logo, already at a width Streamlit will not resize
+def get_logo():
+    return _cached("logo", lambda: _png_bytes(LOGO_PATH, max_width=MAX_IMAGE_WIDTH))
+
+
+#Function | Page icon as a small PNG (decoding the multi-size .ico on every rerun is what it replaces)
+def get_favicon():
+    return _cached("favicon", lambda: _png_bytes(FAVICON_PATH, size=FAVICON_SIZE))
@@ -0,0 +1,218 @@
+"""Headless batch generation: pre-build lesson material for a whole curriculum.
+
+Usage:
+    python batch_generate.py curriculum.jsonl --out build/
+    python batch_generate.py curriculum.csv --out build/ --workers 4 --rate 2 --pdf-workers 4
+    python batch_generate.py curriculum.jsonl --out build/ --stub      # offline, no API keys needed
+    python batch_generate.py curriculum.jsonl --out build/ --sections  # lesson plans and study guides in parallel sections
+
+Each row needs template_type and topic; learner_level (default Beginner) and context are optional.
+Finished rows are appended to <out>/checkpoint.jsonl, so re-running the same command resumes.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Local modules read their settings from the environment, so they are imported after load_dotenv()
+from content import SECTIONED_TEMPLATES, build_sectioned_document, generate_content, get_prompt_template, remove_all_asterisks, text_to_pdf
+from rate_limit import TokenBucket
+
+
+#Function | Read rows from a JSONL or CSV file
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith('.csv'):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            yield {
+                'template_type': row['template_type'].strip(),
+                'topic': row['topic'].strip(),
+                'learner_level': (row.get('learner_level') or 'Beginner').strip(),
+                'context': (row.get('context') or '').strip()
+            }
+
+
+#Function | Stable id for a row, used for checkpoints and file names
+def row_id(row):
+    raw = json.dumps([row['template_type'], row['topic'], row['learner_level'], row['context']])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def safe_filename(text):
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', text).strip('_')[:60]
+
+
+#Function | Ids already finished in an earlier run
+def load_checkpoint(path):
+    done = set()
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    if entry.get('status') in ('ok', 'skipped'):
+                        done.add(entry['id'])
+    return done
+
+
+#Function | Process-pool worker: render the PDF and return its bytes
+def render_pdf(text, filename):
+    start = time.perf_counter()
+    data = text_to_pdf(text, filename).getvalue()
+    return data, time.perf_counter() - start
+
+
+class StageStats:
+    """Items, errors and busy time per pipeline stage (thread-safe)."""
+
+    def __init__(self, *stages):
+        self._lock = threading.Lock()
+        self.stages = {name: {'items': 0, 'busy': 0.0, 'errors': 0} for name in stages}
+
+    def record(self, stage, seconds, error=False):
+        with self._lock:
+            entry = self.stages[stage]
+            entry['items'] += 1
+            entry['busy'] += seconds
+            entry['errors'] += int(error)
+
+    def report(self, wall_time):
+        lines = [f"{'stage':<10}{'items':>7}{'errors':>8}{'items/s':>10}{'avg ms':>10}"]
+        for name, entry in self.stages.items():
+            throughput = entry['items'] / wall_time if wall_time else 0.0
+            average = entry['busy'] / entry['items'] * 1000 if entry['items'] else 0.0
+            lines.append(f"{name:<10}{entry['items']:>7}{entry['errors']:>8}{throughput:>10.2f}{average:>10.1f}")
+        return "\n".join(lines)
+
+
+def run_batch(rows, out_dir, workers=4, pdf_workers=2, rate=2.0, temperature=0.7, sections=False):
+    os.makedirs(out_dir, exist_ok=True)
+    checkpoint_path = os.path.join(out_dir, 'checkpoint.jsonl')
+    done = load_checkpoint(checkpoint_path)
+    limiter = TokenBucket(rate, capacity=max(1, workers))
+    stats = StageStats('generate', 'clean', 'pdf')
+    skipped = 0
+
+    def generate(row):
+        prompt = get_prompt_template(row['template_type'], row['topic'], row['learner_level'], row['context'])
+        if not prompt:
+            # Tutorials (and unknown types) have no text template, so there is nothing to generate
+            return row, {'skipped': f"{row['template_type']} has no text template"}
+        start = time.perf_counter()
+        try:
+            limiter.acquire()
+            start = time.perf_counter()
+            if sections and row['template_type'] in SECTIONED_TEMPLATES:
+                result = build_sectioned_document(row['template_type'], row['topic'], row['learner_level'], row['context'],
+                                                  temperature=temperature)
+            else:
+                result = generate_content(prompt, temperature=temperature, topic=row['topic'])
+        except Exception as e:
+            # Checkpointed as an error like any failed answer, so one bad row does not abort the rest of the batch
+            result = {'error': f"{type(e).__name__}: {e}"}
+        stats.record('generate', time.perf_counter() - start, error='error' in result)
+        return row, result
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-generate") as generate_pool, \
+            ProcessPoolExecutor(max_workers=pdf_workers) as pdf_pool, \
+            open(checkpoint_path, 'a', encoding='utf-8') as checkpoint:
+
+        generating = set()
+        rendering = {}
+
+        def write_checkpoint(entry):
+            checkpoint.write(json.dumps(entry) + "\n")
+            checkpoint.flush()
+
+        def handle(future):
+            if future in generating:
+                generating.discard(future)
+                row, result = future.result()
+                rid = row_id(row)
+                if 'skipped' in result:
+                    write_checkpoint({'id': rid, 'status': 'skipped', 'reason': result['skipped'], **row})
+                    return
+                if 'error' in result:
+                    write_checkpoint({'id': rid, 'status': 'error', 'error': result['error'], **row})
+                    return
+                start = time.perf_counter()
+                clean = remove_all_asterisks(result['output'])
+                stats.record('clean', time.perf_counter() - start)
+
+                name = f"{safe_filename(row['template_type'])}_{safe_filename(row['topic'])}_{safe_filename(row['learner_level'])}_{rid}"
+                with open(os.path.join(out_dir, name + '.txt'), 'w', encoding='utf-8') as f:
+                    f.write(clean)
+                rendering[pdf_pool.submit(render_pdf, clean, name + '.pdf')] = (rid, row, name, result)
+            else:
+                rid, row, name, result = rendering.pop(future)
+                try:
+                    data, seconds = future.result()
+                except Exception as e:
+                    stats.record('pdf', 0.0, error=True)
+                    write_checkpoint({'id': rid, 'status': 'error', 'error': f"PDF: {e}", **row})
+                    return
+                stats.record('pdf', seconds)
+                with open(os.path.join(out_dir, name + '.pdf'), 'wb') as f:
+                    f.write(data)
+                write_checkpoint({'id': rid, 'status': 'ok', 'file': name + '.pdf',
+                                  'generation_time': result['generation_time'], **row})
+
+        def drain(limit):
+            # Wait until no more than `limit` items are in flight across both stages
+            while len(generating) + len(rendering) > limit:
+                finished, _ = wait(generating | set(rendering), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    handle(future)
+
+        for row in rows:
+            if row_id(row) in done:
+                skipped += 1
+                continue
+            drain(workers * 2 + pdf_workers)
+            generating.add(generate_pool.submit(generate, row))
+        drain(0)
+
+    wall_time = time.perf_counter() - start_time
+    return stats, wall_time, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-generate CodeSnack material from a JSONL/CSV file.")
+    parser.add_argument('input', help="JSONL or CSV with template_type, topic, learner_level, context")
+    parser.add_argument('--out', default='build', help="output directory (default: build)")
+    parser.add_argument('--workers', type=int, default=4, help="concurrent API calls (default: 4)")
+    parser.add_argument('--rate', type=float, default=2.0, help="max API calls started per second (default: 2)")
+    parser.add_argument('--pdf-workers', type=int, default=os.cpu_count() or 2, help="PDF rendering processes")
+    parser.add_argument('--temperature', type=float, default=0.7)
+    parser.add_argument('--sections', action='store_true',
+                        help="write lesson plans and study guides as parallel sections (see content.build_sectioned_document)")
+    parser.add_argument('--stub', action='store_true', help="use the offline stub model instead of Gemini")
+    args = parser.parse_args(argv)
+
+    if args.stub:
+        os.environ['CODESNACK_BACKEND'] = 'stub'
+
+    stats, wall_time, skipped = run_batch(read_rows(args.input), args.out, workers=args.workers,
+                                          pdf_workers=args.pdf_workers, rate=args.rate, temperature=args.temperature,
+                                          sections=args.sections)
+    print(f"Finished in {wall_time:.2f}s ({skipped} rows already done, skipped)")
+    print(stats.report(wall_time))
+    return 1 if any(entry['errors'] for entry in stats.stages.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
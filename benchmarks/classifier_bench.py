@@ -0,0 +1,58 @@
+"""How many Gemini classifier round trips the local topic classifier removes.
+
+Run from the repository root:  python -m benchmarks.classifier_bench
+"""
+import time
+
+from topic_classifier import classify_locally, get_scorer
+
+# Sample of topics typed into the sidebar, with the answer Gemini is expected to give
+SAMPLE_TOPICS = [
+    ("Python loops", "yes"), ("For-loops in Python", "yes"), ("HTML forms", "yes"),
+    ("CSS flexbox layouts", "yes"), ("JavaScript promises", "yes"), ("Recursion", "yes"),
+    ("Linked lists", "yes"), ("Binary search", "yes"), ("Git branching", "yes"),
+    ("REST APIs with Flask", "yes"), ("SQL joins", "yes"), ("Object-oriented programming", "yes"),
+    ("Variables and data types", "yes"), ("Writing clean functions", "yes"), ("Debugging", "yes"),
+    ("Docker for beginners", "yes"), ("React state", "yes"), ("Web development careers", "yes"),
+    ("Exception handling", "yes"), ("Machine learning basics", "yes"), ("Responsive design", "yes"),
+    ("Unit testing", "yes"), ("Arrays in Java", "yes"), ("Command line basics", "yes"),
+    ("Classes and objects", "yes"), ("Regular expressions", "yes"), ("Event listeners", "yes"),
+    ("Rust ownership", "yes"), ("Memory management", "yes"), ("Cybersecurity", "yes"),
+    ("Photosynthesis", "no"), ("The French Revolution", "no"), ("World War One", "no"),
+    ("Netball rules", "no"), ("Baking bread", "no"), ("Shakespeare's sonnets", "no"),
+    ("Volcanoes", "no"), ("Fractions", "no"), ("Music theory", "no"), ("Climate change", "no"),
+    ("Recipe for chocolate cake", "no"), ("Ancient Egypt", "no"), ("Human digestive system", "no"),
+    ("Personal budgeting", "no"), ("Poetry analysis", "no"),
+]
+
+
+def main():
+    start = time.perf_counter()
+    get_scorer()
+    training_ms = (time.perf_counter() - start) * 1000
+
+    decided = correct = 0
+    latencies = []
+    for topic, expected in SAMPLE_TOPICS:
+        start = time.perf_counter()
+        result = classify_locally(topic)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if result['verdict'] is None:
+            print(f"  ? {topic:<32} -> Gemini (confidence {result['confidence']})")
+            continue
+        decided += 1
+        correct += result['verdict'] == expected
+        marker = "ok" if result['verdict'] == expected else "WRONG"
+        print(f"  {marker:>5} {topic:<32} -> {result['verdict']} via {result['source']} (confidence {result['confidence']})")
+
+    total = len(SAMPLE_TOPICS)
+    latencies.sort()
+    print()
+    print(f"Model training at startup: {training_ms:.1f} ms")
+    print(f"Topics: {total}, decided locally: {decided} ({decided / total:.0%}), agreement with Gemini: {correct}/{decided}")
+    print(f"Remote classifier calls: {total} before -> {total - decided} after ({decided} removed)")
+    print(f"Local latency: p50 {latencies[total // 2]:.2f} ms, max {latencies[-1]:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Open time, memory and lookup latency of the warm-start content pack (content_pack.py) as it grows.
+
+Run from the repository root:  python -m benchmarks.content_pack_bench [--sizes 1000,10000,100000]
+
+Writes synthetic packs: every answer is a --text-chars lesson made of common words (compresses like a real
+one) with a --pdf-kb blob standing in for its PDF. At every size it times opening the pack, the memory the
+process gains by opening it (private memory and Python heap), and answer lookups that hit and miss, then
+the memory gained after --lookups hits spread over the whole pack. Memory is split into private memory and
+the pages of the pack file the OS has mapped in (shared with the page cache, dropped under memory pressure).
+"""
+import argparse
+import hashlib
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from content_pack import ContentPack, ContentPackWriter
+
+TEMPLATES_VERSION = hashlib.sha256(b"benchmark").hexdigest()
+WORDS = ("loop variable function list index python value print range data example step learner code string "
+         "number class object method return condition while for if else key dictionary error test input").split()
+
+
+# (private, file-backed) resident memory in MB; file-backed pages are the pack's own, which the OS can drop at will
+def resident_mb():
+    with open("/proc/self/status") as f:
+        fields = dict(line.split(":", 1) for line in f)
+    return int(fields["RssAnon"].split()[0]) / 1024, int(fields["RssFile"].split()[0]) / 1024
+
+
+def answer_key(i):
+    return hashlib.sha256(f"answer {i}".encode()).hexdigest()
+
+
+def pdf_key(i):
+    return hashlib.sha256(f"pdf {i}".encode()).hexdigest()
+
+
+def build(path, size, text_chars, pdf_bytes, rng):
+    pdf_blob = rng.randbytes(pdf_bytes // 2) + bytes(pdf_bytes - pdf_bytes // 2)
+    with ContentPackWriter(path, TEMPLATES_VERSION) as writer:
+        for i in range(size):
+            text = " ".join(rng.choice(WORDS) for _ in range(text_chars // 6))[:text_chars]
+            writer.add_json(answer_key(i), {'output': text, 'clean': text,
+                                            'token_usage': {'prompt_tokens': 80, 'completion_tokens': len(text) // 4}})
+            writer.add(pdf_key(i), pdf_blob)
+
+
+def timed(fn, keys):
+    latencies = []
+    for key in keys:
+        start = time.perf_counter()
+        fn(key)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000", help="answers per pack, comma separated")
+    parser.add_argument("--text-chars", type=int, default=3000)
+    parser.add_argument("--pdf-kb", type=int, default=12)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    directory = tempfile.mkdtemp(prefix="codesnack_pack_")
+    print(f"{'answers':>9}{'file MB':>9}{'build s':>9}{'open ms':>9}{'open private MB':>17}{'open heap KB':>14}"
+          f"{'hit us':>8}{'hit p95':>9}{'miss us':>9}{'after: private MB':>19}{'mapped file MB':>16}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        path = os.path.join(directory, f"pack_{size}.bin")
+        start = time.perf_counter()
+        build(path, size, args.text_chars, args.pdf_kb * 1024, rng)
+        build_seconds = time.perf_counter() - start
+
+        rss_before = resident_mb()
+        tracemalloc.start()
+        start = time.perf_counter()
+        pack = ContentPack(path, TEMPLATES_VERSION)
+        open_ms = (time.perf_counter() - start) * 1000
+        heap_kb = tracemalloc.get_traced_memory()[0] / 1024
+        tracemalloc.stop()
+        private_open = resident_mb()[0] - rss_before[0]
+
+        hits = [answer_key(rng.randrange(size)) for _ in range(args.lookups)]
+        misses = [answer_key(size + i) for i in range(args.lookups)]
+        hit_median, hit_p95 = timed(pack.get_json, hits)
+        miss_median, _ = timed(pack.get_json, misses)
+        private_after, file_after = (after - before for after, before in zip(resident_mb(), rss_before))
+        print(f"{size:>9}{os.path.getsize(path) / 2**20:>9.1f}{build_seconds:>9.1f}{open_ms:>9.3f}{private_open:>17.2f}"
+              f"{heap_kb:>14.1f}{hit_median:>8.1f}{hit_p95:>9.1f}{miss_median:>9.1f}{private_after:>19.1f}{file_after:>16.1f}")
+        pack.close()
+        os.remove(path)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
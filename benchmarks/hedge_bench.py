@@ -0,0 +1,97 @@
+"""Tail latency of the model router (router.py) with and without hedged requests, and with a failing backend.
+
+Run from the repository root:  python -m benchmarks.hedge_bench [--requests 400] [--concurrency 8]
+
+Two stub backends stand in for Gemini and Replicate, so no keys are needed:
+  primary    fast (--primary-latency), but --slow-rate of its calls take --slow-latency (a slow tail)
+  secondary  slower on average (--secondary-latency), no tail
+Scenarios:
+  no hedging        every request waits for the primary
+  hedged            the secondary is asked too once the primary passes its own p95 (until 20 calls have
+                    set that p95, after CODESNACK_HEDGE_DEFAULT seconds)
+  primary flaky     --flaky-rate of primary calls fail; the secondary answers for them
+  primary down      every primary call fails; the circuit breaker stops sending it requests
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from router import ModelRouter
+from stub_backends import StubGeminiModel
+
+
+class StubBackend:
+    """A stub model behind the router's backend interface, without a dispatcher (no rate limit or retries)."""
+
+    def __init__(self, name, seed, **stub_options):
+        self.name = name
+        self.model = StubGeminiModel(name, response_chars=200, seed=seed, **stub_options)
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        return self.model.generate_content(prompt, generation_config=generation_config, stream=stream)
+
+
+def run(router, requests, concurrency):
+    def one(i):
+        start = time.perf_counter()
+        try:
+            _, route = router.generate(f"Prompt {i}")
+            return time.perf_counter() - start, route['backend']
+        except Exception:
+            return time.perf_counter() - start, None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(one, range(requests)))
+
+
+def report(name, router, results):
+    latencies = sorted(seconds for seconds, _ in results)
+    failed = sum(1 for _, backend in results if backend is None)
+    stats = router.stats()
+    calls = sum(row["calls"] for row in stats["backends"])
+    answered = {row["backend"]: row["wins"] for row in stats["backends"]}
+
+    def quantile(q):
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    print(f"{name:<16}{statistics.median(latencies):>8.3f}{quantile(0.95):>8.3f}{quantile(0.99):>8.3f}"
+          f"{latencies[-1]:>8.3f}{calls / len(results) - 1:>9.1%}{answered['primary']:>9}{answered['secondary']:>11}"
+          f"{failed:>8}{stats['backends'][0]['calls']:>15}{stats['backends'][0]['times_opened']:>15}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--primary-latency", type=float, default=0.1)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-latency", type=float, default=2.0)
+    parser.add_argument("--secondary-latency", type=float, default=0.3)
+    parser.add_argument("--flaky-rate", type=float, default=0.2)
+    parser.add_argument("--hedge-min", type=float, default=0.1,
+                        help="earliest hedge (CODESNACK_HEDGE_MIN), scaled down to the stub latencies")
+    args = parser.parse_args()
+
+    def backends(error_rate=0.0):
+        return [StubBackend("primary", 1, latency=args.primary_latency, slow_rate=args.slow_rate,
+                            slow_latency=args.slow_latency, error_rate=error_rate),
+                StubBackend("secondary", 2, latency=args.secondary_latency)]
+
+    scenarios = {
+        "no hedging": ModelRouter(backends(), hedge=False),
+        "hedged": ModelRouter(backends(), hedge_min=args.hedge_min),
+        "primary flaky": ModelRouter(backends(error_rate=args.flaky_rate), hedge_min=args.hedge_min),
+        "primary down": ModelRouter(backends(error_rate=1.0), hedge_min=args.hedge_min),
+    }
+    print(f"{args.requests} requests, {args.concurrency} at a time; primary {args.primary_latency}s "
+          f"({args.slow_rate:.0%} at {args.slow_latency}s), secondary {args.secondary_latency}s\n")
+    print(f"{'scenario':<16}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}{'max s':>8}{'extra':>9}{'primary':>9}"
+          f"{'secondary':>11}{'failed':>8}{'primary calls':>15}{'breaker opens':>15}")
+    for name, router in scenarios.items():
+        report(name, router, run(router, args.requests, args.concurrency))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,97 @@
+"""Speed of the generation history (history.py) once it holds a large number of generations.
+
+Run from the repository root:  python -m benchmarks.history_bench [--entries 100000] [--output-chars 1500]
+
+Fills a fresh history database with synthetic generations (topics, levels and content types drawn at
+random, outputs made of words with a long-tailed frequency so some search terms are common and some
+rare), then times what the app does with it:
+  record           storing one more generation
+  lookup           newest entries for a topic / level / type, as the History panel lists them
+  search           full-text search for common, rare and prefix terms, with and without filters
+  get              reopening one entry with its full output
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from content import COURSE_PACK_TYPES
+from history import GenerationHistory
+
+LEVELS = ["Beginner", "Intermediate", "Advanced"]
+SUBJECTS = ["Python", "JavaScript", "SQL", "Git", "Docker", "React", "CSS", "HTML", "Rust", "Java", "Go", "TypeScript"]
+CONCEPTS = ["loops", "recursion", "closures", "decorators", "promises", "joins", "branches", "containers", "hooks",
+            "flexbox", "generics", "ownership", "interfaces", "testing", "async", "classes", "modules", "errors"]
+
+
+def make_vocabulary(size, rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = {"".join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(size * 2)}
+    return sorted(words)[:size]
+
+
+def fill(history, entries, output_chars, rng):
+    vocabulary = make_vocabulary(20000, rng) + CONCEPTS
+    # Zipf-like weights: a few words are in almost every output, most are rare
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    start = time.perf_counter()
+    words_per_output = output_chars // 7
+    for _ in range(entries):
+        topic = f"{rng.choice(SUBJECTS)} {rng.choice(CONCEPTS)}"
+        output = " ".join(rng.choices(vocabulary, weights, k=words_per_output))
+        history.record(rng.choice(COURSE_PACK_TYPES), topic, rng.choice(LEVELS), f"Prompt about {topic}",
+                       {'output': output, 'generation_time': 1.0, 'token_usage': {'prompt_tokens': 90, 'completion_tokens': 400}})
+    return time.perf_counter() - start, vocabulary
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100000, help="generations stored before timing")
+    parser.add_argument("--output-chars", type=int, default=1500, help="approximate length of every output")
+    parser.add_argument("--repeat", type=int, default=20, help="timed calls per operation")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    path = os.path.join(tempfile.mkdtemp(prefix="codesnack_history_"), "history.sqlite3")
+    history = GenerationHistory(path)
+    fill_seconds, vocabulary = fill(history, args.entries, args.output_chars, rng)
+    size_mb = sum(os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix)) / 2**20
+    print(f"filled {args.entries} generations in {fill_seconds:.1f}s ({size_mb:.0f} MB)\n")
+
+    common, rare = vocabulary[0], vocabulary[-1 - len(CONCEPTS)]
+    operations = {
+        "record": lambda: history.record("Topic Summary", "Python loops", "Beginner", "Prompt",
+                                         {'output': "for loops and while loops " * 50}),
+        "lookup topic+level": lambda: history.lookup(topic="python LOOPS", learner_level="Beginner"),
+        "lookup type": lambda: history.lookup(template_type="Lesson Plan"),
+        "lookup level": lambda: history.lookup(learner_level="Advanced"),
+        "lookup recent": lambda: history.lookup(),
+        f"search common '{common}'": lambda: history.search(common),
+        f"search rare '{rare}'": lambda: history.search(rare),
+        "search prefix 'recur'": lambda: history.search("recur"),
+        "search two words": lambda: history.search(f"{common} decorators"),
+        "search short 'ab'": lambda: history.search("ab"),
+        "search + type": lambda: history.search(common, template_type="Lesson Plan"),
+        "search + topic+level": lambda: history.search(common, topic="Python loops", learner_level="Advanced"),
+        "get": lambda: history.get(rng.randint(1, args.entries)),
+    }
+    print(f"{'operation':<34}{'median ms':>10}{'max ms':>10}")
+    for name, fn in operations.items():
+        median, worst = timed(fn, args.repeat)
+        print(f"{name:<34}{median:>10.2f}{worst:>10.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
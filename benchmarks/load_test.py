@@ -0,0 +1,231 @@
+"""End-to-end load test of App.py against the offline stubs (no API keys, no network).
+
+Run from the repository root:
+    python -m benchmarks.load_test --sessions 4 --requests 3
+    python -m benchmarks.load_test --flows sidebar custom --gemini-latency 1.5 --save baseline.json
+    python -m benchmarks.load_test --compare baseline.json      # exit code 1 on a regression
+
+Every simulated session is its own process driving App.py through Streamlit's AppTest (AppTest keeps
+one runtime per process, so sessions cannot share a process). Sessions share the on-disk caches through
+a fresh CODESNACK_CACHE_DIR, and every request uses a new topic/prompt so nothing is served from cache.
+
+Latency is the time from the click until the result is on the page, i.e. what the user waits for: the
+click's rerun, then reruns every POLL_SECONDS while the background job runs (the browser polls the same way).
+Memory is the Python heap peak (tracemalloc) of one extra session running the flow on its own after the
+timed sessions, because tracemalloc slows Python down several times over; --no-memory skips that pass.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+FLOWS = ["sidebar", "custom", "tutorials", "copilot"]
+APP_FILE = "App.py"
+RUN_TIMEOUT = 120
+POLL_SECONDS = 0.05
+
+
+def _button(buttons, label):
+    return next(button for button in buttons if label in button.label)
+
+
+#Function | Rerun until the session's background jobs have finished and their results are on the page
+def _finish_jobs(at):
+    deadline = time.perf_counter() + RUN_TIMEOUT
+    while at.session_state["jobs"] and time.perf_counter() < deadline and not at.exception:
+        time.sleep(POLL_SECONDS)
+        at.run(timeout=RUN_TIMEOUT)
+
+
+# Each flow: (prepare the session once, perform request number `index`, did it succeed?)
+def _sidebar(at, session, index):
+    at.sidebar.selectbox[0].select("Lesson Plan")
+    at.sidebar.text_input[0].input(f"Python loops {session}-{index}")
+    _button(at.sidebar.button, "Generate Content").click().run(timeout=RUN_TIMEOUT)
+    _finish_jobs(at)
+    return any("generated successfully" in element.value for element in at.success)
+
+
+def _custom(at, session, index):
+    # The prompt box's identity follows its value, so the text is set through session state
+    at.session_state["custom_prompt"] = f"Explain Python decorators with an example ({session}-{index})"
+    _button(at.button, "Start Generating").click().run(timeout=RUN_TIMEOUT)
+    _finish_jobs(at)
+    return any("generated successfully" in element.value for element in at.success)
+
+
+def _tutorials(at, session, index):
+    at.sidebar.selectbox[0].select("Tutorials")
+    at.sidebar.text_input[0].input(f"JavaScript promises {session}-{index}")
+    _button(at.sidebar.button, "Generate Content").click().run(timeout=RUN_TIMEOUT)
+    _finish_jobs(at)
+    return len(at.get("video")) > 0
+
+
+def _copilot(at, session, index):
+    if not at.sidebar.checkbox[0].value:
+        at.sidebar.checkbox[0].check().run(timeout=RUN_TIMEOUT)
+    code_box = next(area for area in at.text_area if "Edit Your Code" in area.label)
+    code_box.set_value(f"<!DOCTYPE html>\n<html><body><h1>Session {session} request {index}</h1></body></html>")
+    _button(at.button, "Copilot").click().run(timeout=RUN_TIMEOUT)
+    _finish_jobs(at)
+    return any("Gemini Response" in element.value for element in at.success)
+
+
+FLOW_ACTIONS = {"sidebar": _sidebar, "custom": _custom, "tutorials": _tutorials, "copilot": _copilot}
+
+
+#Function | One simulated browser session (runs in its own process)
+def run_session(flow, session, requests, measure_memory):
+    import tracemalloc
+
+    from streamlit.testing.v1 import AppTest
+
+    latencies, errors = [], []
+    at = AppTest.from_file(APP_FILE, default_timeout=RUN_TIMEOUT).run()
+    if measure_memory:
+        tracemalloc.start()
+    for index in range(requests):
+        start = time.perf_counter()
+        try:
+            ok = FLOW_ACTIONS[flow](at, session, index) and not at.exception
+            error = None if ok else ([element.value for element in at.error] or ["no output"])[0]
+        except Exception as e:
+            ok, error = False, f"{type(e).__name__}: {e}"
+        latencies.append(time.perf_counter() - start)
+        if not ok:
+            errors.append(error)
+    peak = None
+    if measure_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {'latencies': latencies, 'errors': errors, 'peak_bytes': peak}
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else None
+
+
+def run_flow(flow, sessions, requests, measure_memory):
+    context = multiprocessing.get_context("spawn")
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=sessions, mp_context=context) as pool:
+        futures = [pool.submit(run_session, flow, session, requests, False) for session in range(sessions)]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception:
+                results.append({'latencies': [], 'errors': [traceback.format_exc(limit=1)], 'peak_bytes': None})
+    wall_time = time.perf_counter() - start
+
+    peak = None
+    if measure_memory:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            peak = pool.submit(run_session, flow, sessions, requests, True).result()['peak_bytes']
+
+    latencies = [latency for result in results for latency in result['latencies']]
+    errors = [error for result in results for error in result['errors']]
+    succeeded = len(latencies) - len(errors)
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'sample_error': errors[0] if errors else None,
+        'throughput': round(succeeded / wall_time, 3),
+        'p50': round(percentile(latencies, 0.5), 3) if latencies else None,
+        'p95': round(percentile(latencies, 0.95), 3) if latencies else None,
+        'p99': round(percentile(latencies, 0.99), 3) if latencies else None,
+        'mb_per_session': round(peak / 2**20, 1) if peak is not None else None,
+        'wall_time': round(wall_time, 2)
+    }
+
+
+#Function | Flows whose p95 grew or throughput fell by more than `tolerance` against a saved baseline
+def regressions(report, baseline, tolerance):
+    found = []
+    for flow, current in report.items():
+        previous = baseline.get(flow)
+        if not previous:
+            continue
+        if previous.get('p95') and current['p95'] and current['p95'] > previous['p95'] * (1 + tolerance):
+            found.append(f"{flow}: p95 {previous['p95']}s -> {current['p95']}s")
+        if previous.get('throughput') and current['throughput'] < previous['throughput'] * (1 - tolerance):
+            found.append(f"{flow}: throughput {previous['throughput']} -> {current['throughput']} req/s")
+        if current['errors'] > previous.get('errors', 0):
+            found.append(f"{flow}: errors {previous.get('errors', 0)} -> {current['errors']}")
+    return found
+
+
+def configure_stubs(args):
+    settings = {
+        "CODESNACK_BACKEND": "stub",
+        "CODESNACK_CACHE_DIR": args.cache_dir or tempfile.mkdtemp(prefix="codesnack_load_"),
+        "CODESNACK_STUB_LATENCY": args.gemini_latency,
+        "CODESNACK_STUB_ERROR_RATE": args.gemini_error_rate,
+        "CODESNACK_STUB_RESPONSE_CHARS": args.gemini_chars,
+        "CODESNACK_STUB_YOUTUBE_LATENCY": args.youtube_latency,
+        "CODESNACK_STUB_YOUTUBE_ERROR_RATE": args.youtube_error_rate,
+        "CODESNACK_STUB_YOUTUBE_RESULTS": args.youtube_results,
+        "CODESNACK_STUB_REPLICATE_LATENCY": args.replicate_latency,
+        "CODESNACK_STUB_REPLICATE_ERROR_RATE": args.replicate_error_rate,
+        "CODESNACK_STUB_REPLICATE_RESPONSE_CHARS": args.replicate_chars,
+    }
+    # Session processes are spawned, so they pick these up from the environment
+    os.environ.update({name: str(value) for name, value in settings.items()})
+    return settings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--flows", nargs="+", choices=FLOWS, default=FLOWS)
+    parser.add_argument("--sessions", type=int, default=4, help="concurrent sessions per flow")
+    parser.add_argument("--requests", type=int, default=3, help="requests per session")
+    parser.add_argument("--gemini-latency", type=float, default=0.5)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-chars", type=int, default=2000, help="characters per generated answer")
+    parser.add_argument("--youtube-latency", type=float, default=0.3)
+    parser.add_argument("--youtube-error-rate", type=float, default=0.0)
+    parser.add_argument("--youtube-results", type=int, default=10)
+    parser.add_argument("--replicate-latency", type=float, default=1.0)
+    parser.add_argument("--replicate-error-rate", type=float, default=0.0)
+    parser.add_argument("--replicate-chars", type=int, default=1500)
+    parser.add_argument("--cache-dir", help="cache directory to use (default: a fresh temporary one)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--save", help="write the report to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON written by --save")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression against the baseline")
+    args = parser.parse_args(argv)
+
+    configure_stubs(args)
+    report = {}
+    print(f"{args.sessions} sessions x {args.requests} requests per flow\n")
+    print(f"{'flow':<11}{'requests':>9}{'errors':>8}{'req/s':>8}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}{'MB/session':>12}")
+    for flow in args.flows:
+        result = report[flow] = run_flow(flow, args.sessions, args.requests, not args.no_memory)
+        print(f"{flow:<11}{result['requests']:>9}{result['errors']:>8}{result['throughput']:>8.2f}"
+              f"{result['p50'] or 0:>8.2f}{result['p95'] or 0:>8.2f}{result['p99'] or 0:>8.2f}"
+              f"{result['mb_per_session'] if result['mb_per_session'] is not None else '-':>12}")
+        if result['sample_error']:
+            print(f"{'':<11}first error: {result['sample_error'].strip()[:200]}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            found = regressions(report, json.load(f), args.tolerance)
+        print("\nRegressions against " + args.compare + ":" if found else "\nNo regressions against " + args.compare)
+        for line in found:
+            print(f"  {line}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
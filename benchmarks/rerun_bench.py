@@ -0,0 +1,158 @@
+"""Rerun cost of everyday interactions with App.py: server time and bytes sent to the browser.
+
+Run from the repository root:  python -m benchmarks.rerun_bench [--repeat 10] [--output-chars 20000]
+
+Each interaction starts from a page that already shows generated content (sidebar output, a custom prompt
+answer and a Copilot answer, each --output-chars long, with the Practice Arena open), changes one widget
+and times the rerun Streamlit performs for it. A widget drawn inside an st.fragment only reruns that
+fragment, exactly as in the browser; any other widget reruns the whole script. The time is the script (or
+fragment) execution alone, which is what a server spends per interaction; AppTest adds ~40ms of its own
+set-up to every run, which is left out.
+
+AppTest builds a fresh runner (and fragment registry) for every run, so this benchmark keeps one
+fragment registry for the whole session and sends fragment-scoped reruns itself.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+INTERACTIONS = ["sidebar topic", "sidebar option", "custom prompt", "arena code", "arena activity", "arena toggle"]
+RUN_TIMEOUT = 120
+
+
+def _patch_apptest():
+    from streamlit.runtime.fragment import MemoryFragmentStorage
+    from streamlit.runtime.scriptrunner import script_runner
+    from streamlit.runtime.scriptrunner_utils.script_requests import RerunData
+    from streamlit.testing.v1 import local_script_runner
+
+    runner_class = local_script_runner.LocalScriptRunner
+    state = {'storage': MemoryFragmentStorage(), 'fragment_id': None, 'widget_fragments': {}, 'bytes': 0, 'seconds': 0.0}
+    original_init = runner_class.__init__
+    original_exec = script_runner.exec_func_with_error_handling
+
+    def timed_exec(func, ctx):
+        start = time.perf_counter()
+        try:
+            return original_exec(func, ctx)
+        finally:
+            state['seconds'] = time.perf_counter() - start
+
+    def init(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+        self._fragment_storage = state['storage']
+
+    def run(self, widget_state=None, query_params=None, timeout=3, page_hash=""):
+        fragment_id, state['fragment_id'] = state['fragment_id'], None
+        self.request_rerun(RerunData(widget_states=widget_state, page_script_hash=page_hash,
+                                     fragment_id_queue=[fragment_id] if fragment_id else [],
+                                     is_fragment_scoped_rerun=bool(fragment_id)))
+        if not self._script_thread:
+            self.start()
+        local_script_runner.require_widgets_deltas(self, timeout)
+        messages = self.forward_msgs()
+        state['bytes'] = sum(message.ByteSize() for message in messages)
+        # Which fragment drew each widget, so an interaction can be sent as a fragment rerun
+        for message in messages:
+            if message.HasField("delta") and message.delta.HasField("new_element"):
+                element = message.delta.new_element
+                widget = getattr(element, element.WhichOneof("type") or "", None)
+                widget_id = getattr(widget, "id", None)
+                if widget_id:
+                    state['widget_fragments'][widget_id] = message.delta.fragment_id or None
+        return local_script_runner.parse_tree_from_messages(messages)
+
+    runner_class.__init__ = init
+    runner_class.run = run
+    script_runner.exec_func_with_error_handling = timed_exec
+    return state
+
+
+def _button(buttons, label):
+    return next(button for button in buttons if label in button.label)
+
+
+def _text_area(at, label):
+    return next(area for area in at.text_area if area.label == label)
+
+
+#Function | A session showing every kind of output, ready for the interaction under test
+def prepared_session():
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file("App.py", default_timeout=RUN_TIMEOUT).run()
+    at.sidebar.checkbox[0].check().run()
+    at.sidebar.text_input[0].input("Python loops")
+    _button(at.sidebar.button, "Generate Content").click().run()
+    at.session_state["custom_prompt"] = "Explain Python decorators"
+    _text_area(at, "").set_value("Explain Python decorators")
+    _button(at.button, "Start Generating").click().run()
+    _button(at.button, "Copilot").click().run()
+    # Generation runs as background jobs; rerun until all three answers are on the page
+    while at.session_state["jobs"]:
+        time.sleep(0.05)
+        at.run()
+    return at
+
+
+#Function | Change one widget and return the element it changed
+def interact(at, name, step):
+    if name == "sidebar topic":
+        return at.sidebar.text_input[0].input(f"Python loops {step}")
+    if name == "sidebar option":
+        box = next(box for box in at.sidebar.checkbox if "Skip cached" in box.label)
+        return box.set_value(not box.value)
+    if name == "custom prompt":
+        return _text_area(at, "").input(f"Explain Python decorators {step}")
+    if name == "arena code":
+        return _text_area(at, "✍️ Edit Your Code Below").input(f"<h1>Step {step}</h1>")
+    if name == "arena activity":
+        box = next(box for box in at.selectbox if box.label == "Choose an Activity:")
+        return box.select(box.options[step % len(box.options)])
+    if name == "arena toggle":
+        box = next(box for box in at.sidebar.checkbox if "Practice Arena" in box.label)
+        return box.set_value(not box.value)
+    raise ValueError(name)
+
+
+def measure(state, name, repeat):
+    at = prepared_session()
+    seconds, sizes, scopes = [], [], set()
+    for step in range(repeat):
+        widget = interact(at, name, step)
+        fragment_id = state['widget_fragments'].get(widget.id)
+        state['fragment_id'] = fragment_id
+        scopes.add("fragment" if fragment_id else "full script")
+        at.run()
+        seconds.append(state['seconds'])
+        sizes.append(state['bytes'])
+        if at.exception:
+            raise RuntimeError(f"{name}: {at.exception[0].value}")
+    return {'ms': statistics.median(seconds) * 1000, 'kb': statistics.median(sizes) / 1024, 'scope': "/".join(sorted(scopes))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10, help="interactions timed per kind")
+    parser.add_argument("--output-chars", type=int, default=20000, help="length of every generated answer")
+    parser.add_argument("--interactions", nargs="+", choices=INTERACTIONS, default=INTERACTIONS)
+    args = parser.parse_args()
+
+    os.environ.update({"CODESNACK_BACKEND": "stub", "CODESNACK_STUB_LATENCY": "0.01",
+                       "CODESNACK_STUB_RESPONSE_CHARS": str(args.output_chars),
+                       "CODESNACK_CACHE_DIR": tempfile.mkdtemp(prefix="codesnack_rerun_")})
+    sys.path.insert(0, os.getcwd())
+    state = _patch_apptest()
+
+    print(f"{'interaction':<17}{'reruns':<14}{'median ms':>10}{'sent KB':>10}")
+    for name in args.interactions:
+        result = measure(state, name, args.repeat)
+        print(f"{name:<17}{result['scope']:<14}{result['ms']:>10.1f}{result['kb']:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
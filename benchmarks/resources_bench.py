@@ -0,0 +1,78 @@
+"""Cold vs warm cost of the shared clients in resources.py.
+
+Run from the repository root:  python -m benchmarks.resources_bench [--live]
+
+Without --live only client construction is timed (no network, no keys needed).
+With --live a cheap request is sent through a freshly built client and then through
+the shared, already connected one (needs the keys from .env; costs 1 YouTube quota unit per call).
+"""
+import argparse
+import os
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+import resources
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def cold(builder):
+    def run():
+        resources.reset_resources()
+        builder()
+    return run
+
+
+def bench_construction(repeat):
+    from googleapiclient.discovery import build
+
+    print("Client construction (median ms)")
+    per_call_build = timed(lambda: build('youtube', 'v3', developerKey=os.getenv("YOUTUBE_API_KEY")), repeat)
+    print(f"  youtube  build() per search (old): {per_call_build:8.2f}")
+    print(f"  youtube  shared client, cold     : {timed(cold(resources.get_youtube_client), repeat):8.2f}")
+    print(f"  youtube  shared client, warm     : {timed(resources.get_youtube_client, repeat):8.4f}")
+    print(f"  gemini   shared model, cold      : {timed(cold(lambda: resources.get_gemini_model('gemini-1.5-flash')), repeat):8.2f}")
+    print(f"  gemini   shared model, warm      : {timed(lambda: resources.get_gemini_model('gemini-1.5-flash'), repeat):8.4f}")
+    print(f"  replicate shared client, cold    : {timed(cold(resources.get_replicate_client), repeat):8.2f}")
+    print(f"  replicate shared client, warm    : {timed(resources.get_replicate_client, repeat):8.4f}")
+
+
+def bench_live(repeat):
+    def youtube_call():
+        request = resources.get_youtube_client().i18nLanguages().list(part='snippet', hl='en')
+        resources.execute_request(request)
+
+    def gemini_call():
+        resources.get_gemini_model('gemini-1.5-flash').count_tokens("warm up")
+
+    print("Request latency (median ms)")
+    for name, call in (("youtube", youtube_call), ("gemini", gemini_call)):
+        cold_ms = timed(cold(call), repeat)
+        call()
+        warm_ms = timed(call, repeat)
+        print(f"  {name:<8} cold {cold_ms:8.1f}   warm {warm_ms:8.1f}   saved {cold_ms - warm_ms:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--live", action="store_true", help="also time real API requests")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    load_dotenv()
+    bench_construction(args.repeat)
+    if args.live:
+        bench_live(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
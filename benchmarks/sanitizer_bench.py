@@ -0,0 +1,158 @@
+"""Output sanitizer: equivalence with the original regex/replace chain, and throughput on large outputs.
+
+Run from the repository root:  python -m benchmarks.sanitizer_bench [--sizes 1MB 5MB] [--stream-size 256KB]
+
+The corpus is a set of hand-written edge cases plus random strings built from the characters that matter
+('*', '<', '>', newlines); every case is also fed to the streaming sanitizer in random chunk sizes.
+"""
+import argparse
+import random
+import re
+import time
+
+from content import OutputSanitizer, remove_all_asterisks, sanitize_output_html
+
+EDGE_CASES = [
+    "", "*", "**", "***", "****", "*****", "**bold**", "*italic*", "***both***", "**a*b**c*",
+    "**unclosed", "unclosed**", "*a\nb*", "**a\nb**", "a * b * c", "2 * 3 = 6 and 4 * 5 = 20",
+    "<b>**x**</b>", "a<b*c*>d", "line one\n\n* bullet\n* bullet **strong**\n", "\n\n\n", "\r\n**x**\r\n",
+    "🎯 **Learning objectives**: *loops* & <code>", "x**y**z**", "*a**b*",
+]
+# A markdown-heavy answer (headings and bullets on most lines) and a mostly-prose one
+MARKDOWN_OUTPUT = (
+    "**🎯 Learning Objectives**\n"
+    "* Understand how *for-loops* repeat work over a <list> of items.\n"
+    "* Use **break** and **continue** to control the loop (e.g. `if x > 3: break`).\n"
+    "Plain explanation lines make up most of a model answer, with the odd 2 * 3 = 6 in between.\n\n"
+)
+PROSE_OUTPUT = (
+    "**Step 1: Setting up**\n"
+    "A loop repeats a block of code. In Python you write for item in items: and indent the body below it.\n"
+    "The range() function gives you numbers to loop over, so for i in range(3) runs the body three times.\n"
+    "Use while when you do not know in advance how many times the loop should run (e.g. x < 10).\n\n"
+)
+
+
+#Function | The implementation this benchmark replaces: two regex passes, then three replaces for the HTML box
+def legacy_remove_all_asterisks(text):
+    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
+    text = re.sub(r'\*(.*?)\*', r'\1', text)
+    return text
+
+
+def legacy_sanitize_output_html(text):
+    return legacy_remove_all_asterisks(text).replace('<', '&lt;').replace('>', '&gt;').replace('\n', '<br>')
+
+
+# The escapes as one alternation regex with a replacement map (a single scan, but slower than the replaces)
+_ESCAPES = {'<': '&lt;', '>': '&gt;', '\n': '<br>'}
+_ESCAPE_OR_SINGLE = re.compile(r'\*(.*?)\*|[<>\n]')
+
+
+def alternation_sanitize_output_html(text):
+    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
+    return _ESCAPE_OR_SINGLE.sub(lambda m: _ESCAPES.get(m.group(0)) or "".join(_ESCAPES.get(ch, ch) for ch in m.group(1)), text)
+
+
+# The streaming path before: clean complete lines, then re-join and re-escape the whole text for every chunk
+def legacy_stream(chunks):
+    cleaned_lines, pending, html = [], "", ""
+    for chunk in chunks:
+        complete, newline, pending = (pending + chunk).rpartition('\n')
+        if newline:
+            cleaned_lines.append(legacy_remove_all_asterisks(complete + newline))
+        text = "".join(cleaned_lines) + legacy_remove_all_asterisks(pending)
+        html = text.replace('<', '&lt;').replace('>', '&gt;').replace('\n', '<br>')
+    return html
+
+
+def new_stream(chunks):
+    sanitizer, html = OutputSanitizer(), ""
+    for chunk in chunks:
+        html = sanitizer.feed(chunk)
+    return html
+
+
+def random_case(rng):
+    return "".join(rng.choice("**<>\n ab") for _ in range(rng.randint(0, 30)))
+
+
+def stream(text, rng):
+    sanitizer, html, pos = OutputSanitizer(), "", 0
+    while pos < len(text):
+        step = rng.randint(1, 8)
+        html = sanitizer.feed(text[pos:pos + step])
+        pos += step
+    return sanitizer.feed("") if text else html
+
+
+def check_corpus(cases, rng):
+    corpus = EDGE_CASES + [random_case(rng) for _ in range(cases)] + [MARKDOWN_OUTPUT * 3, PROSE_OUTPUT * 3]
+    mismatches = 0
+    for text in corpus:
+        expected_text = legacy_remove_all_asterisks(text)
+        expected_html = legacy_sanitize_output_html(text)
+        if (remove_all_asterisks(text) != expected_text or sanitize_output_html(text) != expected_html
+                or alternation_sanitize_output_html(text) != expected_html or stream(text, rng) != expected_html):
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  mismatch: {text!r}")
+    return len(corpus), mismatches
+
+
+def parse_size(label):
+    units = {"KB": 1024, "MB": 1024 * 1024}
+    return int(float(label[:-2]) * units[label[-2:].upper()])
+
+
+def make_text(sample, size):
+    return (sample * (size // len(sample) + 1))[:size]
+
+
+def throughput(function, data, size, repeat=3):
+    best = min(_timed(function, data) for _ in range(repeat))
+    return size / 2**20 / best
+
+
+def _timed(function, data):
+    start = time.perf_counter()
+    function(data)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=["1MB", "5MB"])
+    parser.add_argument("--stream-size", default="256KB", help="output size for the streaming comparison")
+    parser.add_argument("--chunk", type=int, default=256, help="characters per streamed chunk")
+    parser.add_argument("--cases", type=int, default=20000)
+    args = parser.parse_args()
+
+    total, mismatches = check_corpus(args.cases, random.Random(0))
+    print(f"Corpus: {total} cases, {mismatches} mismatches against the regex/replace chain\n")
+
+    print(f"{'input':>7}  {'output':<10}{'step':<22}{'legacy MB/s':>12}{'new MB/s':>10}{'alternation MB/s':>18}")
+    for label in args.sizes:
+        size = parse_size(label)
+        for kind, sample in (("markdown", MARKDOWN_OUTPUT), ("prose", PROSE_OUTPUT)):
+            text = make_text(sample, size)
+            for step, legacy, new, alternation in (
+                    ("asterisks only", legacy_remove_all_asterisks, remove_all_asterisks, None),
+                    ("asterisks + HTML box", legacy_sanitize_output_html, sanitize_output_html, alternation_sanitize_output_html)):
+                alternation_rate = f"{throughput(alternation, text, size):>18.1f}" if alternation else ""
+                print(f"{label:>7}  {kind:<10}{step:<22}{throughput(legacy, text, size):>12.1f}"
+                      f"{throughput(new, text, size):>10.1f}{alternation_rate}")
+
+    # Streaming re-renders the whole box per chunk, so its cost grows with the square of the output size
+    size = parse_size(args.stream_size)
+    text = make_text(MARKDOWN_OUTPUT, size)
+    chunks = [text[pos:pos + args.chunk] for pos in range(0, size, args.chunk)]
+    legacy_seconds = _timed(legacy_stream, chunks)
+    new_seconds = _timed(new_stream, chunks)
+    print(f"\nStreaming {args.stream_size} in {len(chunks)} chunks: legacy {legacy_seconds:.2f}s, new {new_seconds:.2f}s "
+          f"({legacy_seconds / new_seconds:.1f}x)")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,62 @@
+"""Wall-clock time of a lesson plan written in one call against the same plan written as parallel sections.
+
+Run from the repository root:  python -m benchmarks.sections_bench [--lengths 2000,4000,8000,16000]
+
+Runs offline against the stub Gemini model, set up so that a call takes --latency seconds plus the time to
+write its answer at --chars-per-second (generation time grows with output length, as it does for Gemini).
+A one-call answer is --lengths characters long; each section is a quarter of that, after a short outline.
+Every run uses a new topic, so nothing comes from the caches.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lengths", default="2000,4000,8000,16000", help="characters in a one-call answer, comma separated")
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before a call starts writing")
+    parser.add_argument("--chars-per-second", type=float, default=800, help="writing speed of the stub model")
+    parser.add_argument("--template", default="Lesson Plan")
+    args = parser.parse_args()
+
+    # Stub settings are read at import time
+    os.environ.update({
+        "CODESNACK_BACKEND": "stub", "CODESNACK_BACKENDS": "gemini", "CODESNACK_GEMINI_RATE": "0",
+        "CODESNACK_CACHE_DIR": tempfile.mkdtemp(prefix="codesnack_sections_"),
+        "CODESNACK_STUB_LATENCY": str(args.latency), "CODESNACK_STUB_CHARS_PER_SECOND": str(args.chars_per_second),
+    })
+    from content import MODEL_NAME, SECTIONED_TEMPLATES, build_sectioned_document, generate_content, get_prompt_template
+    from resources import get_gemini_model
+
+    if args.template not in SECTIONED_TEMPLATES:
+        print(f"{args.template} is not sectioned (choose from {', '.join(SECTIONED_TEMPLATES)})")
+        return 1
+    model = get_gemini_model(MODEL_NAME)
+    print(f"{args.template}; stub model: {args.latency}s to start, then {args.chars_per_second:g} characters/s\n")
+    print(f"{'chars':>7}{'one call s':>12}{'sections s':>12}{'outline s':>11}{'slowest section s':>19}"
+          f"{'sections added up s':>21}{'speedup':>9}")
+    for run, length in enumerate(int(length) for length in args.lengths.split(",")):
+        model.response_chars = length
+        topic = f"Python loops {run}"
+        start = time.perf_counter()
+        generate_content(get_prompt_template(args.template, topic, "Beginner", ""), topic=topic)
+        single = time.perf_counter() - start
+
+        topic = f"Python loops sectioned {run}"
+        start = time.perf_counter()
+        result = build_sectioned_document(args.template, topic, "Beginner", "")
+        sectioned = time.perf_counter() - start
+        if 'error' in result:
+            print(f"error: {result['error']}", file=sys.stderr)
+            return 1
+        section_times = [section['generation_time'] for section in result['sections']]
+        print(f"{length:>7}{single:>12.2f}{sectioned:>12.2f}{result['outline']['generation_time']:>11.2f}"
+              f"{max(section_times):>19.2f}{sum(section_times):>21.2f}{single / sectioned:>8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
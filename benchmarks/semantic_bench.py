@@ -0,0 +1,121 @@
+"""Lookup latency and hit rate of the semantic cache (semantic_cache.py) as its index grows.
+
+Run from the repository root:  python -m benchmarks.semantic_bench [--sizes 10000,100000,1000000]
+
+Fills a fresh index with synthetic topics, all in one prompt shape (the worst case: in the app every
+template, level and context has its own, smaller partition), and at every size times lookups of:
+  paraphrases     a stored topic reworded (case, word order, plurals, hyphens, filler words); should hit it
+  near misses     a stored topic with one word swapped for another; should miss
+  new topics      topics never stored; should miss
+It also reports the similarity of a hand-picked set of real paraphrases and hard negatives.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from semantic_cache import SEMANTIC_DIMENSIONS, SEMANTIC_THRESHOLD, SemanticCache, embed_topic
+
+SUBJECTS = ["Python", "JavaScript", "SQL", "Git", "Docker", "React", "CSS", "HTML", "Rust", "Java", "Go", "C++"]
+FILLERS = ["in", "with", "using", "intro to", "the"]
+SHAPE = "lesson-plan/beginner"
+
+REAL_PARAPHRASES = [
+    ("python for loops", "For-loops in Python"), ("JavaScript promises", "Promises in JavaScript"),
+    ("SQL joins", "sql JOIN"), ("Linked lists", "linked list"), ("Intro to recursion", "Recursion"),
+    ("REST APIs with Flask", "Flask REST API"), ("object-oriented programming", "Object Oriented Programming"),
+    ("Python classes and objects", "Objects and classes in Python"),
+]
+REAL_NEGATIVES = [
+    ("Python loops", "Python lists"), ("merge sort", "quick sort"), ("C pointers", "C++ pointers"),
+    ("Java classes", "JavaScript classes"), ("while loops", "for loops"), ("binary search", "binary search trees"),
+    ("Python 2", "Python 3"), ("CSS grid", "CSS flexbox"),
+]
+
+
+def make_vocabulary(size, rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = {"".join(rng.choice(letters) for _ in range(rng.randint(4, 10))) for _ in range(size * 2)}
+    return sorted(word for word in words if not word.endswith("s"))[:size]
+
+
+def make_topic(vocabulary, rng):
+    return [rng.choice(SUBJECTS)] + rng.sample(vocabulary, rng.randint(2, 3))
+
+
+# The same topic as a student might type it differently
+def paraphrase(words, rng):
+    words = words[:1] + [word + "s" if rng.random() < 0.3 else word for word in words[1:]]
+    rng.shuffle(words)
+    words = [word.upper() if rng.random() < 0.2 else word.lower() if rng.random() < 0.5 else word for word in words]
+    text = "-".join(words[:2]) + " " + " ".join(words[2:]) if rng.random() < 0.3 else " ".join(words)
+    if rng.random() < 0.5:
+        text = f"{rng.choice(FILLERS)} {text}"
+    return text
+
+
+def timed_lookups(cache, queries, expected):
+    latencies, hits, correct = [], 0, 0
+    for query, key in zip(queries, expected):
+        start = time.perf_counter()
+        match = cache.lookup(SHAPE, query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if match is not None:
+            hits += 1
+            correct += key is not None and match['key'] == key
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95)], hits / len(queries), correct
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="index sizes to time, comma separated")
+    parser.add_argument("--queries", type=int, default=500, help="lookups of each kind per size")
+    parser.add_argument("--threshold", type=float, default=SEMANTIC_THRESHOLD)
+    parser.add_argument("--dimensions", type=int, default=SEMANTIC_DIMENSIONS)
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+
+    def similarity(a, b):
+        return f"{float(embed_topic(a, args.dimensions) @ embed_topic(b, args.dimensions)):.2f}"
+
+    print(f"threshold {args.threshold}, {args.dimensions} dimensions")
+    print(f"real paraphrases:    {' '.join(similarity(a, b) for a, b in REAL_PARAPHRASES)}")
+    print(f"real hard negatives: {' '.join(similarity(a, b) for a, b in REAL_NEGATIVES)}\n")
+
+    rng = random.Random(7)
+    vocabulary = make_vocabulary(50000, rng)
+    path = os.path.join(tempfile.mkdtemp(prefix="codesnack_semantic_"), "semantic.sqlite3")
+    cache = SemanticCache(path, threshold=args.threshold, max_entries=0, dimensions=args.dimensions)
+    stored = []
+    fill_seconds = 0.0
+
+    print(f"{'entries':>9}{'fill s':>9}{'index MB':>10}{'median ms':>11}{'p95 ms':>9}"
+          f"{'paraphrase hits':>17}{'right topic':>13}{'near-miss hits':>16}{'new-topic hits':>16}")
+    for size in sizes:
+        start = time.perf_counter()
+        while len(stored) < size:
+            words = make_topic(vocabulary, rng)
+            key = f"key-{len(stored)}"
+            cache.add(SHAPE, " ".join(words), key)
+            stored.append((words, key))
+        fill_seconds += time.perf_counter() - start
+
+        sample = rng.sample(stored, args.queries)
+        paraphrases = [paraphrase(words, rng) for words, _ in sample]
+        near_misses = [" ".join(words[:-1] + [rng.choice(vocabulary)]) for words, _ in sample]
+        new_topics = [" ".join(make_topic(vocabulary, rng)) for _ in range(args.queries)]
+
+        median, p95, paraphrase_rate, correct = timed_lookups(cache, paraphrases, [key for _, key in sample])
+        _, _, near_rate, _ = timed_lookups(cache, near_misses, [None] * args.queries)
+        _, _, new_rate, _ = timed_lookups(cache, new_topics, [None] * args.queries)
+        index_mb = cache.stats()["index_bytes"] / 2**20
+        print(f"{size:>9}{fill_seconds:>9.1f}{index_mb:>10.0f}{median:>11.2f}{p95:>9.2f}"
+              f"{paraphrase_rate:>17.1%}{correct / args.queries:>13.1%}{near_rate:>16.1%}{new_rate:>16.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,84 @@
+"""Memory held by the outputs of many concurrent sessions: plain session state against session_memory.py.
+
+Run from the repository root:  python -m benchmarks.session_memory_bench [--sessions 100,500,1000]
+
+Every session keeps a sidebar output, a custom answer and a Copilot answer, as App.py does. Students mostly
+open popular cached lessons, so outputs are drawn from a pool of --pool texts with a Zipf-like skew (a
+lesson is one --text-chars text, kept twice: cleaned and as HTML). Measures the Python heap (tracemalloc)
+the outputs take when stored as they are, then with long texts in the shared, compressed blob store, and
+the store/load latency of one output.
+"""
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+
+from session_memory import SessionMemory
+
+WORDS = ("loop variable function list index python value print range data example step learner code string "
+         "number class object method return condition while for if else key dictionary error test input").split()
+
+
+def lesson(rng, text_chars):
+    text = " ".join(rng.choice(WORDS) for _ in range(text_chars // 6))[:text_chars]
+    return {'kind': 'text', 'prompt': text[:300], 'clean': text, 'html': f"<p>{text}</p>", 'file_name': "lesson.pdf"}
+
+
+# The three outputs one session keeps, popular lessons most often
+def session_outputs(rng, pool):
+    picks = [pool[min(int(rng.paretovariate(1.2)) - 1, len(pool) - 1)] for _ in range(3)]
+    return dict(zip(("sidebar_output", "custom_output", "copilot_output"), picks))
+
+
+def heap_kb(fn):
+    tracemalloc.start()
+    kept = fn()
+    used = tracemalloc.get_traced_memory()[0] / 1024
+    tracemalloc.stop()
+    return used, kept
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", default="100,500,1000", help="concurrent sessions, comma separated")
+    parser.add_argument("--pool", type=int, default=200, help="distinct lessons the sessions draw from")
+    parser.add_argument("--text-chars", type=int, default=6000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    pool = [lesson(rng, args.text_chars) for _ in range(args.pool)]
+    print(f"{'sessions':>9}{'plain KB':>11}{'managed KB':>12}{'saved':>8}{'blobs':>7}{'store us':>10}{'load us':>9}")
+    for count in (int(count) for count in args.sessions.split(",")):
+        outputs = [session_outputs(random.Random(i), pool) for i in range(count)]
+        # Fresh copies of the texts, as reruns of separate sessions would have them
+        plain_kb, _ = heap_kb(lambda: [{slot: {key: "".join(value) if isinstance(value, str) else value
+                                               for key, value in output.items()} for slot, output in session.items()}
+                                       for session in outputs])
+
+        memory = SessionMemory(budget=10 * 2**20)
+        store_us, load_us = [], []
+
+        def managed():
+            kept = []
+            for i, session in enumerate(outputs):
+                compact = {}
+                for slot, output in session.items():
+                    start = time.perf_counter()
+                    compact[slot] = memory.store(f"session-{i}", slot, output)
+                    store_us.append((time.perf_counter() - start) * 1e6)
+                kept.append(compact)
+            return kept
+
+        managed_kb, kept = heap_kb(managed)
+        for i, compact in enumerate(kept[:200]):
+            start = time.perf_counter()
+            memory.load(f"session-{i}", "sidebar_output", compact["sidebar_output"])
+            load_us.append((time.perf_counter() - start) * 1e6)
+        print(f"{count:>9}{plain_kb:>11.0f}{managed_kb:>12.0f}{1 - managed_kb / plain_kb:>8.0%}"
+              f"{memory.stats()['blob_count']:>7}{statistics.median(store_us):>10.1f}{statistics.median(load_us):>9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
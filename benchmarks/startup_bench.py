@@ -0,0 +1,94 @@
+"""Cold start and per-rerun cost of App.py, plus which imports the first page pays for.
+
+Run from the repository root:  python -m benchmarks.startup_bench [--runs 5] [--reruns 20] [--top 12]
+
+Every run starts a fresh interpreter (stub backends, empty cache directory) that loads Streamlit and
+AppTest, then times:
+  first page   the first script run of App.py, imports of the app's own modules included
+  rerun        the median of the following plain reruns (what every widget interaction costs)
+The import table lists the modules App.py pulled in during the first run (python -X importtime),
+by cumulative time, averaged over the runs.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+MARKER = "startup-bench: first run"
+
+# Runs in the child interpreter; prints one JSON line with its timings
+CHILD = f"""
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("App.py", default_timeout=120)
+print({MARKER!r}, file=sys.stderr, flush=True)
+start = time.perf_counter()
+at.run()
+first_page = time.perf_counter() - start
+reruns = []
+for _ in range(int(sys.argv[1])):
+    start = time.perf_counter()
+    at.run()
+    reruns.append(time.perf_counter() - start)
+print(json.dumps({{"first_page": first_page, "reruns": reruns, "exception": bool(at.exception)}}))
+"""
+
+
+#Function | Top-level imports (cumulative microseconds) that happened after the marker line
+def parse_importtime(stderr):
+    seen_marker, imports = False, {}
+    for line in stderr.splitlines():
+        if MARKER in line:
+            seen_marker = True
+            continue
+        if not seen_marker or not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Nested imports are indented under the module that triggered them; keep the outermost ones
+        if name.startswith("  ") or not cumulative.strip().isdigit():
+            continue
+        imports[name.strip()] = int(cumulative)
+    return imports
+
+
+def run_once(reruns):
+    env = dict(os.environ, CODESNACK_BACKEND="stub", CODESNACK_CACHE_DIR=tempfile.mkdtemp(prefix="codesnack_startup_"))
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD, str(reruns)],
+                             capture_output=True, text=True, env=env, check=True)
+    timings = json.loads(process.stdout.strip().splitlines()[-1])
+    timings["imports"] = parse_importtime(process.stderr)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to average over")
+    parser.add_argument("--reruns", type=int, default=20, help="reruns timed per interpreter")
+    parser.add_argument("--top", type=int, default=12, help="imports to list")
+    args = parser.parse_args()
+
+    results = [run_once(args.reruns) for _ in range(args.runs)]
+    if any(result["exception"] for result in results):
+        print("App.py raised an exception; the numbers below are not meaningful")
+
+    first_pages = [result["first_page"] * 1000 for result in results]
+    reruns = [rerun * 1000 for result in results for rerun in result["reruns"]]
+    print(f"first page   median {statistics.median(first_pages):7.1f} ms   (min {min(first_pages):.1f}, max {max(first_pages):.1f}, {args.runs} interpreters)")
+    print(f"rerun        median {statistics.median(reruns):7.1f} ms   (p90 {sorted(reruns)[int(0.9 * len(reruns))]:.1f}, {len(reruns)} reruns)")
+
+    totals = {}
+    for result in results:
+        for name, micros in result["imports"].items():
+            totals[name] = totals.get(name, 0) + micros
+    ranked = sorted(totals.items(), key=lambda item: -item[1])[:args.top]
+    print(f"\nimports during the first page (cumulative, mean of {args.runs}):")
+    for name, micros in ranked:
+        print(f"  {micros / args.runs / 1000:8.1f} ms  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,143 @@
+"""Build the warm-start content pack: popular topic/level/template combinations generated ahead of time.
+
+Usage:
+    python build_content_pack.py topics.txt                          # one topic per line
+    python build_content_pack.py --from-history 300                  # the 300 most generated topics in the history
+    python build_content_pack.py topics.txt --levels Beginner --templates "Lesson Plan,Topic Summary"
+    python build_content_pack.py topics.txt --out packs/content_pack.bin --workers 4 --rate 2 --pdf-workers 4
+    python build_content_pack.py topics.txt --stub                   # offline, no API keys needed
+
+Every topic is generated for every level and text template, with an empty context as the sidebar sends it.
+Each answer is stored with its cleaned text and rendered PDF, under the fingerprint of the current prompt
+templates: the app maps the pack at startup (content_pack.py) and stops serving it once a template changes.
+Answers go through the response cache, so re-running after a failure or a template change only pays for
+what is missing. The new pack replaces the old one in one step; running apps pick it up when they restart.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Local modules read their settings from the environment, so they are imported after load_dotenv()
+from batch_generate import StageStats, render_pdf
+from content import (MODEL_NAME, PROMPT_TEMPLATES_VERSION, TEXT_TEMPLATE_TYPES, generate_content, get_prompt_template,
+                     remove_all_asterisks)
+from content_pack import ContentPackWriter, content_pack_path
+from history import get_generation_history, topic_key
+from pdf_cache import pdf_artifact_key
+from rate_limit import TokenBucket
+from response_cache import make_cache_key
+
+LEVELS = ["Beginner", "Intermediate", "Advanced"]
+# The sidebar's text templates (Tutorials is a YouTube lookup, served by the search cache)
+TEMPLATES = ["Lesson Plan", "Try it yourself", "Quiz Answer Sheet", "Topic Summary"]
+
+
+#Function | Topics from a text file, one per line ('#' starts a comment); repeats are dropped
+def read_topics(path):
+    topics = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            topic = line.split('#', 1)[0].strip()
+            if topic:
+                topics.setdefault(topic_key(topic), topic)
+    return list(topics.values())
+
+
+def build_pack(topics, out_path, levels=LEVELS, templates=TEMPLATES, workers=4, pdf_workers=2, rate=2.0, temperature=0.7):
+    limiter = TokenBucket(rate, capacity=max(1, workers))
+    stats = StageStats('generate', 'pdf')
+    failed = []
+
+    def generate(template_type, topic, learner_level):
+        prompt = get_prompt_template(template_type, topic, learner_level, "")
+        limiter.acquire()
+        start = time.perf_counter()
+        result = generate_content(prompt, temperature=temperature, topic=topic)
+        stats.record('generate', time.perf_counter() - start, error='error' in result)
+        return (template_type, topic, learner_level), prompt, result
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pack-generate") as generate_pool, \
+            ProcessPoolExecutor(max_workers=pdf_workers) as pdf_pool, \
+            ContentPackWriter(out_path, PROMPT_TEMPLATES_VERSION) as writer:
+        # future -> None for a generation, the PDF's artifact key for a rendering
+        pending = {generate_pool.submit(generate, template_type, topic, learner_level): None
+                   for topic in topics for learner_level in levels for template_type in templates}
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                artifact_key = pending.pop(future)
+                if artifact_key is not None:
+                    try:
+                        data, seconds = future.result()
+                    except Exception as e:
+                        stats.record('pdf', 0.0, error=True)
+                        print(f"PDF failed: {e}", file=sys.stderr)
+                        continue
+                    stats.record('pdf', seconds)
+                    writer.add(artifact_key, data)
+                    continue
+                combination, prompt, result = future.result()
+                if 'error' in result:
+                    failed.append((combination, result['error']))
+                    continue
+                clean = remove_all_asterisks(result['output'])
+                writer.add_json(make_cache_key(MODEL_NAME, prompt, temperature),
+                                {'output': result['output'], 'clean': clean, 'token_usage': result['token_usage']})
+                pending[pdf_pool.submit(render_pdf, clean, "pack.pdf")] = pdf_artifact_key(clean)
+        entries, raw_bytes = len(writer), writer.raw_bytes
+
+    wall_time = time.perf_counter() - start_time
+    return stats, wall_time, failed, entries, raw_bytes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the CodeSnack warm-start content pack.")
+    parser.add_argument('topics', nargs='?', help="text file with one topic per line")
+    parser.add_argument('--from-history', type=int, metavar='N', help="use the N most generated topics in the history")
+    parser.add_argument('--out', help="pack file (default: CODESNACK_CONTENT_PACK_PATH or the cache directory)")
+    parser.add_argument('--levels', default=",".join(LEVELS), help="learner levels, comma separated")
+    parser.add_argument('--templates', default=",".join(TEMPLATES), help="content types, comma separated")
+    parser.add_argument('--workers', type=int, default=4, help="concurrent API calls (default: 4)")
+    parser.add_argument('--rate', type=float, default=2.0, help="max API calls started per second (default: 2)")
+    parser.add_argument('--pdf-workers', type=int, default=os.cpu_count() or 2, help="PDF rendering processes")
+    parser.add_argument('--temperature', type=float, default=0.7)
+    parser.add_argument('--stub', action='store_true', help="use the offline stub model instead of Gemini")
+    args = parser.parse_args(argv)
+
+    if args.stub:
+        os.environ['CODESNACK_BACKEND'] = 'stub'
+    if args.topics:
+        topics = read_topics(args.topics)
+    elif args.from_history:
+        topics = [topic for topic, _ in get_generation_history().popular_topics(args.from_history)]
+    else:
+        parser.error("give a topics file or --from-history N")
+    templates = [name.strip() for name in args.templates.split(",") if name.strip()]
+    unknown = [name for name in templates if name not in TEXT_TEMPLATE_TYPES]
+    if unknown:
+        parser.error(f"no text template for: {', '.join(unknown)}")
+    levels = [level.strip() for level in args.levels.split(",") if level.strip()]
+
+    out_path = args.out or content_pack_path()
+    stats, wall_time, failed, entries, raw_bytes = build_pack(
+        topics, out_path, levels=levels, templates=templates, workers=args.workers, pdf_workers=args.pdf_workers,
+        rate=args.rate, temperature=args.temperature)
+    for (template_type, topic, learner_level), error in failed:
+        print(f"{template_type} / {topic} / {learner_level}: {error}", file=sys.stderr)
+    size = os.path.getsize(out_path)
+    print(f"Wrote {out_path} in {wall_time:.2f}s: {entries} records ({len(topics)} topics x {len(levels)} levels x "
+          f"{len(templates)} templates, {len(failed)} failed), {size / 2**20:.1f} MB ({raw_bytes / 2**20:.1f} MB uncompressed)")
+    print(f"Prompt templates version {PROMPT_TEMPLATES_VERSION[:12]}")
+    print(stats.report(wall_time))
+    return 1 if failed or any(entry['errors'] for entry in stats.stages.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,622 @@
+import contextvars
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from content_pack import get_content_pack
+from copilot_cache import copilot_cache_key, get_copilot_cache
+from dispatcher import Abandoned, get_gemini_dispatcher
+from pdf_render import render_text_pdf
+from resources import execute_request, get_gemini_model, get_youtube_client
+from response_cache import get_response_cache, make_cache_key
+from router import get_model_router
+from semantic_cache import SEMANTIC_CACHE, get_semantic_cache, prompt_shape
+from speculation import SPECULATIVE_MODE, run_speculative
+from token_usage import MAX_OUTPUT_TOKENS, enforce_prompt_budget, estimate_tokens, get_token_ledger, usage_from_response
+from topic_classifier import lookup_topic_verdict, record_remote_verdict
+from tracing import span, trace_labels
+from youtube_cache import get_youtube_search_cache
+
+# Content generation used by the Streamlit app (App.py) and the batch runner (batch_generate.py).
+# Nothing in here touches Streamlit, so it can be imported headless.
+
+MODEL_NAME = 'gemini-1.5-flash'
+
+#Function | Ask Gemini whether an ambiguous topic is programming-related
+# The call's tokens go to the ledger as classifier tokens; pass a dict as usage to get them back as well
+def ask_gemini_classifier(topic, usage=None):
+    classifier_model = get_gemini_model(MODEL_NAME)
+    classifier_prompt = f"Is the following topic related to programming or software development? Answer only 'yes' or 'no'. Topic: {topic}"
+    with span("classifier"):
+        response = get_gemini_dispatcher().call(lambda: classifier_model.generate_content(classifier_prompt))
+    tokens = usage_from_response(response)
+    if tokens:
+        get_token_ledger().record(classifier_tokens=tokens['total_tokens'], requests=0)
+        if usage is not None:
+            usage.update(tokens)
+    return response.text.strip().lower()
+
+# topic (optional) is what gets classified; without it the whole prompt is classified
+# speculative=True overlaps the Gemini topic check with the generation (defaults to CODESNACK_SPECULATIVE)
+# use_cache=False skips the response cache entirely, refresh=True regenerates and overwrites the cached entry
+# on_chunk(text) switches to a streamed Gemini response and is called with each raw chunk as it arrives;
+# it may raise dispatcher.Abandoned to stop the request (nothing is cached, waiting identical requests take over)
+# Identical requests from different sessions that overlap are sent once; the others get 'coalesced': True
+# The answer comes from the backend router.py picks (Gemini first); 'route' says which one and whether it was hedged
+# With a topic, the answer to an earlier, near-identical topic in the same prompt (say "For-loops in Python" for
+# "python for loops") is a cache hit too; it comes back with 'semantic': {'topic', 'similarity'}
+# Before any of that, a prompt prebuilt into the warm-start content pack is served from it with 'packed': True
+def generate_content(prompt, temperature=0.7, use_cache=True, refresh=False, topic=None, speculative=SPECULATIVE_MODE, on_chunk=None):
+    start_time = time.time()
+
+    cache = get_response_cache()
+    cache_key = make_cache_key(MODEL_NAME, prompt, temperature)
+    shape = prompt_shape(MODEL_NAME, prompt, topic, temperature) if SEMANTIC_CACHE and use_cache else None
+    if use_cache and not refresh:
+        cached = _packed_result(cache_key, start_time, on_chunk)
+        if cached is None:
+            cached = _cached_result(cache, cache_key, start_time, on_chunk)
+        if cached is None and shape is not None:
+            cached = _semantic_result(cache, cache_key, shape, topic, start_time, on_chunk)
+        if cached is not None:
+            return cached
+
+    def generate():
+        # The previous identical request may have finished between the lookup above and now
+        if use_cache and not refresh:
+            cached = _cached_result(cache, cache_key, start_time, on_chunk)
+            if cached is not None:
+                return cached
+        result = _generate_uncached(prompt, temperature, use_cache, topic, speculative, on_chunk, cache, cache_key, start_time)
+        if shape is not None and 'output' in result and not result.get('cached'):
+            get_semantic_cache().add(shape, topic, cache_key)
+        return result
+
+    result, coalesced = get_gemini_dispatcher().coalesce(cache_key, generate)
+    if not coalesced:
+        return result
+    # Waiters share the leader's answer but spent no tokens of their own, and saw no stream
+    if on_chunk is not None and 'output' in result:
+        on_chunk(result['output'])
+    return dict(result, coalesced=True, generation_time=round(time.time() - start_time, 2))
+
+
+def _cached_result(cache, cache_key, start_time, on_chunk):
+    cached = cache.get(cache_key)
+    if cached is None:
+        return None
+    if on_chunk is not None:
+        on_chunk(cached['output'])
+    return {
+        'output': cached['output'],
+        'generation_time': round(time.time() - start_time, 4),
+        'token_usage': cached['token_usage'],
+        'cached': True
+    }
+
+
+# Answer built offline into the warm-start content pack (build_content_pack.py), with its cleaned text
+def _packed_result(cache_key, start_time, on_chunk):
+    pack = get_warm_pack()
+    if not pack.usable:
+        return None
+    with span("pack_lookup"):
+        packed = pack.get_json(cache_key)
+    if packed is None:
+        return None
+    if on_chunk is not None:
+        on_chunk(packed['output'])
+    return {
+        'output': packed['output'],
+        'clean': packed['clean'],
+        'generation_time': round(time.time() - start_time, 4),
+        'token_usage': packed['token_usage'],
+        'cached': True,
+        'packed': True
+    }
+
+
+# Closest earlier topic in the same prompt; its answer is also stored under this prompt's own key,
+# so asking again is an exact hit
+def _semantic_result(cache, cache_key, shape, topic, start_time, on_chunk):
+    semantic = get_semantic_cache()
+    with span("semantic_lookup"):
+        match = semantic.lookup(shape, topic)
+    if match is None:
+        return None
+    cached = cache.get(match['key'])
+    if cached is None:
+        # The response cache has dropped that answer since
+        semantic.forget(match['key'])
+        return None
+    cache.set(cache_key, cached)
+    if on_chunk is not None:
+        on_chunk(cached['output'])
+    return {
+        'output': cached['output'],
+        'generation_time': round(time.time() - start_time, 4),
+        'token_usage': cached['token_usage'],
+        'cached': True,
+        'semantic': {'topic': match['topic'], 'similarity': match['similarity']}
+    }
+
+
+def _generate_uncached(prompt, temperature, use_cache, topic, speculative, on_chunk, cache, cache_key, start_time):
+    try:
+        ledger = get_token_ledger()
+        ledger.check_daily_budget()
+        # Gemini counts the prompt's tokens; the answer comes from whichever backend the router picks
+        model = get_gemini_model(MODEL_NAME)
+        router = get_model_router(MODEL_NAME)
+        # Runaway prompts are rejected (or truncated) here, before anything is sent
+        prompt, preflight_tokens, prompt_truncated = enforce_prompt_budget(model, prompt)
+        generation_config = {"temperature": temperature}
+        if MAX_OUTPUT_TOKENS:
+            generation_config["max_output_tokens"] = MAX_OUTPUT_TOKENS
+
+        # Step 1: Check if the topic is programming-related (local classifier first, Gemini only when unsure)
+        subject = topic or prompt
+        stream = on_chunk is not None
+        classifier_usage = {}
+        response = None
+        route = None
+        speculation = None
+        generation_start = None
+        classification = lookup_topic_verdict(subject)
+        if classification is None:
+            if speculative:
+                generation_start = time.perf_counter()
+                # Ask Gemini for the verdict and start generating in parallel; the draft is dropped on a "no"
+                answer, routed, speculation = run_speculative(
+                    lambda: ask_gemini_classifier(subject, classifier_usage),
+                    lambda: router.generate(prompt, generation_config=generation_config, stream=stream)
+                )
+                if routed is not None:
+                    response, route = routed
+            else:
+                answer = ask_gemini_classifier(subject, classifier_usage)
+            classification = record_remote_verdict(subject, answer)
+
+        # Only allow exact match
+        if classification['verdict'] != "yes":
+            if 'answer' in classification:
+                reason = f"Gemini said: {classification['answer']}"
+            else:
+                reason = f"Local classifier confidence: {classification['confidence']}"
+            return {
+                'error': f"🚫 This topic does not appear to be related to programming or software development. {reason}"
+            }
+
+        # Step 2: If valid, generate the actual content (already started when the speculative call was kept)
+        streaming = None
+        generation_start = generation_start or time.perf_counter()
+        with span("generation", start=generation_start):
+            if response is None:
+                response, route = router.generate(prompt, generation_config=generation_config, stream=stream)
+            if stream:
+                output, streaming = consume_stream(response, on_chunk, start_time)
+            else:
+                output = response.text
+        generation_seconds = time.perf_counter() - generation_start
+
+        # Streamed responses only carry usage_metadata once they have been read to the end
+        token_usage = usage_from_response(response)
+        if token_usage is None:
+            prompt_tokens = preflight_tokens or estimate_tokens(prompt)
+            completion_tokens = estimate_tokens(output)
+            token_usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                           'total_tokens': prompt_tokens + completion_tokens, 'estimated': True}
+        ledger.record(prompt_tokens=token_usage['prompt_tokens'], completion_tokens=token_usage['completion_tokens'])
+
+        end_time = time.time()
+        result = {
+            'output': output,
+            'generation_time': round(end_time - start_time, 2),
+            'token_usage': token_usage,
+            'tokens_per_sec': round(token_usage['completion_tokens'] / generation_seconds, 1) if generation_seconds > 0 else None,
+            'classifier_tokens': classifier_usage.get('total_tokens', 0),
+            'preflight_prompt_tokens': preflight_tokens,
+            'prompt_truncated': prompt_truncated,
+            'cached': False,
+            'classifier': classification,
+            'speculation': speculation,
+            'streaming': streaming,
+            'route': route
+        }
+        if use_cache:
+            cache.set(cache_key, {'output': result['output'], 'token_usage': result['token_usage']})
+        return result
+
+    except Abandoned:
+        raise
+    except Exception as e:
+        return {'error': str(e)}
+
+
+#Function | Read a streamed Gemini response, forwarding chunks and timing time-to-first-token
+def consume_stream(response, on_chunk, start_time):
+    first_token_time = None
+    parts = []
+    for chunk in response:
+        text = chunk.text
+        if not text:
+            continue
+        if first_token_time is None:
+            first_token_time = time.time()
+        parts.append(text)
+        on_chunk(text)
+    end_time = time.time()
+    output = "".join(parts)
+
+    # Prefer the token count Gemini reports; fall back to the ~4 characters per token rule of thumb
+    usage = usage_from_response(response)
+    completion_tokens = (usage or {}).get('completion_tokens') or estimate_tokens(output)
+    first_token_time = first_token_time or end_time
+    streaming_time = end_time - first_token_time
+    return output, {
+        'time_to_first_token': round(first_token_time - start_time, 2),
+        'tokens_per_sec': round(completion_tokens / streaming_time, 1) if streaming_time > 0 else None,
+        'total_time': round(end_time - start_time, 2)
+    }
+
+    
+#Function | Remove the asterisk
+def remove_all_asterisks(text):
+    if '*' not in text:
+        return text
+
+    # Remove **double asterisks**
+    text = _DOUBLE_ASTERISKS.sub(r'\1', text)
+
+    # Remove *single asterisks*
+    text = _SINGLE_ASTERISKS.sub(r'\1', text)
+
+    return text
+
+_DOUBLE_ASTERISKS = re.compile(r'\*\*(.*?)\*\*')
+_SINGLE_ASTERISKS = re.compile(r'\*(.*?)\*')
+
+#Function | Text for the output boxes: asterisks stripped, '<' and '>' escaped, newlines turned into <br>
+# Not a single pass: the two asterisk regexes (the second pairs across what the first removed, so they cannot be
+# merged), then three str.replace scans, which beat one alternation regex with a replacement map 1.5-4x
+# (see benchmarks/sanitizer_bench.py)
+def sanitize_output_html(text):
+    return remove_all_asterisks(text).replace('<', '&lt;').replace('>', '&gt;').replace('\n', '<br>')
+
+# Streaming version of sanitize_output_html. The asterisk patterns never span a newline, so each line is
+# sanitized exactly once, when its newline arrives (a '**' split across chunks is still paired correctly).
+# Only the unfinished last line is re-sanitized per chunk, provisionally.
+class OutputSanitizer:
+    def __init__(self):
+        self.html = ""
+        self.pending = ""
+
+    # Returns the HTML for everything received so far
+    def feed(self, chunk):
+        complete, newline, self.pending = (self.pending + chunk).rpartition('\n')
+        if newline:
+            self.html += sanitize_output_html(complete + newline)
+        return self.html + sanitize_output_html(self.pending)
+
+#Function | Convert to pdf (wrapping uses real font metrics, see pdf_render.py)
+def text_to_pdf(text, filename):
+    return render_text_pdf(text)
+
+#Function | Fetch one batch of search results from the YouTube Data API
+def fetch_youtube_videos(query, max_results):
+    youtube = get_youtube_client()
+   
+    request = youtube.search().list(
+        part='snippet',
+        q=query,
+        type='video',
+        maxResults=max_results
+    )
+   
+    response = execute_request(request)
+
+    videos = []
+    for video in response['items']:
+        video_id = video['id']['videoId']
+        videos.append({
+            'url': f'https://www.youtube.com/watch?v={video_id}',
+            'title': video['snippet']['title'],
+            'thumbnail': video['snippet']['thumbnails']['default']['url']
+        })
+    return videos
+
+# Function to search for YouTube videos (served from the search cache; the rest of the batch comes back as alternates)
+# None when the search found nothing; when it was not run at all (quota nearly used up, nothing saved) the result
+# has no 'url', only source 'none' and the reason
+def search_youtube_videos(query):
+    with span("youtube_search"):
+        search = get_youtube_search_cache().search(query, fetch_youtube_videos)
+    videos = search['videos']
+
+    if videos:
+        return dict(videos[0], alternates=videos[1:], source=search['source'], reason=search.get('reason'))
+    elif search.get('reason'):
+        return {'alternates': [], 'source': search['source'], 'reason': search['reason']}
+    else:
+        return None
+    
+
+# Prompt templates specifically for Software Development Education (None for Tutorials and unknown types)
+def get_prompt_template(template_type, topic, learner_level, context):
+    base_prompt = ""
+    if template_type == "Lesson Plan":
+        base_prompt = f"Create a comprehensive 1-hour lesson plan on '{topic}' for {learner_level} youth learning software development. Include learning objectives, materials needed, and step-by-step teaching activities. Context: {context}"
+    elif template_type == "Study Guide":
+        base_prompt = f"Generate a study guide summarizing the key points of '{topic}' for {learner_level} students studying software development. Include bullet points and 5 quiz questions. Context: {context}"
+    elif template_type == "Tutorials":
+        return None
+    elif template_type == "Quiz Answer Sheet":
+        base_prompt = f"Provide an answer sheet for a 5-question quiz on the topic '{topic}' in software development. Context: {context}"
+    elif template_type == "Topic Summary":
+        base_prompt = f"Summarize the topic '{topic}' in simple terms for {learner_level} students beginning their software development journey. Context: {context}"
+    elif template_type == "Try it yourself":
+        base_prompt = f"Generate a hands-on practice exercise for learners on the topic '{topic}' in software development. The activity should include a description, starter code, and instructions to complete the task. Target Level: {learner_level}. Context: {context}"
+    else:
+        return None
+           
+    #instructions to add emojis that's relevant where needed
+    base_prompt += FORMAT_INSTRUCTIONS
+    return base_prompt
+
+FORMAT_INSTRUCTIONS = "\n\nMake sure to add relevant emojis next to important points or headings instead of using bold formatting. If there are lists, use either unordered lists (bullets) or ordered lists (numbers) — do not use asterisks (*) for lists. Ensure the text is presented cleanly and neatly."
+
+# Every template with a text prompt (Tutorials is a YouTube lookup)
+TEXT_TEMPLATE_TYPES = ["Lesson Plan", "Try it yourself", "Quiz Answer Sheet", "Topic Summary", "Study Guide"]
+
+#Function | Fingerprint of the model and the wording of every prompt template
+# A content pack built under another fingerprint is stale: changing any template's wording retires it
+def prompt_templates_version():
+    templates = [get_prompt_template(template_type, "{topic}", "{learner_level}", "{context}") for template_type in TEXT_TEMPLATE_TYPES]
+    return hashlib.sha256(json.dumps([MODEL_NAME, templates]).encode("utf-8")).hexdigest()
+
+PROMPT_TEMPLATES_VERSION = prompt_templates_version()
+
+#Function | The warm-start content pack for the running prompt templates (opened once per process, see content_pack.py)
+def get_warm_pack():
+    return get_content_pack(PROMPT_TEMPLATES_VERSION)
+
+# Content types bundled into a course pack (Tutorials is added as a YouTube lookup)
+COURSE_PACK_TYPES = ["Lesson Plan", "Try it yourself", "Quiz Answer Sheet", "Topic Summary"]
+COURSE_PACK_WORKERS = int(os.getenv("CODESNACK_COURSE_PACK_WORKERS", 5))
+
+# Runs on a course pack worker thread, so each call's spans carry its own content type
+def _generate_pack_item(pack_type, prompt, refresh, topic, on_chunk):
+    with trace_labels(template=pack_type):
+        return generate_content(prompt, refresh=refresh, topic=topic,
+                                on_chunk=None if on_chunk is None else lambda chunk: on_chunk(pack_type, chunk))
+
+#Function | Run every course pack call concurrently and yield (content type, result) as each one finishes
+# on_chunk(pack_type, text) streams every call, as for generate_content
+def build_course_pack(topic, learner_level, context, refresh=False, on_chunk=None):
+    with ThreadPoolExecutor(max_workers=COURSE_PACK_WORKERS, thread_name_prefix="course-pack") as executor:
+        futures = {}
+        for pack_type in COURSE_PACK_TYPES:
+            prompt = get_prompt_template(pack_type, topic, learner_level, context)
+            futures[executor.submit(_generate_pack_item, pack_type, prompt, refresh, topic, on_chunk)] = pack_type
+        futures[executor.submit(contextvars.copy_context().run, search_youtube_videos, topic)] = "Tutorials"
+
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                yield futures[future], {'error': str(e)}
+
+
+# Long templates written as independent sections at the same time (see build_sectioned_document):
+# content type -> [(section heading, what the section has to contain)]
+SECTIONED_TEMPLATES = {
+    "Lesson Plan": [
+        ("🎯 Learning Objectives", "3 to 5 measurable learning objectives for the 1-hour lesson"),
+        ("🧰 Materials Needed", "the materials, tools and software needed, with a short reason for each"),
+        ("🪜 Teaching Activities", "step-by-step teaching activities that fill the hour, with the minutes each step takes"),
+        ("✅ Assessment and Wrap-up", "how to check understanding at the end of the lesson, with 3 short check questions"),
+    ],
+    "Study Guide": [
+        ("📌 Key Points", "the key points of the topic as bullet points, each with a one-sentence explanation"),
+        ("💡 Examples", "2 or 3 short, commented code examples that illustrate the key points"),
+        ("📝 Quiz Questions", "5 quiz questions on the key points, with the answers after the questions"),
+    ],
+}
+SECTIONED_MODE = os.getenv("CODESNACK_SECTIONED", "false").lower() in ("1", "true", "yes", "on")
+SECTION_WORKERS = int(os.getenv("CODESNACK_SECTION_WORKERS", 4))
+
+#Function | Prompt for the short outline every section of a sectioned document is written against
+def get_outline_prompt(template_type, topic, learner_level, context):
+    headings = "; ".join(heading for heading, _ in SECTIONED_TEMPLATES[template_type])
+    return (f"Write a short outline for a {template_type.lower()} on '{topic}' for {learner_level} youth learning software development. "
+            f"Give one line per section, in this order: {headings}. Each line names the section and, in at most 15 words, "
+            f"what it covers. Reply with the outline only. Context: {context}")
+
+#Function | Prompt for one section of a sectioned document
+def get_section_prompt(template_type, topic, learner_level, context, outline, heading, contents):
+    return (f"You are writing one section of a {template_type.lower()} on '{topic}' for {learner_level} youth learning software development. "
+            f"The whole document follows this outline:\n{outline}\n\n"
+            f"Write only the '{heading}' section: {contents}. Do not write the other sections, a title for the whole document "
+            f"or the section heading itself. Context: {context}" + FORMAT_INSTRUCTIONS)
+
+# Runs on a section worker thread; on_chunk(heading, text) streams the section
+def _generate_section(template_type, topic, learner_level, context, outline, heading, contents, temperature, refresh, on_chunk):
+    prompt = get_section_prompt(template_type, topic, learner_level, context, outline, heading, contents)
+    with span("section", section=heading):
+        return generate_content(prompt, temperature=temperature, refresh=refresh, topic=topic,
+                                on_chunk=None if on_chunk is None else lambda chunk: on_chunk(heading, chunk))
+
+#Function | A SECTIONED_TEMPLATES document written section by section at the same time, in generate_content's result format
+# A short outline is generated first so the sections agree with each other; then every section is asked for at once
+# and the answers are joined in template order under their headings. Generation time grows with output length, so
+# the document takes about as long as its longest section instead of all of them added up.
+# on_chunk(heading, text) streams every section, on_section(heading, result) is called as each one finishes.
+# The result adds 'sections' (per-section timings, in order), 'outline' and 'parallel' (wall time against sequential time).
+# A document prebuilt into the warm-start content pack (as one call) is served from it whole, without those.
+def build_sectioned_document(template_type, topic, learner_level, context, temperature=0.7, refresh=False, on_chunk=None, on_section=None):
+    start_time = time.time()
+    if not refresh:
+        prompt = get_prompt_template(template_type, topic, learner_level, context)
+        packed = _packed_result(make_cache_key(MODEL_NAME, prompt, temperature), start_time, None)
+        if packed is not None:
+            return packed
+    outline_result = generate_content(get_outline_prompt(template_type, topic, learner_level, context),
+                                      temperature=temperature, refresh=refresh, topic=topic)
+    if 'error' in outline_result:
+        return outline_result
+    outline = outline_result['output'].strip()
+
+    sections = SECTIONED_TEMPLATES[template_type]
+    results = {}
+    executor = ThreadPoolExecutor(max_workers=SECTION_WORKERS, thread_name_prefix="sections")
+    try:
+        futures = {
+            executor.submit(contextvars.copy_context().run, _generate_section, template_type, topic, learner_level, context,
+                            outline, heading, contents, temperature, refresh, on_chunk): heading
+            for heading, contents in sections
+        }
+        for future in as_completed(futures):
+            heading = futures[future]
+            try:
+                results[heading] = future.result()
+            except Abandoned:
+                raise
+            except Exception as e:
+                results[heading] = {'error': str(e)}
+            if on_section is not None:
+                on_section(heading, results[heading])
+    finally:
+        # A cancelled document leaves the sections that have not started behind
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    for heading, _ in sections:
+        if 'error' in results[heading]:
+            return {'error': f"{heading}: {results[heading]['error']}"}
+
+    ordered = [outline_result] + [results[heading] for heading, _ in sections]
+    # Tokens are the ones this document spent; a document served entirely from the cache reports what it once cost
+    spent = [result for result in ordered if not result.get('cached') and not result.get('coalesced')] or ordered
+    prompt_tokens = sum(result['token_usage']['prompt_tokens'] for result in spent)
+    completion_tokens = sum(result['token_usage']['completion_tokens'] for result in spent)
+    wall_time = round(time.time() - start_time, 2)
+    sequential_time = round(sum(result['generation_time'] for result in ordered), 2)
+    return {
+        'output': "\n\n".join(f"{heading}\n{results[heading]['output'].strip()}" for heading, _ in sections),
+        'generation_time': wall_time,
+        'token_usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                        'total_tokens': prompt_tokens + completion_tokens,
+                        'estimated': any(result['token_usage'].get('estimated') for result in spent)},
+        'classifier_tokens': sum(result.get('classifier_tokens', 0) for result in spent),
+        'cached': all(result.get('cached') for result in ordered),
+        'coalesced': all(result.get('coalesced') for result in ordered),
+        'outline': {'generation_time': outline_result['generation_time'], 'cached': bool(outline_result.get('cached'))},
+        'sections': [{'heading': heading, 'generation_time': results[heading]['generation_time'],
+                      'cached': bool(results[heading].get('cached')),
+                      'completion_tokens': results[heading]['token_usage']['completion_tokens']}
+                     for heading, _ in sections],
+        'parallel': {'wall_time': wall_time, 'sequential_time': sequential_time,
+                     'time_saved': round(sequential_time - wall_time, 2)}
+    }
+
+
+# Practice Arena starter snippets (activity -> code); their Copilot answers are worked out at startup
+PRACTICE_ACTIVITIES = {
+    "Basic HTML Page": """
+<!DOCTYPE html>
+<html>
+  <body>
+    <h1>Welcome!</h1>
+    <p>This is a basic HTML page.</p>
+  </body>
+</html>
+""",
+    "CSS Styling Example": """
+<!DOCTYPE html>
+<html>
+  <head>
+    <style>
+      p { color: blue; font-size: 20px; }
+    </style>
+  </head>
+  <body>
+    <p>This paragraph is styled with CSS!</p>
+  </body>
+</html>
+""",
+    "Simple JS Alert": """
+<!DOCTYPE html>
+<html>
+  <body>
+    <h2>Click the button for a message</h2>
+    <button onclick="alert('Hello from JavaScript!')">Click Me</button>
+  </body>
+</html>
+""",
+    "Interactive Button": """
+<!DOCTYPE html>
+<html>
+  <body>
+    <button onclick="document.getElementById('demo').innerHTML='You clicked me!'">Click me</button>
+    <p id="demo"></p>
+  </body>
+</html>
+""",
+}
+COPILOT_INSTRUCTIONS = "Explain and improve the following HTML/CSS/JavaScript code for a beginner:"
+
+#Function | Copilot prompt for Practice Arena code
+def get_copilot_prompt(code):
+    return f"{COPILOT_INSTRUCTIONS}\n\n{code}"
+
+#Function | Copilot answer for code explained before, in generate_content's result format, or None
+# Code is matched on its fingerprint (copilot_cache.py), so whitespace and comment edits still hit
+def cached_code_explanation(code, temperature=0.7):
+    start_time = time.time()
+    with span("copilot_lookup"):
+        cached = get_copilot_cache().get(copilot_cache_key(MODEL_NAME, COPILOT_INSTRUCTIONS, code, temperature))
+    if cached is None:
+        return None
+    return {
+        'output': cached['output'],
+        'generation_time': round(time.time() - start_time, 4),
+        'token_usage': cached['token_usage'],
+        'cached': True,
+        'fingerprint_match': True
+    }
+
+#Function | The Copilot's explanation of Practice Arena code, from the fingerprint cache when the code was explained before
+# on_chunk streams a fresh answer as for generate_content (a cached one arrives as a single chunk)
+def explain_code(code, temperature=0.7, refresh=False, on_chunk=None):
+    if not refresh:
+        cached = cached_code_explanation(code, temperature)
+        if cached is not None:
+            if on_chunk is not None:
+                on_chunk(cached['output'])
+            return cached
+    result = generate_content(get_copilot_prompt(code), temperature=temperature, refresh=refresh, on_chunk=on_chunk)
+    if 'output' in result:
+        get_copilot_cache().set(copilot_cache_key(MODEL_NAME, COPILOT_INSTRUCTIONS, code, temperature),
+                                {'output': result['output'], 'token_usage': result['token_usage']})
+    return result
+
+#Function | Explain every starter snippet not in the Copilot cache yet, one at a time; returns {activity: result} of those
+# Called once per process (App.py runs it on a daemon thread), so most Copilot clicks are answered locally
+def precompute_copilot_answers(temperature=0.7):
+    copilot_cache = get_copilot_cache()
+    results = {}
+    with trace_labels(template="Copilot"):
+        for activity, code in PRACTICE_ACTIVITIES.items():
+            key = copilot_cache_key(MODEL_NAME, COPILOT_INSTRUCTIONS, code, temperature)
+            if copilot_cache.get(key, count=False) is not None:
+                continue
+            try:
+                result = generate_content(get_copilot_prompt(code), temperature=temperature)
+            except Exception as e:
+                result = {'error': str(e)}
+            if 'output' in result:
+                copilot_cache.set(key, {'output': result['output'], 'token_usage': result['token_usage']}, precomputed=True)
+            results[activity] = result
+    return results
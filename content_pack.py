@@ -0,0 +1,213 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+from pdf_cache import get_pdf_cache
+from response_cache import get_cache_dir
+from tracing import register_metrics
+
+# ✅ Warm-start content pack settings (the pack itself is built offline with build_content_pack.py)
+CONTENT_PACK = os.getenv("CODESNACK_CONTENT_PACK", "true").lower() in ("1", "true", "yes", "on")
+CONTENT_PACK_PATH = os.getenv("CODESNACK_CONTENT_PACK_PATH", "")    # default: content_pack.bin in the cache directory
+
+PACK_MAGIC = b"CSNKPACK"
+PACK_FORMAT = 1     # bump whenever the layout below changes; packs of another format are not read
+# Layout: header, zlib-compressed records, then the index sorted by key.
+# Header: magic, format, prompt templates version (sha256), built at, entries, index offset
+_HEADER = struct.Struct("<8sH32sdIQ")
+# Index entry: key (first 16 bytes of a sha256 hex key), record offset, record length
+_INDEX_ENTRY = struct.Struct("<16sQI")
+_KEY_BYTES = 16
+
+
+#Function | Index key of a response cache key or PDF artifact key (both sha256 hex digests)
+def pack_key(key):
+    return bytes.fromhex(key[:2 * _KEY_BYTES])
+
+
+class ContentPackWriter:
+    """Writes a pack record by record to a temporary file; close() appends the sorted index and moves it into place.
+
+    Apps that have the old pack mapped keep reading it until they restart, since the file is replaced, not rewritten.
+    """
+
+    def __init__(self, path, template_version):
+        self.path = path
+        self.template_version = template_version
+        self._temporary = f"{path}.{os.getpid()}.tmp"
+        self._file = open(self._temporary, "wb")
+        self._file.write(b"\0" * _HEADER.size)
+        self._index = {}    # pack key -> (offset, length)
+        self.raw_bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            os.remove(self._temporary)
+
+    def add(self, key, payload):
+        record = zlib.compress(payload, 9)
+        self._index[pack_key(key)] = (self._file.tell(), len(record))
+        self._file.write(record)
+        self.raw_bytes += len(payload)
+
+    def add_json(self, key, value):
+        self.add(key, json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+    def close(self):
+        index_offset = self._file.tell()
+        for key in sorted(self._index):
+            self._file.write(_INDEX_ENTRY.pack(key, *self._index[key]))
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(PACK_MAGIC, PACK_FORMAT, bytes.fromhex(self.template_version), time.time(),
+                                      len(self._index), index_offset))
+        self._file.close()
+        os.replace(self._temporary, self.path)
+
+    def __len__(self):
+        return len(self._index)
+
+
+class ContentPack:
+    """Read-only, memory-mapped pack of prebuilt answers and PDFs, found by binary search over its sorted index.
+
+    Opening it reads the header only; the OS pages in the parts of the index and the records that are asked
+    for, so the app's memory does not grow with the size of the pack.
+    """
+
+    def __init__(self, path, template_version):
+        self.path = path
+        self.status = "disabled" if path is None else "missing"
+        self.entries = 0
+        self.built_at = None
+        self.size = 0
+        self._mmap = None
+        self._index_offset = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "bytes_served": 0}
+        if path is None or not os.path.exists(path):
+            return
+
+        with open(path, "rb") as f:
+            self.size = os.fstat(f.fileno()).st_size
+            if self.size < _HEADER.size:
+                self.status = "unreadable"
+                return
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(mmap, "MADV_RANDOM"):
+            # Lookups jump around the file, so reading ahead of a page that was asked for only fetches records nobody wants
+            self._mmap.madvise(mmap.MADV_RANDOM)
+        magic, pack_format, version, self.built_at, self.entries, self._index_offset = _HEADER.unpack_from(self._mmap, 0)
+        if magic != PACK_MAGIC or self._index_offset + self.entries * _INDEX_ENTRY.size > self.size:
+            self.status = "unreadable"
+        elif pack_format != PACK_FORMAT:
+            self.status = f"format {pack_format}, expected {PACK_FORMAT}"
+        elif version.hex() != template_version:
+            # The prompt templates changed since the pack was built: its answers are for prompts nobody sends any more
+            self.status = "stale"
+        else:
+            self.status = "ok"
+            return
+        self.close()
+
+    @property
+    def usable(self):
+        return self.status == "ok"
+
+    # (offset, length) of the key's record, or None
+    def _find(self, key):
+        if not self.usable:
+            return None
+        target = pack_key(key)
+        low, high = 0, self.entries
+        while low < high:
+            middle = (low + high) // 2
+            position = self._index_offset + middle * _INDEX_ENTRY.size
+            found = self._mmap[position:position + _KEY_BYTES]
+            if found < target:
+                low = middle + 1
+            elif found > target:
+                high = middle
+            else:
+                return _INDEX_ENTRY.unpack_from(self._mmap, position)[1:]
+        return None
+
+    def __contains__(self, key):
+        return self._find(key) is not None
+
+    # Decompressed record of the key, or None
+    def get(self, key):
+        location = self._find(key)
+        if location is None:
+            self._count("misses")
+            return None
+        offset, length = location
+        payload = zlib.decompress(self._mmap[offset:offset + length])
+        self._count("hits")
+        self._count("bytes_served", len(payload))
+        return payload
+
+    def get_json(self, key):
+        payload = self.get(key)
+        return json.loads(payload) if payload is not None else None
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats.update(status=self.status, entries=self.entries, size_bytes=self.size, built_at=self.built_at)
+        return stats
+
+    def prometheus_text(self):
+        stats = self.stats()
+        lines = []
+        for name, kind, help_text, value in (
+            ("hits_total", "counter", "Answers and PDFs served from the warm-start pack.", stats["hits"]),
+            ("misses_total", "counter", "Pack lookups that found nothing.", stats["misses"]),
+            ("entries", "gauge", "Records in the pack.", stats["entries"]),
+            ("size_bytes", "gauge", "Size of the pack file.", stats["size_bytes"]),
+        ):
+            lines += [f"# HELP codesnack_content_pack_{name} {help_text}", f"# TYPE codesnack_content_pack_{name} {kind}",
+                      f"codesnack_content_pack_{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+#Function | Where the pack lives: CODESNACK_CONTENT_PACK_PATH, or content_pack.bin in the cache directory
+def content_pack_path():
+    return CONTENT_PACK_PATH or os.path.join(get_cache_dir(), "content_pack.bin")
+
+
+_content_pack = None
+_content_pack_lock = threading.Lock()
+
+
+#Function | Process-wide content pack, opened on first use; template_version is that of the running prompt templates
+def get_content_pack(template_version):
+    global _content_pack
+    with _content_pack_lock:
+        if _content_pack is None:
+            _content_pack = ContentPack(content_pack_path() if CONTENT_PACK else None, template_version)
+            if _content_pack.usable:
+                # Prebuilt PDFs are offered for download straight away instead of being rendered
+                get_pdf_cache().add_source(_content_pack)
+                register_metrics(_content_pack.prometheus_text)
+        return _content_pack
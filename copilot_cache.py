@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import re
+import threading
+
+from response_cache import ResponseCache, get_cache_dir
+from tracing import register_metrics
+
+# ✅ Copilot cache settings: the same exercise code, however it is spaced or commented, is explained once
+COPILOT_PRECOMPUTE = os.getenv("CODESNACK_COPILOT_PRECOMPUTE", "true").lower() in ("1", "true", "yes", "on")
+COPILOT_TTL_SECONDS = int(os.getenv("CODESNACK_COPILOT_TTL", 30 * 24 * 3600))    # the starter snippets rarely change
+
+# One HTML/CSS/JS token at a time. String literals come first so '//' or '<!--' inside quotes is kept,
+# then the comments of the language being read, then words, numbers and symbols.
+_STRING = r""""(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`"""
+_TOKEN = r"[A-Za-z_$][\w$]*|\d+(?:\.\d+)?[A-Za-z%]*|\S"
+
+
+def _tokenizer(comment):
+    return re.compile(rf"(?P<string>{_STRING})|(?P<comment>{comment})|(?P<token>{_TOKEN})", re.S)
+
+
+# HTML outside <script>, CSS included: '//' there is text, a protocol-relative URL (src=//cdn...) or url(//...)
+_MARKUP_TOKEN = _tokenizer(r"<!--.*?-->|/\*.*?\*/")
+# Inside <script>: JavaScript comments
+_SCRIPT_TOKEN = _tokenizer(r"/\*.*?\*/|(?<!\\)//[^\n]*")
+# Code with no markup at all: '//' opens a comment at the start of a line, after whitespace or after a statement
+_CODE_TOKEN = _tokenizer(r"<!--.*?-->|/\*.*?\*/|(?<![^\s;{})])//[^\n]*")
+_MARKUP = re.compile(r"<[A-Za-z!/]")
+_SCRIPT = re.compile(r"(<script\b[^>]*>)(.*?)(?=</script\s*>|$)", re.S | re.I)
+
+
+def _scan(tokenizer, code):
+    return [match.group() for match in tokenizer.finditer(code) if match.lastgroup != "comment"]
+
+
+#Function | Exercise code as tokens: whitespace and comments dropped, string literals kept whole
+def code_tokens(code):
+    if not _MARKUP.search(code):
+        return _scan(_CODE_TOKEN, code)
+    tokens, position = [], 0
+    for script in _SCRIPT.finditer(code):
+        tokens += _scan(_MARKUP_TOKEN, code[position:script.end(1)])
+        tokens += _scan(_SCRIPT_TOKEN, script.group(2))
+        position = script.end()
+    return tokens + _scan(_MARKUP_TOKEN, code[position:])
+
+
+#Function | Canonical hash of exercise code; edits that only touch whitespace or comments keep it
+def code_fingerprint(code):
+    return hashlib.sha256("\x1f".join(code_tokens(code)).encode("utf-8")).hexdigest()
+
+
+#Function | Cache key of an explanation: (model, instructions, code fingerprint, temperature)
+def copilot_cache_key(model_name, instructions, code, temperature):
+    raw = json.dumps([model_name, instructions, code_fingerprint(code), round(float(temperature), 3)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CopilotCache:
+    """Copilot explanations per code fingerprint, so reformatted starter code never reaches Gemini again."""
+
+    def __init__(self, cache_dir=None, ttl=COPILOT_TTL_SECONDS):
+        cache_dir = cache_dir or get_cache_dir()
+        self.answers = ResponseCache(path=os.path.join(cache_dir, "copilot.sqlite3"), ttl=ttl)
+        self._lock = threading.Lock()
+        # A miss is counted when its fresh explanation is stored, so a lookup repeated by the job is not counted twice
+        self._counters = {"hits": 0, "misses": 0, "precomputed": 0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    # {'output', 'token_usage'} of the code's explanation, or None; count=False leaves the hit rate alone
+    def get(self, key, count=True):
+        entry = self.answers.get(key)
+        if count and entry is not None:
+            self._count("hits")
+        return entry
+
+    # precomputed=True for the starter snippets explained at startup
+    def set(self, key, entry, precomputed=False):
+        self.answers.set(key, entry)
+        self._count("precomputed" if precomputed else "misses")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["entries"] = self.answers.stats()["disk_entries"]
+        return stats
+
+    def prometheus_text(self):
+        stats = self.stats()
+        lines = []
+        for name, kind, help_text, value in (
+            ("hits_total", "counter", "Copilot requests answered from the code fingerprint cache.", stats["hits"]),
+            ("misses_total", "counter", "Copilot requests for code not explained before (sent to the model).", stats["misses"]),
+            ("precomputed_total", "counter", "Starter snippets explained at startup.", stats["precomputed"]),
+            ("entries", "gauge", "Explanations in the cache.", stats["entries"]),
+        ):
+            lines += [f"# HELP codesnack_copilot_{name} {help_text}", f"# TYPE codesnack_copilot_{name} {kind}",
+                      f"codesnack_copilot_{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+_copilot_cache = None
+_copilot_cache_lock = threading.Lock()
+
+
+#Function | Process-wide Copilot cache shared by every Streamlit session
+def get_copilot_cache():
+    global _copilot_cache
+    with _copilot_cache_lock:
+        if _copilot_cache is None:
+            _copilot_cache = CopilotCache()
+            register_metrics(_copilot_cache.prometheus_text)
+        return _copilot_cache
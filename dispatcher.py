@@ -0,0 +1,187 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+from rate_limit import TokenBucket
+from tracing import record_span, register_metrics
+
+# ✅ Outbound Gemini call settings (shared by every Streamlit session in the process)
+GEMINI_RATE = float(os.getenv("CODESNACK_GEMINI_RATE", 5))              # calls per second (0 = no limit)
+GEMINI_BURST = int(os.getenv("CODESNACK_GEMINI_BURST", 10))             # calls allowed back to back after a quiet spell
+RETRY_ATTEMPTS = int(os.getenv("CODESNACK_RETRY_ATTEMPTS", 4))          # tries per call, including the first
+RETRY_BASE_SECONDS = float(os.getenv("CODESNACK_RETRY_BASE", 0.5))      # backoff ceiling for the first retry
+RETRY_MAX_SECONDS = float(os.getenv("CODESNACK_RETRY_MAX", 8.0))        # backoff ceiling for any retry
+
+# google.api_core exception classes (matched by name so this module does not import the SDK) and the
+# status codes that show up in their messages; everything else fails straight away
+TRANSIENT_ERRORS = {"ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+                    "DeadlineExceeded", "GatewayTimeout", "BadGateway", "ConnectionError", "TimeoutError"}
+TRANSIENT_CODES = ("429", "500", "502", "503", "504")
+
+
+class BackendBusy(Exception):
+    """A transient error that outlasted every retry."""
+
+
+class Abandoned(Exception):
+    """Raised by a caller that gave up on its own request (e.g. a cancelled job); coalesced waiters carry on."""
+
+
+#Function | True for errors worth retrying: rate limits, overloaded or timed out servers, dropped connections
+def is_transient(error):
+    if any(cls.__name__ in TRANSIENT_ERRORS for cls in type(error).__mro__):
+        return True
+    return str(error).lstrip().startswith(TRANSIENT_CODES)
+
+
+class Dispatcher:
+    """Single-flight coalescing, a token-bucket rate limit and retries with jittered backoff for one backend."""
+
+    def __init__(self, name, rate=GEMINI_RATE, burst=GEMINI_BURST, attempts=RETRY_ATTEMPTS,
+                 base_delay=RETRY_BASE_SECONDS, max_delay=RETRY_MAX_SECONDS):
+        self.name = name
+        self.limiter = TokenBucket(rate, capacity=burst) if rate > 0 else None
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self._flights = {}      # key -> Future of the leader's result
+        self._queued = 0        # calls waiting for a rate-limit token
+        self._in_flight = 0     # calls currently talking to the backend
+        self._followers = 0     # callers waiting on another caller's identical request
+        self._counters = {"calls": 0, "coalesced": 0, "retries": 0, "gave_up": 0,
+                          "queue_wait_seconds": 0.0, "max_queue_wait_seconds": 0.0}
+
+    # Runs fn() once per key at a time: callers arriving while it runs wait and share its result (or exception).
+    # Returns (result, coalesced), where coalesced is True for callers that did not run fn themselves.
+    # If the leader abandons the request, one of the waiters takes over and runs fn() itself.
+    def coalesce(self, key, fn):
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = Future()
+                else:
+                    self._counters["coalesced"] += 1
+                    self._followers += 1
+            if leader:
+                break
+            try:
+                return flight.result(), True
+            except Abandoned:
+                with self._lock:
+                    self._counters["coalesced"] -= 1
+                    if self._flights.get(key) is flight:
+                        del self._flights[key]
+            finally:
+                with self._lock:
+                    self._followers -= 1
+
+        try:
+            result = fn()
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        else:
+            flight.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+    # Full jitter: a random delay up to an exponentially growing ceiling, so retries from many sessions spread out
+    def backoff(self, attempt):
+        return self._random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    # Runs one outbound call: waits for a rate-limit token, retries transient errors, re-raises the rest
+    def call(self, fn):
+        attempt = 0
+        while True:
+            attempt += 1
+            self._wait_for_token()
+            with self._lock:
+                self._counters["calls"] += 1
+                self._in_flight += 1
+            try:
+                return fn()
+            except Exception as e:
+                if not is_transient(e):
+                    raise
+                if attempt >= self.attempts:
+                    with self._lock:
+                        self._counters["gave_up"] += 1
+                    raise BackendBusy(f"{self.name} is overloaded or rate limiting requests "
+                                      f"(gave up after {attempt} tries): {e}") from e
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+            delay = self.backoff(attempt)
+            with self._lock:
+                self._counters["retries"] += 1
+            record_span("retry_backoff", delay, backend=self.name)
+            time.sleep(delay)
+
+    def _wait_for_token(self):
+        if self.limiter is None:
+            return
+        with self._lock:
+            self._queued += 1
+        try:
+            waited = self.limiter.acquire()
+        finally:
+            with self._lock:
+                self._queued -= 1
+        with self._lock:
+            self._counters["queue_wait_seconds"] += waited
+            self._counters["max_queue_wait_seconds"] = max(self._counters["max_queue_wait_seconds"], waited)
+        record_span("queue_wait", waited, backend=self.name)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["queue_depth"] = self._queued
+            stats["in_flight"] = self._in_flight
+            stats["coalesced_waiting"] = self._followers
+            stats["distinct_requests_in_flight"] = len(self._flights)
+        stats["rate_per_second"] = self.limiter.rate if self.limiter else None
+        stats["mean_queue_wait_seconds"] = round(stats["queue_wait_seconds"] / stats["calls"], 4) if stats["calls"] else 0.0
+        stats["queue_wait_seconds"] = round(stats["queue_wait_seconds"], 3)
+        stats["max_queue_wait_seconds"] = round(stats["max_queue_wait_seconds"], 3)
+        return stats
+
+    def prometheus_text(self):
+        stats = self.stats()
+        backend = f'backend="{self.name}"'
+        lines = []
+        for name, kind, help_text, value in (
+            ("queue_depth", "gauge", "Calls waiting for a rate-limit token.", stats["queue_depth"]),
+            ("in_flight", "gauge", "Calls currently talking to the backend.", stats["in_flight"]),
+            ("coalesced_waiting", "gauge", "Callers waiting on an identical request already in flight.", stats["coalesced_waiting"]),
+            ("calls_total", "counter", "Outbound calls made, retries included.", stats["calls"]),
+            ("coalesced_total", "counter", "Requests answered by another caller's identical request.", stats["coalesced"]),
+            ("retries_total", "counter", "Transient errors that were retried.", stats["retries"]),
+            ("gave_up_total", "counter", "Calls that still failed after every retry.", stats["gave_up"]),
+            ("queue_wait_seconds_total", "counter", "Time spent waiting for rate-limit tokens.", stats["queue_wait_seconds"]),
+        ):
+            lines += [f"# HELP codesnack_dispatch_{name} {help_text}", f"# TYPE codesnack_dispatch_{name} {kind}",
+                      f"codesnack_dispatch_{name}{{{backend}}} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+_gemini_dispatcher = None
+_gemini_dispatcher_lock = threading.Lock()
+
+
+#Function | Process-wide dispatcher for Gemini calls
+def get_gemini_dispatcher():
+    global _gemini_dispatcher
+    with _gemini_dispatcher_lock:
+        if _gemini_dispatcher is None:
+            _gemini_dispatcher = Dispatcher("Gemini")
+            register_metrics(_gemini_dispatcher.prometheus_text)
+        return _gemini_dispatcher
@@ -0,0 +1,179 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from response_cache import get_cache_dir, normalize_prompt
+
+# ✅ Generation history settings
+HISTORY_MAX_ENTRIES = int(os.getenv("CODESNACK_HISTORY_MAX_ENTRIES", 0))     # oldest entries are dropped past this (0 = keep all)
+HISTORY_RESULTS = int(os.getenv("CODESNACK_HISTORY_RESULTS", 20))            # entries listed per lookup or search
+
+# Columns returned by lookups and searches (everything except the output itself)
+SUMMARY_COLUMNS = ("id, created_at, template_type, topic, learner_level, generation_time, "
+                   "prompt_tokens, completion_tokens, classifier_tokens")
+_WORD = re.compile(r"\w+", re.UNICODE)
+# The index keeps 3-character prefixes, so a prefix search reads one list instead of merging every matching word
+PREFIX_MIN_CHARS = 3
+
+
+#Function | Key that topic lookups match on: case and whitespace do not matter
+def topic_key(topic):
+    return normalize_prompt(topic or "").lower()
+
+
+#Function | Turn free text into an FTS5 query: every word must appear, the last one may be a prefix (search as you
+# type). User input is never passed to MATCH as is, so quotes or operators in it cannot break the query.
+def fts_query(text):
+    words = _WORD.findall(text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    # One- and two-letter prefixes match a large share of the vocabulary; those words must match whole
+    if len(words[-1]) >= PREFIX_MIN_CHARS:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+class GenerationHistory:
+    """Every fresh generation (prompt, output, timings, tokens) in SQLite, with an FTS5 index over topics and outputs."""
+
+    def __init__(self, path=None, max_entries=HISTORY_MAX_ENTRIES):
+        if path is None:
+            path = os.path.join(get_cache_dir(), "history.sqlite3")
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        # Streamlit serves sessions from several threads, so one shared connection behind a lock
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS generations ("
+            " id INTEGER PRIMARY KEY,"
+            " created_at REAL NOT NULL,"
+            " template_type TEXT NOT NULL,"
+            " topic TEXT NOT NULL,"
+            " topic_key TEXT NOT NULL,"
+            " learner_level TEXT,"
+            " prompt TEXT NOT NULL,"
+            " output TEXT NOT NULL,"
+            " generation_time REAL,"
+            " time_to_first_token REAL,"
+            " prompt_tokens INTEGER,"
+            " completion_tokens INTEGER,"
+            " classifier_tokens INTEGER);"
+            # Lookups filter on any mix of topic, level and type and list the newest first
+            "CREATE INDEX IF NOT EXISTS generations_topic ON generations(topic_key, learner_level, template_type, id);"
+            "CREATE INDEX IF NOT EXISTS generations_type ON generations(template_type, id);"
+            # External-content index: the text lives once, in generations; the triggers keep the index in step
+            "CREATE VIRTUAL TABLE IF NOT EXISTS generations_fts USING fts5("
+            " topic, output, content='generations', content_rowid='id', tokenize='porter unicode61', prefix='3');"
+            "CREATE TRIGGER IF NOT EXISTS generations_fts_insert AFTER INSERT ON generations BEGIN"
+            " INSERT INTO generations_fts(rowid, topic, output) VALUES (new.id, new.topic, new.output); END;"
+            "CREATE TRIGGER IF NOT EXISTS generations_fts_delete AFTER DELETE ON generations BEGIN"
+            " INSERT INTO generations_fts(generations_fts, rowid, topic, output)"
+            " VALUES ('delete', old.id, old.topic, old.output); END;"
+        )
+        self._db.commit()
+
+    # Stores one generate_content result; answers served from the cache or shared with an identical request
+    # are already in the history (or were generated before it existed) and are skipped. Returns the new id.
+    def record(self, template_type, topic, learner_level, prompt, result):
+        if 'output' not in result or result.get('cached') or result.get('coalesced'):
+            return None
+        token_usage = result.get('token_usage') or {}
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO generations (created_at, template_type, topic, topic_key, learner_level, prompt, output,"
+                " generation_time, time_to_first_token, prompt_tokens, completion_tokens, classifier_tokens)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), template_type, topic, topic_key(topic), learner_level, prompt, result['output'],
+                 result.get('generation_time'), (result.get('streaming') or {}).get('time_to_first_token'),
+                 token_usage.get('prompt_tokens'), token_usage.get('completion_tokens'),
+                 result.get('classifier_tokens', 0)),
+            )
+            entry_id = cursor.lastrowid
+            if self.max_entries and entry_id > self.max_entries:
+                self._db.execute("DELETE FROM generations WHERE id <= ?", (entry_id - self.max_entries,))
+            self._db.commit()
+        return entry_id
+
+    # Newest entries matching every filter given (topic matches whole topics, ignoring case)
+    def lookup(self, topic=None, learner_level=None, template_type=None, limit=HISTORY_RESULTS):
+        where, params = self._filters(topic, learner_level, template_type)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {SUMMARY_COLUMNS} FROM generations{where} ORDER BY id DESC LIMIT ?", (*params, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    # Full-text search over topics and outputs, newest matches first, each with a highlighted snippet.
+    # Newest-first lets SQLite stop after `limit` matches instead of ranking every match of a common word.
+    def search(self, text, topic=None, learner_level=None, template_type=None, limit=HISTORY_RESULTS):
+        query = fts_query(text)
+        if query is None:
+            return self.lookup(topic, learner_level, template_type, limit)
+        where, params = self._filters(topic, learner_level, template_type, prefix="g.")
+        where = f"{where} AND" if where else " WHERE"
+        columns = ", ".join(f"g.{column.strip()}" for column in SUMMARY_COLUMNS.split(","))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {columns}, snippet(generations_fts, 1, '**', '**', '…', 16) AS snippet"
+                f" FROM generations_fts JOIN generations g ON g.id = generations_fts.rowid"
+                f"{where} generations_fts MATCH ? ORDER BY generations_fts.rowid DESC LIMIT ?",
+                (*params, query, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    # Most generated topics, as (topic, generations), most first; ties go to the most recent.
+    # A topic typed several ways comes back as it was typed last (SQLite takes bare columns from the MAX() row).
+    def popular_topics(self, limit=HISTORY_RESULTS):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT topic, COUNT(*) AS generations, MAX(id) AS latest FROM generations GROUP BY topic_key"
+                " ORDER BY generations DESC, latest DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [(row['topic'], row['generations']) for row in rows]
+
+    # One entry with its prompt and output, or None
+    def get(self, entry_id):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM generations WHERE id = ?", (entry_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def _filters(self, topic, learner_level, template_type, prefix=""):
+        clauses, params = [], []
+        for column, value in (("topic_key", topic_key(topic) if topic else None),
+                              ("learner_level", learner_level), ("template_type", template_type)):
+            if value:
+                clauses.append(f"{prefix}{column} = ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def stats(self):
+        with self._lock:
+            row = self._db.execute("SELECT COUNT(*), MIN(created_at) FROM generations").fetchone()
+        return {"entries": row[0], "oldest": row[1], "max_entries": self.max_entries}
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM generations")
+            self._db.execute("INSERT INTO generations_fts(generations_fts) VALUES ('rebuild')")
+            self._db.commit()
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+#Function | Process-wide generation history shared by every Streamlit session
+def get_generation_history():
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = GenerationHistory()
+        return _history
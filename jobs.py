@@ -0,0 +1,241 @@
+import contextvars
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from dispatcher import Abandoned
+from tracing import record_span, register_metrics
+
+# ✅ Background job settings (one worker pool per kind of job, shared by every Streamlit session in the process)
+JOB_WORKERS = int(os.getenv("CODESNACK_JOB_WORKERS", 8))           # pool size of a kind not listed below
+# Jobs of one kind running at once (CODESNACK_JOB_WORKERS_<KIND>); the rest wait in their own line, so a burst of
+# generations never holds up a PDF build or a tutorial lookup. Gemini calls are bounded by the dispatcher anyway.
+JOB_LANE_WORKERS = {kind: int(os.getenv(f"CODESNACK_JOB_WORKERS_{kind.upper()}", workers)) for kind, workers in (
+    ("generate", 16), ("custom", 8), ("copilot", 8), ("course_pack", 4), ("tutorial", 8), ("pdf", 4))}
+JOB_RESULT_TTL = float(os.getenv("CODESNACK_JOB_TTL", 3600))       # seconds a finished job nobody collected is kept
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Abandoned):
+    """Raised inside a job's work once the job has been cancelled."""
+
+
+class Job:
+    """One piece of background work: its status, what it has produced so far and, once finished, its result."""
+
+    def __init__(self, kind, meta):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.meta = meta            # whatever the submitter needs to show the job (topic, prompt, button key...)
+        self.status = QUEUED
+        self.progress = {}          # set by the work as it goes (partial output, finished items...)
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    # Called by the work between steps (and from streaming callbacks) so a cancelled job stops promptly
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled(f"{self.kind} job was cancelled")
+
+    # Publishes partial results for the UI to poll; also the point where a cancelled job stops
+    def report(self, **progress):
+        self.check_cancelled()
+        self.progress = {**self.progress, **progress}
+
+    # Seconds from submission until now, or until the job finished
+    def elapsed(self):
+        return round((self.finished_at or time.time()) - self.submitted_at, 2)
+
+
+class JobLane:
+    """Bounded thread pool of one kind of job, with its own line of queued jobs (counts are kept by JobQueue)."""
+
+    def __init__(self, kind, workers):
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"codesnack-{kind}")
+        self.queued = 0
+        self.running = 0
+
+
+class JobQueue:
+    """Thread pools running jobs outside the Streamlit script, so a rerun neither abandons nor repeats them.
+
+    Each kind of job gets its own pool (lane_workers[kind], else default_workers threads), started on first use.
+    """
+
+    def __init__(self, lane_workers=None, default_workers=JOB_WORKERS, result_ttl=JOB_RESULT_TTL):
+        self.lane_workers = JOB_LANE_WORKERS if lane_workers is None else lane_workers
+        self.default_workers = default_workers
+        self.result_ttl = result_ttl
+        self._lock = threading.Lock()
+        self._lanes = {}        # kind -> JobLane
+        self._jobs = {}         # id -> Job, until collected (or pruned)
+        self._futures = {}      # id -> Future, while queued or running
+        self._started = time.time()
+        self._counters = {"submitted": 0, "completed": 0, "failed": 0, "cancelled": 0,
+                          "busy_seconds": 0.0, "wait_seconds": 0.0}
+
+    # Queues fn(job, *args) and returns the Job straight away. fn runs with the caller's trace labels and
+    # reports progress through job.report(); its return value becomes job.result, an exception job.error.
+    def submit(self, kind, fn, *args, **meta):
+        job = Job(kind, meta)
+        context = contextvars.copy_context()
+        with self._lock:
+            self._prune()
+            lane = self._lane(kind)
+            self._jobs[job.id] = job
+            lane.queued += 1
+            self._counters["submitted"] += 1
+            self._futures[job.id] = lane.executor.submit(context.run, self._run, job, fn, args)
+        return job
+
+    # The pool of a kind of job, started on its first job (caller holds the lock)
+    def _lane(self, kind):
+        lane = self._lanes.get(kind)
+        if lane is None:
+            lane = self._lanes[kind] = JobLane(kind, self.lane_workers.get(kind, self.default_workers))
+        return lane
+
+    def _run(self, job, fn, args):
+        with self._lock:
+            if job.finished:
+                return
+            lane = self._lanes[job.kind]
+            lane.queued -= 1
+            lane.running += 1
+            job.status = RUNNING
+            job.started_at = time.time()
+            self._counters["wait_seconds"] += job.started_at - job.submitted_at
+        record_span("job_wait", job.started_at - job.submitted_at, kind=job.kind)
+        status, result, error = DONE, None, None
+        try:
+            job.check_cancelled()
+            result = fn(job, *args)
+        except JobCancelled:
+            status = CANCELLED
+        except Exception as e:
+            status, error = FAILED, str(e)
+        if status == DONE and job.cancel_requested:
+            # Finished before it noticed the cancellation; the user no longer wants the result
+            status, result = CANCELLED, None
+        with self._lock:
+            job.result, job.error = result, error
+            job.finished_at = time.time()
+            job.status = status
+            lane.running -= 1
+            self._futures.pop(job.id, None)
+            self._counters["busy_seconds"] += job.finished_at - job.started_at
+            self._counters[{DONE: "completed", FAILED: "failed", CANCELLED: "cancelled"}[status]] += 1
+        record_span("job_run", job.finished_at - job.started_at, error=status == FAILED, kind=job.kind)
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    # Queued jobs are dropped at once; running ones stop at their next check_cancelled()/report()
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return
+            job._cancel.set()
+            future = self._futures.get(job_id)
+            if job.status == QUEUED and future is not None and future.cancel():
+                self._lanes[job.kind].queued -= 1
+                self._futures.pop(job_id, None)
+                job.status = CANCELLED
+                job.finished_at = time.time()
+                self._counters["cancelled"] += 1
+
+    # Hands a finished job over to its owner and forgets it
+    def collect(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or not job.finished:
+                return None
+            return self._jobs.pop(job_id)
+
+    # Drops finished (or cancelled) jobs whose session never came back for them (caller holds the lock)
+    def _prune(self):
+        cutoff = time.time() - self.result_ttl
+        for job_id, job in list(self._jobs.items()):
+            if job.finished and job.finished_at < cutoff:
+                del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            lanes = [{'kind': lane.kind, 'workers': lane.workers, 'queue_depth': lane.queued, 'running': lane.running}
+                     for lane in self._lanes.values()]
+            stats["uncollected"] = sum(1 for job in self._jobs.values() if job.finished)
+        uptime = time.time() - self._started
+        stats["lanes"] = sorted(lanes, key=lambda row: row['kind'])
+        stats["queue_depth"] = sum(row['queue_depth'] for row in lanes)
+        stats["running"] = sum(row['running'] for row in lanes)
+        # Pools that have not started yet count at the size they will have
+        sizes = {kind: max(1, workers) for kind, workers in self.lane_workers.items()}
+        stats["workers"] = sum({**sizes, **{row['kind']: row['workers'] for row in lanes}}.values()) or 1
+        stats["utilization"] = round(stats["running"] / stats["workers"], 3)
+        stats["mean_utilization"] = round(stats["busy_seconds"] / (stats["workers"] * uptime), 3) if uptime > 0 else 0.0
+        started = stats["completed"] + stats["failed"] + stats["cancelled"]
+        stats["mean_wait_seconds"] = round(stats["wait_seconds"] / started, 3) if started else 0.0
+        stats["busy_seconds"] = round(stats["busy_seconds"], 3)
+        stats["wait_seconds"] = round(stats["wait_seconds"], 3)
+        return stats
+
+    def prometheus_text(self):
+        stats = self.stats()
+        lines = []
+        for name, kind, help_text, value in (
+            ("queue_depth", "gauge", "Jobs waiting for a worker.", stats["queue_depth"]),
+            ("running", "gauge", "Jobs running right now.", stats["running"]),
+            ("workers", "gauge", "Worker threads across the pools of every kind of job.", stats["workers"]),
+            ("utilization", "gauge", "Share of workers busy right now.", stats["utilization"]),
+            ("submitted_total", "counter", "Jobs submitted.", stats["submitted"]),
+            ("completed_total", "counter", "Jobs that finished with a result.", stats["completed"]),
+            ("failed_total", "counter", "Jobs that raised an error.", stats["failed"]),
+            ("cancelled_total", "counter", "Jobs cancelled before they finished.", stats["cancelled"]),
+            ("busy_seconds_total", "counter", "Worker time spent running jobs.", stats["busy_seconds"]),
+            ("wait_seconds_total", "counter", "Time jobs spent waiting for a worker.", stats["wait_seconds"]),
+        ):
+            lines += [f"# HELP codesnack_jobs_{name} {help_text}", f"# TYPE codesnack_jobs_{name} {kind}",
+                      f"codesnack_jobs_{name} {value}"]
+        for name, help_text, column in (
+            ("lane_queue_depth", "Jobs of each kind waiting for a worker of their pool.", "queue_depth"),
+            ("lane_running", "Jobs of each kind running right now.", "running"),
+            ("lane_workers", "Size of each kind's worker pool.", "workers"),
+        ):
+            lines += [f"# HELP codesnack_jobs_{name} {help_text}", f"# TYPE codesnack_jobs_{name} gauge"]
+            lines += [f'codesnack_jobs_{name}{{kind="{row["kind"]}"}} {row[column]}' for row in stats["lanes"]]
+        return "\n".join(lines) + "\n"
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+#Function | Process-wide background job queue
+def get_job_queue():
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+            register_metrics(_job_queue.prometheus_text)
+        return _job_queue
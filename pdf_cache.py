@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from pdf_render import (BOTTOM_MARGIN, FONT_SIZE, LEFT_MARGIN, PAGE_SIZE, RIGHT_MARGIN, TAB_SIZE, TOP_MARGIN,
+                        font_files, render_text_pdf)
+from tracing import span
+
+# ✅ PDF artifact cache settings (rendered PDFs are kept in memory and shared by every session)
+PDF_CACHE_MAX_BYTES = int(os.getenv("CODESNACK_PDF_CACHE_BYTES", 64 * 1024 * 1024))
+OFFER_MEMORY = 4096     # most recent offered PDFs remembered for the renders_deferred count
+
+
+#Function | Content address of a PDF: the cleaned text plus everything that changes its layout
+# (fonts by their configured files: building a key must not load and register them)
+def pdf_artifact_key(text, font_size=FONT_SIZE, page_size=PAGE_SIZE):
+    layout = {
+        "font_size": font_size,
+        "page_size": list(page_size),
+        "margins": [LEFT_MARGIN, RIGHT_MARGIN, TOP_MARGIN, BOTTOM_MARGIN],
+        "tab_size": TAB_SIZE,
+        "fonts": ["Helvetica"] + font_files(),
+    }
+    digest = hashlib.sha256(json.dumps(layout, sort_keys=True).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class PdfArtifactCache:
+    """LRU cache of rendered PDFs bounded by total size in bytes; a PDF is only rendered when first requested."""
+
+    def __init__(self, max_bytes=PDF_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (pdf bytes, seconds it took to render)
+        self._rendering = {}            # key -> lock, so concurrent requests for one PDF render it once
+        self._bytes = 0
+        self._offers = OrderedDict()    # key -> rendered (or prebuilt) yet, for the last OFFER_MEMORY offers
+        self._sources = []              # prebuilt PDFs (e.g. the warm-start content pack), asked before rendering
+        self._counters = {"hits": 0, "renders": 0, "prebuilt": 0, "evictions": 0, "render_seconds": 0.0,
+                          "render_seconds_saved": 0.0, "bytes_served_from_cache": 0, "renders_deferred": 0}
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._entries:
+                return True
+        return any(key in source for source in self._sources)
+
+    # source supports `key in source` and source.get(key) -> PDF bytes or None
+    def add_source(self, source):
+        if source not in self._sources:
+            self._sources.append(source)
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            data, seconds = entry
+            self._counters["hits"] += 1
+            self._counters["render_seconds_saved"] += seconds
+            self._counters["bytes_served_from_cache"] += len(data)
+            return data
+
+    # Records that a download was offered for `key`; offers that are never rendered are renders avoided
+    def offer(self, key):
+        with self._lock:
+            if key in self._offers:
+                self._offers.move_to_end(key)
+                return
+            self._offers[key] = False
+            while len(self._offers) > OFFER_MEMORY:
+                _, served = self._offers.popitem(last=False)
+                if not served:
+                    self._counters["renders_deferred"] += 1
+
+    def get(self, text, key=None):
+        key = key or pdf_artifact_key(text)
+        data = self._lookup(key)
+        if data is not None:
+            return data
+
+        with self._lock:
+            render_lock = self._rendering.setdefault(key, threading.Lock())
+        with render_lock:
+            # Another session may have rendered it while we waited
+            data = self._lookup(key)
+            if data is None:
+                data = self._prebuilt(key)
+            if data is None:
+                start = time.perf_counter()
+                with span("pdf_build"):
+                    data = render_text_pdf(text).getvalue()
+                self._store(key, data, time.perf_counter() - start)
+        with self._lock:
+            self._rendering.pop(key, None)
+        return data
+
+    # Kept like a rendered PDF, so the next download does not decompress it again
+    def _prebuilt(self, key):
+        for source in self._sources:
+            data = source.get(key)
+            if data is not None:
+                with self._lock:
+                    self._counters["prebuilt"] += 1
+                self._store(key, data, 0.0, rendered=False)
+                return data
+        return None
+
+    def _store(self, key, data, seconds, rendered=True):
+        with self._lock:
+            if rendered:
+                self._counters["renders"] += 1
+                self._counters["render_seconds"] += seconds
+            if key in self._offers:
+                self._offers[key] = True
+            if len(data) > self.max_bytes:
+                return
+            self._entries[key] = (data, seconds)
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            stats["max_bytes"] = self.max_bytes
+            # Offers forgotten unrendered plus the remembered ones still waiting
+            stats["renders_deferred"] += sum(not served for served in self._offers.values())
+        requests = stats["hits"] + stats["renders"] + stats["prebuilt"]
+        stats["hit_rate"] = round(stats["hits"] / requests, 3) if requests else 0.0
+        stats["render_seconds"] = round(stats["render_seconds"], 3)
+        stats["render_seconds_saved"] = round(stats["render_seconds_saved"], 3)
+        return stats
+
+
+_pdf_cache = None
+_pdf_cache_lock = threading.Lock()
+
+
+#Function | Process-wide PDF artifact cache shared by every Streamlit session
+def get_pdf_cache():
+    global _pdf_cache
+    with _pdf_cache_lock:
+        if _pdf_cache is None:
+            _pdf_cache = PdfArtifactCache()
+        return _pdf_cache
@@ -0,0 +1,246 @@
+import os
+import threading
+import unicodedata
+from io import BytesIO
+from itertools import groupby
+
+from reportlab.lib.pagesizes import A4
+
+# The rest of reportlab (fonts, canvas) is imported where it is used, so importing this module to build a
+# cache key or to show a download button costs next to nothing until a PDF is actually rendered
+
+# ✅ Page layout (same page, margins and font size the original text_to_pdf used)
+PAGE_SIZE = A4
+FONT_SIZE = 12
+LEFT_MARGIN = A4[0] / 8
+RIGHT_MARGIN = A4[0] / 8
+TOP_MARGIN = 50
+BOTTOM_MARGIN = 50
+TAB_SIZE = 4            # tabs become spaces: Helvetica has no tab glyph, and the spaces can be wrapped at
+
+# Helvetica stays the main font (as before); characters it cannot draw fall back to a Unicode text font
+# and then to a font with emoji / symbol glyphs. Override with CODESNACK_PDF_FONT / CODESNACK_PDF_EMOJI_FONT.
+TEXT_FONT_CANDIDATES = [
+    os.getenv("CODESNACK_PDF_FONT", ""),
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "C:/Windows/Fonts/segoeui.ttf",
+    "C:/Windows/Fonts/arial.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "/System/Library/Fonts/Supplemental/Arial Unicode.ttf",
+]
+EMOJI_FONT_CANDIDATES = [
+    os.getenv("CODESNACK_PDF_EMOJI_FONT", ""),
+    "C:/Windows/Fonts/seguiemj.ttf",
+    "C:/Windows/Fonts/seguisym.ttf",
+    "/usr/share/fonts/truetype/noto/NotoEmoji-Regular.ttf",
+    "/usr/share/fonts/truetype/ancient-scripts/Symbola_hint.ttf",
+]
+
+
+class _GlyphWidths(dict):
+    """char -> advance width in the font that will draw it, measured once per character."""
+
+    def __init__(self, chain):
+        super().__init__()
+        self.chain = chain
+
+    def __missing__(self, ch):
+        from reportlab.pdfbase import pdfmetrics
+        index = self.chain.font_index(ch)
+        width = 0.0 if index is None else pdfmetrics.stringWidth(ch, self.chain.fonts[index][0], self.chain.font_size)
+        self[ch] = width
+        return width
+
+
+class FontChain:
+    """Helvetica plus TTF fallbacks; every character is mapped to the first font that has a glyph for it."""
+
+    def __init__(self, font_size=FONT_SIZE):
+        self.font_size = font_size
+        self.fonts = []              # [(font name, coverage test)]
+        self.widths = _GlyphWidths(self)
+        self._font_for = {}          # char -> index into self.fonts, or None when no font can draw it
+        self._plain_chars = set()    # characters Helvetica draws
+        self._drop = {}              # str.translate table removing characters no font can draw
+
+        self.fonts.append(("Helvetica", _winansi_covers))
+        for candidates, alias in ((TEXT_FONT_CANDIDATES, "CodeSnackText"), (EMOJI_FONT_CANDIDATES, "CodeSnackEmoji")):
+            font_name = _load_ttf(candidates, alias)
+            if font_name and font_name not in (name for name, _ in self.fonts):
+                self.fonts.append((font_name, _ttf_covers(font_name)))
+
+    def font_index(self, ch):
+        index = self._font_for.get(ch, -1)
+        if index == -1:
+            # Joiners and emoji variation selectors only matter to colour-emoji shaping, which PDFs here cannot do
+            if unicodedata.category(ch) == "Cf" or 0xFE00 <= ord(ch) <= 0xFE0F:
+                index = None
+            else:
+                index = next((i for i, (_, covers) in enumerate(self.fonts) if covers(ch)), None)
+            self._font_for[ch] = index
+            if index == 0:
+                self._plain_chars.add(ch)
+            elif index is None:
+                self._drop[ord(ch)] = None
+        return index
+
+    def width(self, text):
+        return sum(map(self.widths.__getitem__, text))
+
+    # Drops characters no font can draw (instead of printing boxes); plain=True means Helvetica draws all of it
+    def prepare(self, text):
+        chars = set(text)
+        if chars <= self._plain_chars:
+            return text, True
+        for ch in chars:
+            self.font_index(ch)
+        if self._drop and not chars.isdisjoint(map(chr, self._drop)):
+            text = text.translate(self._drop)
+            chars = set(text)
+        return text, chars <= self._plain_chars
+
+    # (font name, text) runs for a line that needs more than one font
+    def runs(self, text):
+        for index, chars in groupby(text, key=self.font_index):
+            if index is not None:
+                yield self.fonts[index][0], "".join(chars)
+
+
+_registered = {}
+_lock = threading.Lock()
+_chains = {}
+
+
+def _load_ttf(candidates, alias):
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    for path in candidates:
+        if not path or not os.path.exists(path):
+            continue
+        name = _registered.get(path)
+        if name:
+            return name
+        try:
+            name = f"{alias}-{len(_registered)}"
+            pdfmetrics.registerFont(TTFont(name, path))
+        except Exception:
+            continue
+        _registered[path] = name
+        return name
+    return None
+
+
+def _ttf_covers(font_name):
+    from reportlab.pdfbase import pdfmetrics
+    char_to_glyph = pdfmetrics.getFont(font_name).face.charToGlyph
+    return lambda ch: ord(ch) in char_to_glyph
+
+
+def _winansi_covers(ch):
+    try:
+        ch.encode("cp1252")
+        return True
+    except UnicodeEncodeError:
+        return False
+
+
+#Function | Font files a chain draws with (the first existing candidate of each list), found without loading them
+def font_files():
+    return [next((path for path in candidates if path and os.path.exists(path)), None)
+            for candidates in (TEXT_FONT_CANDIDATES, EMOJI_FONT_CANDIDATES)]
+
+
+#Function | Shared font chain per font size (font registration and glyph widths are process-wide)
+def get_font_chain(font_size=FONT_SIZE):
+    with _lock:
+        if font_size not in _chains:
+            _chains[font_size] = FontChain(font_size)
+        return _chains[font_size]
+
+
+#Function | Wrap one paragraph to max_width using real glyph widths (breaks at spaces, splits over-long words)
+def wrap_line(line, chain, max_width):
+    if chain.width(line) <= max_width:
+        return [line]
+
+    space = chain.width(" ")
+    lines, current, current_width = [], None, 0.0
+    for word in line.split(" "):
+        word_width = chain.width(word)
+        if current is not None and current_width + space + word_width <= max_width:
+            current += " " + word
+            current_width += space + word_width
+            continue
+        if current is not None:
+            lines.append(current)
+        # A single word wider than the line is split character by character
+        while word_width > max_width:
+            cut, cut_width = 0, 0.0
+            for ch in word:
+                ch_width = chain.widths[ch]
+                if cut and cut_width + ch_width > max_width:
+                    break
+                cut += 1
+                cut_width += ch_width
+            lines.append(word[:cut])
+            word = word[cut:]
+            word_width = chain.width(word)
+        current, current_width = word, word_width
+    lines.append(current)
+    return lines
+
+
+#Function | The printed lines of a text, each with its plain flag (see FontChain.prepare)
+def layout_lines(text, chain, max_width):
+    for paragraph in text.splitlines():
+        paragraph, plain = chain.prepare(paragraph.expandtabs(TAB_SIZE))
+        for line in wrap_line(paragraph, chain, max_width):
+            yield line, plain
+
+
+#Function | Render plain text to a PDF (one text object per page)
+def render_text_pdf(text, font_size=FONT_SIZE, page_size=PAGE_SIZE):
+    from reportlab.pdfgen import canvas
+
+    chain = get_font_chain(font_size)
+    line_height = font_size * 1.2
+    max_width = page_size[0] - LEFT_MARGIN - RIGHT_MARGIN
+    top = page_size[1] - TOP_MARGIN
+    lines_per_page = int((top - BOTTOM_MARGIN) // line_height) + 1
+    primary_font = chain.fonts[0][0]
+
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=page_size)
+
+    text_object = None
+    lines_on_page = 0
+    for line, plain in layout_lines(text, chain, max_width):
+        if text_object is None or lines_on_page == lines_per_page:
+            if text_object is not None:
+                c.drawText(text_object)
+                c.showPage()
+            text_object = c.beginText(LEFT_MARGIN, top)
+            text_object.setFont(primary_font, font_size, line_height)
+            current_font = primary_font
+            lines_on_page = 0
+
+        if plain:
+            if current_font != primary_font:
+                text_object.setFont(primary_font, font_size, line_height)
+                current_font = primary_font
+            text_object.textLine(line)
+        else:
+            for font_name, run in chain.runs(line):
+                if font_name != current_font:
+                    text_object.setFont(font_name, font_size, line_height)
+                    current_font = font_name
+                text_object.textOut(run)
+            text_object.textLine("")
+        lines_on_page += 1
+
+    if text_object is not None:
+        c.drawText(text_object)
+    c.save()
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,111 @@
+import os
+import threading
+
+from stub_backends import stub_mode
+
+# Clients are built once per process and shared by every Streamlit session and rerun.
+# Imports stay inside the builders so a flow only pays for the SDK it actually uses.
+
+_lock = threading.Lock()
+_gemini_models = {}
+_gemini_configured = False
+_youtube_client = None
+_replicate_client = None
+_thread_local = threading.local()
+
+HTTP_TIMEOUT_SECONDS = int(os.getenv("CODESNACK_HTTP_TIMEOUT", 30))
+
+
+#Function | Shared Gemini model per model name (genai.configure runs once)
+def get_gemini_model(model_name):
+    global _gemini_configured
+    model = _gemini_models.get(model_name)
+    if model is not None:
+        return model
+    with _lock:
+        if stub_mode():
+            from stub_backends import StubGeminiModel
+            return _gemini_models.setdefault(model_name, StubGeminiModel(model_name))
+
+        import google.generativeai as genai
+        if not _gemini_configured:
+            genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+            _gemini_configured = True
+        if model_name not in _gemini_models:
+            _gemini_models[model_name] = genai.GenerativeModel(model_name)
+        return _gemini_models[model_name]
+
+
+#Function | Build the shared Gemini model on a daemon thread (importing the SDK takes most of a second)
+def warm_up_in_background(model_name):
+    def warm_up():
+        try:
+            get_gemini_model(model_name)
+        except Exception:
+            pass    # the first real call builds it again and reports the error
+
+    thread = threading.Thread(target=warm_up, name="gemini-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+#Function | Shared YouTube Data API client built from the discovery document bundled with google-api-python-client
+def get_youtube_client():
+    global _youtube_client
+    if _youtube_client is not None:
+        return _youtube_client
+    with _lock:
+        if _youtube_client is None and stub_mode():
+            from stub_backends import StubYouTubeClient
+            _youtube_client = StubYouTubeClient()
+        if _youtube_client is None:
+            from googleapiclient.discovery import build
+            # static_discovery reads the packaged youtube.v3 document instead of fetching it over the network
+            _youtube_client = build(
+                'youtube', 'v3',
+                developerKey=os.getenv("YOUTUBE_API_KEY"),
+                static_discovery=True,
+                http=get_keepalive_http()
+            )
+        return _youtube_client
+
+
+#Function | Keep-alive HTTP connection for the current thread (httplib2.Http must not be shared across threads)
+def get_keepalive_http():
+    http = getattr(_thread_local, 'http', None)
+    if http is None:
+        import httplib2
+        http = httplib2.Http(timeout=HTTP_TIMEOUT_SECONDS)
+        _thread_local.http = http
+    return http
+
+
+#Function | Run a googleapiclient request over this thread's persistent connection
+def execute_request(request):
+    return request.execute(http=get_keepalive_http())
+
+
+#Function | Shared Replicate client (httpx connection pool is thread-safe and keeps connections alive)
+def get_replicate_client():
+    global _replicate_client
+    if _replicate_client is not None:
+        return _replicate_client
+    with _lock:
+        if _replicate_client is None and stub_mode():
+            from stub_backends import StubReplicateClient
+            _replicate_client = StubReplicateClient()
+        if _replicate_client is None:
+            import replicate
+            _replicate_client = replicate.Client(api_token=os.getenv("REPLICATE_API_TOKEN"))
+        return _replicate_client
+
+
+#Function | Drop every shared client (used by the benchmark to measure cold starts)
+def reset_resources():
+    global _gemini_configured, _youtube_client, _replicate_client
+    with _lock:
+        _gemini_models.clear()
+        _gemini_configured = False
+        _youtube_client = None
+        _replicate_client = None
+        _thread_local.__dict__.clear()
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from stub_backends import stub_mode
+
+# ✅ Cache settings (can be overridden from the .env file)
+CACHE_TTL_SECONDS = int(os.getenv("CODESNACK_CACHE_TTL", 7 * 24 * 3600))
+CACHE_MEMORY_ENTRIES = int(os.getenv("CODESNACK_CACHE_MEMORY_ENTRIES", 256))
+CACHE_DISK_ENTRIES = int(os.getenv("CODESNACK_CACHE_DISK_ENTRIES", 5000))
+TOUCH_BATCH = 64    # memory hits whose last_access is written to SQLite in one go
+
+
+#Function | Directory for every on-disk cache; stub runs get their own so fake answers never reach the real app
+def get_cache_dir():
+    cache_dir = os.getenv("CODESNACK_CACHE_DIR", ".codesnack_cache")
+    if stub_mode():
+        cache_dir = os.path.join(cache_dir, "stub")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+#Function | Normalize a prompt so whitespace-only differences share a cache entry
+def normalize_prompt(prompt):
+    return re.sub(r'\s+', ' ', prompt).strip()
+
+
+#Function | Build the cache key from (model, normalized prompt, temperature)
+def make_cache_key(model_name, prompt, temperature):
+    raw = json.dumps([model_name, normalize_prompt(prompt), round(float(temperature), 3)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier response cache: an in-process LRU in front of a SQLite store."""
+
+    # Entries are fresh for ttl seconds; stale_ttl (default: ttl) keeps them around longer for get(allow_stale=True)
+    def __init__(self, path=None, ttl=CACHE_TTL_SECONDS,
+                 max_memory_entries=CACHE_MEMORY_ENTRIES, max_disk_entries=CACHE_DISK_ENTRIES, stale_ttl=None):
+        if path is None:
+            path = os.path.join(get_cache_dir(), "responses.sqlite3")
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl if stale_ttl is not None else ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+
+        self._memory = OrderedDict()  # key -> (created_at, value)
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        # Memory hits not yet recorded on disk (key -> time): without them disk eviction would drop the hottest rows
+        self._touched = {}
+
+        # Streamlit serves sessions from several threads, so one shared connection behind a lock
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+        self._db.commit()
+
+    def _expired(self, created_at, now, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        return ttl is not None and now - created_at > ttl
+
+    def get(self, key, allow_stale=False):
+        now = time.time()
+        ttl = self.stale_ttl if allow_stale else self.ttl
+        with self._lock:
+            # Tier 1: in-process LRU
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now, ttl):
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    self._touched[key] = now
+                    if len(self._touched) >= TOUCH_BATCH:
+                        self._flush_touches()
+                        self._db.commit()
+                    return entry[1]
+                if self._expired(entry[0], now, self.stale_ttl):
+                    del self._memory[key]
+
+            # Tier 2: SQLite
+            row = self._db.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                value, created_at = json.loads(row[0]), row[1]
+                if not self._expired(created_at, now, ttl):
+                    self._db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                    self._remember(key, created_at, value)
+                    self._counters["disk_hits"] += 1
+                    return value
+                if self._expired(created_at, now, self.stale_ttl):
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            self._flush_touches()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            self._evict_disk(now)
+            self._db.commit()
+
+    def invalidate(self, key):
+        with self._lock:
+            self._memory.pop(key, None)
+            self._touched.pop(key, None)
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            disk_entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_entries"] = disk_entries
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+    def _remember(self, key, created_at, value):
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _flush_touches(self):
+        if self._touched:
+            self._db.executemany("UPDATE responses SET last_access = ? WHERE key = ?",
+                                 [(when, key) for key, when in self._touched.items()])
+            self._touched.clear()
+
+    def _evict_disk(self, now):
+        # Drop expired rows first, then the least recently used ones over the size limit
+        evicted = 0
+        if self.stale_ttl is not None:
+            cursor = self._db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.stale_ttl,))
+            evicted += cursor.rowcount
+        count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_disk_entries:
+            cursor = self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                (count - self.max_disk_entries,),
+            )
+            evicted += cursor.rowcount
+        self._counters["evictions"] += max(evicted, 0)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+#Function | Process-wide cache shared by every Streamlit session
+def get_response_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
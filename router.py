@@ -0,0 +1,333 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from dispatcher import Dispatcher, get_gemini_dispatcher
+from resources import get_gemini_model, get_replicate_client
+from stub_backends import stub_mode
+from tracing import RollingHistogram, record_span, register_metrics
+
+# ✅ Model router settings (backends in order of preference; the first one that is up is the primary)
+ROUTER_BACKENDS = os.getenv("CODESNACK_BACKENDS", "")                   # e.g. "gemini,replicate"; default below
+HEDGE_REQUESTS = os.getenv("CODESNACK_HEDGE", "true").lower() in ("1", "true", "yes", "on")
+HEDGE_QUANTILE = float(os.getenv("CODESNACK_HEDGE_QUANTILE", 0.95))     # primary latency after which the next backend is asked too
+HEDGE_MIN_SAMPLES = int(os.getenv("CODESNACK_HEDGE_MIN_SAMPLES", 20))   # calls needed before that quantile is trusted
+HEDGE_DEFAULT_SECONDS = float(os.getenv("CODESNACK_HEDGE_DEFAULT", 8))  # hedge delay until then
+HEDGE_MIN_SECONDS = float(os.getenv("CODESNACK_HEDGE_MIN", 0.5))        # never hedge sooner than this
+BREAKER_FAILURES = int(os.getenv("CODESNACK_BREAKER_FAILURES", 5))      # failures in a row that take a backend out
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("CODESNACK_BREAKER_COOLDOWN", 30))  # before one trial call is let through
+ROUTER_WORKERS = int(os.getenv("CODESNACK_ROUTER_WORKERS", 16))
+
+REPLICATE_MODEL = "meta/codellama-70b-instruct:a279116fe47a0f65701a8817188601e2fe8f4b9e04a518789655ea7b995851bf"
+REPLICATE_RATE = float(os.getenv("CODESNACK_REPLICATE_RATE", 2))        # calls per second (0 = no limit)
+REPLICATE_MAX_TOKENS = int(os.getenv("CODESNACK_REPLICATE_MAX_TOKENS", 2048))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+
+class ReplicateResponse:
+    """A finished Replicate prediction in the shape content.py reads from Gemini: .text, and iterable as a stream.
+
+    Replicate reports no token counts, so usage is estimated by the caller.
+    """
+
+    usage_metadata = None
+
+    def __init__(self, text):
+        self.text = text
+
+    # Streaming is not wired up for Replicate: the whole answer arrives as one chunk
+    def __iter__(self):
+        yield self
+
+
+class GeminiBackend:
+    """Gemini through the shared Gemini dispatcher (rate limit, retries)."""
+
+    def __init__(self, model_name, name="gemini"):
+        self.name = name
+        self.model_name = model_name
+        self.dispatcher = get_gemini_dispatcher()
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        model = get_gemini_model(self.model_name)
+        return self.dispatcher.call(
+            lambda: model.generate_content(prompt, generation_config=generation_config, stream=stream))
+
+
+class ReplicateBackend:
+    """CodeLlama on Replicate, with a dispatcher of its own."""
+
+    def __init__(self, model=REPLICATE_MODEL, name="replicate"):
+        self.name = name
+        self.model = model
+        self.dispatcher = Dispatcher("Replicate", rate=REPLICATE_RATE)
+        register_metrics(self.dispatcher.prometheus_text)
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        generation_config = generation_config or {}
+        model_input = {
+            "prompt": prompt,
+            "temperature": generation_config.get("temperature", 0.7),
+            "max_tokens": generation_config.get("max_output_tokens") or REPLICATE_MAX_TOKENS,
+        }
+        output = self.dispatcher.call(lambda: get_replicate_client().run(self.model, input=model_input))
+        # Language models on Replicate return their output as a list of text pieces
+        return ReplicateResponse("".join(output) if isinstance(output, list) else str(output))
+
+
+class CircuitBreaker:
+    """Takes a backend out after `failures` errors in a row; after `cooldown` seconds one trial call decides."""
+
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN_SECONDS):
+        self.failures = max(1, failures)
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    # True if a call may go to the backend now (in half-open state only the one trial call may)
+    def allow(self):
+        with self._lock:
+            if self.state == OPEN and time.time() - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failures:
+                if self.state != OPEN:
+                    self.times_opened += 1
+                self.state = OPEN
+                self.opened_at = time.time()
+            self._trial_running = False
+
+
+class _BackendState:
+    def __init__(self, backend, breaker):
+        self.backend = backend
+        self.breaker = breaker
+        # stream -> seconds until each successful call returned. A streamed call returns at its first chunk, a
+        # plain one with the whole answer, so the two are kept apart (and hedged on their own quantiles).
+        self.latency = {False: RollingHistogram(), True: RollingHistogram()}
+        self.counters = {"calls": 0, "failures": 0, "wins": 0, "hedge_calls": 0, "late": 0}
+
+
+class ModelRouter:
+    """Sends each generation to the preferred backend that is up, hedging with the next one when it runs slow.
+
+    A hedged request asks the next backend too once the primary has taken longer than its own p95 (see
+    HEDGE_QUANTILE); whichever answers first is used and the other answer is thrown away. A backend that fails
+    is answered for by the next one straight away, and one that keeps failing is skipped by its circuit breaker.
+    """
+
+    def __init__(self, backends, model_name=None, hedge=HEDGE_REQUESTS, hedge_quantile=HEDGE_QUANTILE,
+                 hedge_min_samples=HEDGE_MIN_SAMPLES, hedge_default=HEDGE_DEFAULT_SECONDS,
+                 hedge_min=HEDGE_MIN_SECONDS, breaker_failures=BREAKER_FAILURES,
+                 breaker_cooldown=BREAKER_COOLDOWN_SECONDS, workers=ROUTER_WORKERS):
+        self.model_name = model_name
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_default = hedge_default
+        self.hedge_min = hedge_min
+        self._states = [_BackendState(backend, CircuitBreaker(breaker_failures, breaker_cooldown))
+                        for backend in backends]
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="model-router")
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "hedged": 0, "fallback_wins": 0, "failovers": 0, "failed": 0}
+
+    @property
+    def backend_names(self):
+        return [state.backend.name for state in self._states]
+
+    # Seconds to wait for a backend before hedging: its recent latency quantile (for calls streamed or not, like
+    # this one) once it has enough samples
+    def hedge_delay(self, state, stream=False):
+        latency = state.latency[bool(stream)]
+        with self._lock:
+            if len(latency.samples) < self.hedge_min_samples:
+                return self.hedge_default
+            delay = latency.percentiles((self.hedge_quantile,))[self.hedge_quantile]
+        return max(self.hedge_min, delay)
+
+    # Same call as a Gemini model's generate_content; returns (response, route), where route says which
+    # backend answered and whether the request was hedged or failed over
+    def generate(self, prompt, generation_config=None, stream=False):
+        with self._lock:
+            self._counters["requests"] += 1
+        start = time.perf_counter()
+        remaining = list(self._states)
+        running = {}            # Future -> _BackendState
+        errors = []
+        route = {'hedged': False, 'failover': False}
+
+        def launch(hedge):
+            while remaining:
+                state = remaining.pop(0)
+                if state.breaker.allow():
+                    if hedge:
+                        with self._lock:
+                            state.counters["hedge_calls"] += 1
+                    running[self._executor.submit(contextvars.copy_context().run, self._call, state, prompt,
+                                                  generation_config, stream)] = state
+                    return state
+            return None
+
+        primary = launch(hedge=False)
+        if primary is None:
+            # Every breaker is open: trying the preferred backend beats failing without asking anyone
+            remaining = self._states[1:]
+            primary = self._states[0]
+            running[self._executor.submit(contextvars.copy_context().run, self._call, primary, prompt,
+                                          generation_config, stream)] = primary
+        # The backend being waited for and when it was asked: the primary, or the backend it failed over to
+        current, launched_at = primary, start
+        while running:
+            timeout = None
+            if self.hedge and len(running) == 1 and remaining and not route['hedged']:
+                timeout = max(0.0, self.hedge_delay(current, stream) - (time.perf_counter() - launched_at))
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                if launch(hedge=True) is not None:
+                    route['hedged'] = True
+                    route['hedged_after'] = round(time.perf_counter() - start, 3)
+                    with self._lock:
+                        self._counters["hedged"] += 1
+                continue
+            for future in done:
+                state = running.pop(future)
+                if future.exception() is None:
+                    self._finish(state, primary, running)
+                    route.update(backend=state.backend.name, seconds=round(time.perf_counter() - start, 3))
+                    return future.result(), route
+                errors.append(future.exception())
+            if not running:
+                current, launched_at = launch(hedge=False), time.perf_counter()
+                if current is None:
+                    break
+                route['failover'] = True
+                with self._lock:
+                    self._counters["failovers"] += 1
+        with self._lock:
+            self._counters["failed"] += 1
+        raise errors[-1]
+
+    def _call(self, state, prompt, generation_config, stream):
+        with self._lock:
+            state.counters["calls"] += 1
+        start = time.perf_counter()
+        try:
+            response = state.backend.generate_content(prompt, generation_config=generation_config, stream=stream)
+        except Exception:
+            state.breaker.record_failure()
+            with self._lock:
+                state.counters["failures"] += 1
+            record_span("backend_call", time.perf_counter() - start, error=True, backend=state.backend.name)
+            raise
+        seconds = time.perf_counter() - start
+        state.breaker.record_success()
+        with self._lock:
+            state.latency[bool(stream)].observe(seconds)
+        record_span("backend_call", seconds, backend=state.backend.name)
+        return response
+
+    # The winner is counted; calls still running finish on their own and their answers are dropped
+    def _finish(self, winner, primary, running):
+        with self._lock:
+            winner.counters["wins"] += 1
+            if winner is not primary:
+                self._counters["fallback_wins"] += 1
+            for state in running.values():
+                state.counters["late"] += 1
+
+    def stats(self):
+        backends = []
+        with self._lock:
+            stats = dict(self._counters)
+            for state in self._states:
+                row = {"backend": state.backend.name, "breaker": state.breaker.state,
+                       "times_opened": state.breaker.times_opened, **state.counters}
+                # Whole answers, then streamed calls up to their first chunk
+                for prefix, stream in (("", False), ("first_chunk_", True)):
+                    percentiles = state.latency[stream].percentiles((0.5, 0.95))
+                    for quantile, column in ((0.5, "p50"), (0.95, "p95")):
+                        value = percentiles[quantile]
+                        row[prefix + column] = None if value is None else round(value, 3)
+                backends.append(row)
+        for row, state in zip(backends, self._states):
+            row["hedge_delay"] = round(self.hedge_delay(state), 3)
+            row["first_chunk_hedge_delay"] = round(self.hedge_delay(state, stream=True), 3)
+        stats["backends"] = backends
+        return stats
+
+    def prometheus_text(self):
+        stats = self.stats()
+        model = f'model="{self.model_name}"'
+        lines = []
+        for name, kind, help_text, value in (
+            ("requests_total", "counter", "Generations routed.", stats["requests"]),
+            ("hedged_total", "counter", "Generations that also asked the next backend.", stats["hedged"]),
+            ("fallback_wins_total", "counter", "Generations answered by a backend other than the primary.", stats["fallback_wins"]),
+            ("failovers_total", "counter", "Generations retried on the next backend after an error.", stats["failovers"]),
+            ("failed_total", "counter", "Generations every backend failed.", stats["failed"]),
+        ):
+            lines += [f"# HELP codesnack_router_{name} {help_text}", f"# TYPE codesnack_router_{name} {kind}",
+                      f"codesnack_router_{name}{{{model}}} {value}"]
+        for name, kind, help_text, column in (
+            ("backend_calls_total", "counter", "Calls sent to each backend.", "calls"),
+            ("backend_failures_total", "counter", "Calls to each backend that raised an error.", "failures"),
+            ("backend_wins_total", "counter", "Generations each backend answered first.", "wins"),
+            ("backend_open", "gauge", "1 while the backend's circuit breaker keeps calls away from it.", "breaker"),
+        ):
+            lines += [f"# HELP codesnack_router_{name} {help_text}", f"# TYPE codesnack_router_{name} {kind}"]
+            for row in stats["backends"]:
+                value = int(row["breaker"] == OPEN) if column == "breaker" else row[column]
+                lines.append(f'codesnack_router_{name}{{{model},backend="{row["backend"]}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+#Function | Backends named in CODESNACK_BACKENDS; by default Gemini, with Replicate behind it when a token (or the stubs) is there
+def build_backends(model_name, names=None):
+    names = names or ROUTER_BACKENDS
+    if not names:
+        names = "gemini,replicate" if stub_mode() or os.getenv("REPLICATE_API_TOKEN") else "gemini"
+    builders = {"gemini": lambda: GeminiBackend(model_name), "replicate": ReplicateBackend}
+    backends = []
+    for name in names.split(","):
+        name = name.strip().lower()
+        if name not in builders:
+            raise ValueError(f"Unknown backend '{name}' in CODESNACK_BACKENDS (choose from {', '.join(builders)})")
+        backends.append(builders[name]())
+    return backends
+
+
+_routers = {}
+_router_lock = threading.Lock()
+
+
+#Function | Process-wide model router for content generation, one per model
+def get_model_router(model_name):
+    with _router_lock:
+        router = _routers.get(model_name)
+        if router is None:
+            router = _routers[model_name] = ModelRouter(build_backends(model_name), model_name=model_name)
+            register_metrics(router.prometheus_text)
+        return router
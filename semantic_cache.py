@@ -0,0 +1,261 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from response_cache import get_cache_dir, normalize_prompt
+
+# ✅ Semantic cache settings: "python for loops" and "For-loops in Python" share one answer
+SEMANTIC_CACHE = os.getenv("CODESNACK_SEMANTIC_CACHE", "true").lower() in ("1", "true", "yes", "on")
+SEMANTIC_THRESHOLD = float(os.getenv("CODESNACK_SEMANTIC_THRESHOLD", 0.9))         # cosine similarity needed for a hit
+SEMANTIC_MAX_ENTRIES = int(os.getenv("CODESNACK_SEMANTIC_MAX_ENTRIES", 100000))    # least recently used dropped past this
+SEMANTIC_DIMENSIONS = int(os.getenv("CODESNACK_SEMANTIC_DIMENSIONS", 128))         # size of every topic vector
+
+_WORD = re.compile(r"[a-z0-9+#]+")
+# Filler words that change how a topic is phrased, not what it is about
+STOPWORDS = {"a", "an", "the", "in", "of", "to", "with", "and", "on", "using", "about", "into", "how",
+             "what", "is", "are", "intro", "introduction"}
+# A whole word counts as much as this many of its character trigrams
+WORD_WEIGHT = 2.0
+# Bump whenever topic_terms or embed_topic change: stored vectors are then embedded again on load
+EMBEDDING_VERSION = 2
+_INITIAL_ROWS = 64
+
+
+#Function | Words a topic is about: lower case, filler dropped, plurals folded ("dictionaries" -> "dictionary",
+# "classes" -> "class", "loops" -> "loop"; keeps c++ and c# intact)
+def topic_terms(topic):
+    terms = []
+    for word in _WORD.findall(topic.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 4 and word.endswith("ies"):
+            word = word[:-3] + "y"
+        elif word.endswith("sses"):
+            word = word[:-2]
+        elif len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+#Function | Hash a topic's words and character trigrams into a signed, L2-normalised vector. Word order is
+# ignored, and one changed word still leaves most trigrams shared, so close phrasings score near 1.
+def embed_topic(topic, dimensions=SEMANTIC_DIMENSIONS):
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for term in topic_terms(topic):
+        features = [(f"w:{term}", WORD_WEIGHT)]
+        padded = f" {term} "
+        features += [(padded[i:i + 3], 1.0) for i in range(len(padded) - 2)]
+        for feature, weight in features:
+            code = zlib.crc32(feature.encode("utf-8"))
+            # The top bit picks the sign, so unrelated features that share a bucket cancel out on average
+            vector[code % dimensions] += weight if code & 0x80000000 else -weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+#Function | Which prompts a topic may be swapped in: the same model, temperature and prompt apart from the topic
+# (so the template, learner level and context all have to match exactly). None when the topic is not in the prompt.
+def prompt_shape(model_name, prompt, topic, temperature):
+    topic = normalize_prompt(topic or "")
+    prompt = normalize_prompt(prompt)
+    if len(topic) < 3 or topic not in prompt:
+        return None
+    raw = json.dumps([model_name, prompt.replace(topic, "\x00"), round(float(temperature), 3)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _Partition:
+    """Topic vectors of one prompt shape in a growable matrix; rows are swapped out on removal so it stays dense."""
+
+    def __init__(self, dimensions):
+        self.vectors = np.zeros((_INITIAL_ROWS, dimensions), dtype=np.float32)
+        self.keys = []
+        self.topics = []
+        self.rows = {}      # cache key -> row
+
+    def add(self, key, topic, vector):
+        if len(self.keys) == len(self.vectors):
+            grown = np.zeros((2 * len(self.vectors), self.vectors.shape[1]), dtype=np.float32)
+            grown[:len(self.keys)] = self.vectors
+            self.vectors = grown
+        self.vectors[len(self.keys)] = vector
+        self.rows[key] = len(self.keys)
+        self.keys.append(key)
+        self.topics.append(topic)
+
+    def remove(self, key):
+        row = self.rows.pop(key)
+        last = len(self.keys) - 1
+        if row != last:
+            self.vectors[row] = self.vectors[last]
+            self.keys[row], self.topics[row] = self.keys[last], self.topics[last]
+            self.rows[self.keys[row]] = row
+        self.keys.pop()
+        self.topics.pop()
+
+    # (row, similarity) of the closest topic
+    def nearest(self, vector):
+        scores = self.vectors[:len(self.keys)] @ vector
+        row = int(np.argmax(scores))
+        return row, float(scores[row])
+
+
+class SemanticCache:
+    """In-memory vector index over the topics of cached answers, persisted to SQLite.
+
+    It stores no answers itself: a hit is the response cache key of the closest earlier topic,
+    looked up in the response cache like an exact match.
+    """
+
+    def __init__(self, path=None, threshold=SEMANTIC_THRESHOLD, max_entries=SEMANTIC_MAX_ENTRIES,
+                 dimensions=SEMANTIC_DIMENSIONS):
+        if path is None:
+            path = os.path.join(get_cache_dir(), "semantic.sqlite3")
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.dimensions = dimensions
+
+        self._partitions = {}           # prompt shape -> _Partition
+        self._entries = OrderedDict()   # cache key -> prompt shape, least recently used first
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "lookup_seconds": 0.0}
+
+        # Streamlit serves sessions from several threads, so one shared connection behind a lock
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS topics ("
+            " key TEXT PRIMARY KEY,"
+            " shape TEXT NOT NULL,"
+            " topic TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._db.commit()
+        self._load()
+
+    # Rebuilds the index from disk, oldest use first; vectors of another size are embedded again, and all of them
+    # are (and saved back) when they were stored under an older EMBEDDING_VERSION
+    def _load(self):
+        outdated = self._db.execute("PRAGMA user_version").fetchone()[0] != EMBEDDING_VERSION
+        for key, shape, topic, blob in self._db.execute(
+                "SELECT key, shape, topic, vector FROM topics ORDER BY last_access ASC").fetchall():
+            vector = np.frombuffer(blob, dtype=np.float32)
+            if outdated or len(vector) != self.dimensions:
+                vector = embed_topic(topic, self.dimensions)
+                if outdated:
+                    self._db.execute("UPDATE topics SET vector = ? WHERE key = ?", (vector.tobytes(), key))
+            self._insert(key, shape, topic, vector)
+        self._evict()
+        self._db.execute(f"PRAGMA user_version = {EMBEDDING_VERSION}")
+        self._db.commit()
+
+    # Closest earlier topic with the same prompt shape: {'key', 'topic', 'similarity'}, or None below the threshold
+    def lookup(self, shape, topic):
+        start = time.perf_counter()
+        vector = embed_topic(topic, self.dimensions)
+        with self._lock:
+            match = None
+            partition = self._partitions.get(shape)
+            if partition is not None and partition.keys and vector.any():
+                row, similarity = partition.nearest(vector)
+                if similarity >= self.threshold:
+                    match = {'key': partition.keys[row], 'topic': partition.topics[row],
+                             'similarity': round(similarity, 3)}
+                    self._entries.move_to_end(match['key'])
+                    self._db.execute("UPDATE topics SET last_access = ? WHERE key = ?", (time.time(), match['key']))
+                    self._db.commit()
+            self._counters["hits" if match else "misses"] += 1
+            self._counters["lookup_seconds"] += time.perf_counter() - start
+        return match
+
+    # Indexes the topic of an answer just stored in the response cache under key
+    def add(self, shape, topic, key):
+        vector = embed_topic(topic, self.dimensions)
+        if not vector.any():
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._insert(key, shape, topic, vector)
+            self._db.execute(
+                "INSERT OR REPLACE INTO topics (key, shape, topic, vector, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, shape, topic, vector.tobytes(), time.time()),
+            )
+            self._evict()
+            self._db.commit()
+
+    # Drops an entry whose answer is no longer in the response cache
+    def forget(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self._db.execute("DELETE FROM topics WHERE key = ?", (key,))
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._partitions.clear()
+            self._entries.clear()
+            self._db.execute("DELETE FROM topics")
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+            stats["partitions"] = len(self._partitions)
+            stats["index_bytes"] = sum(partition.vectors.nbytes for partition in self._partitions.values())
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        lookup_seconds = stats.pop("lookup_seconds")
+        stats["mean_lookup_ms"] = round(lookup_seconds * 1000 / lookups, 3) if lookups else 0.0
+        stats["threshold"] = self.threshold
+        return stats
+
+    # The helpers below expect the caller to hold the lock
+
+    def _insert(self, key, shape, topic, vector):
+        partition = self._partitions.get(shape)
+        if partition is None:
+            partition = self._partitions[shape] = _Partition(self.dimensions)
+        partition.add(key, topic, vector)
+        self._entries[key] = shape
+
+    def _remove(self, key):
+        shape = self._entries.pop(key)
+        partition = self._partitions[shape]
+        partition.remove(key)
+        if not partition.keys:
+            del self._partitions[shape]
+
+    def _evict(self):
+        while self.max_entries and len(self._entries) > self.max_entries:
+            key = next(iter(self._entries))
+            self._remove(key)
+            self._db.execute("DELETE FROM topics WHERE key = ?", (key,))
+            self._counters["evictions"] += 1
+
+
+_semantic_cache = None
+_semantic_cache_lock = threading.Lock()
+
+
+#Function | Process-wide semantic cache shared by every Streamlit session
+def get_semantic_cache():
+    global _semantic_cache
+    with _semantic_cache_lock:
+        if _semantic_cache is None:
+            _semantic_cache = SemanticCache()
+        return _semantic_cache
@@ -0,0 +1,222 @@
+import hashlib
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict, namedtuple
+
+from tracing import register_metrics
+
+# ✅ Session memory settings: what a browser session may keep between reruns (outputs, not jobs in flight)
+SESSION_MEMORY_BYTES = int(os.getenv("CODESNACK_SESSION_MEMORY_BYTES", 1024 * 1024))   # per session; least recently shown outputs go past this
+SESSION_IDLE_SECONDS = float(os.getenv("CODESNACK_SESSION_IDLE", 1800))                # sessions not seen for this long are dropped
+BLOB_MIN_BYTES = int(os.getenv("CODESNACK_BLOB_MIN_BYTES", 1024))                      # shorter texts stay in session state as they are
+SWEEP_INTERVAL_SECONDS = 60
+
+
+# A text moved out of session state: its handle in the blob store and its size before compression
+BlobRef = namedtuple("BlobRef", "handle size")
+
+
+class BlobStore:
+    """Compressed texts shared by every session, addressed by their hash and freed when nothing refers to them.
+
+    Many students ask for the same cached lesson, so one copy serves all of them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._blobs = {}    # handle -> [compressed bytes, size, references]
+        self._counters = {"stored": 0, "shared": 0, "freed": 0}
+
+    # Adds one reference to the text and returns its handle
+    def put(self, text):
+        data = text.encode("utf-8")
+        handle = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            blob = self._blobs.get(handle)
+            if blob is not None:
+                blob[2] += 1
+                self._counters["shared"] += 1
+                return handle
+        compressed = zlib.compress(data, 6)
+        with self._lock:
+            blob = self._blobs.setdefault(handle, [compressed, len(data), 0])
+            blob[2] += 1
+            self._counters["stored" if blob[2] == 1 else "shared"] += 1
+        return handle
+
+    # The text, or None once every reference to it is gone
+    def get(self, handle):
+        with self._lock:
+            blob = self._blobs.get(handle)
+        return zlib.decompress(blob[0]).decode("utf-8") if blob is not None else None
+
+    def release(self, handle):
+        with self._lock:
+            blob = self._blobs.get(handle)
+            if blob is None:
+                return
+            blob[2] -= 1
+            if blob[2] <= 0:
+                del self._blobs[handle]
+                self._counters["freed"] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["blobs"] = len(self._blobs)
+            stats["references"] = sum(blob[2] for blob in self._blobs.values())
+            stats["raw_bytes"] = sum(blob[1] for blob in self._blobs.values())
+            stats["stored_bytes"] = sum(len(blob[0]) for blob in self._blobs.values())
+        return stats
+
+
+class SessionMemory:
+    """Per-session registry of outputs kept between reruns, within a byte budget, with their large texts in a BlobStore.
+
+    Session state holds the output with every long text swapped for a BlobRef (see store and load). A session
+    over its budget loses its least recently shown outputs; sessions idle for idle_seconds lose all of them.
+    """
+
+    def __init__(self, budget=SESSION_MEMORY_BYTES, idle_seconds=SESSION_IDLE_SECONDS, min_bytes=BLOB_MIN_BYTES):
+        self.budget = budget
+        self.idle_seconds = idle_seconds
+        self.min_bytes = min_bytes
+        self.blobs = BlobStore()
+        self._lock = threading.Lock()
+        self._sessions = {}     # session id -> {'slots': OrderedDict(slot -> (handles, bytes)), 'last_seen'}
+        self._last_sweep = time.monotonic()
+        self._counters = {"evictions": 0, "idle_sessions_dropped": 0}
+
+    # Marks the session as active; every SWEEP_INTERVAL_SECONDS this also drops the sessions that went idle
+    def touch(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            self._session(session_id, now)
+            if now - self._last_sweep < SWEEP_INTERVAL_SECONDS:
+                return
+            self._last_sweep = now
+            idle = [sid for sid, session in self._sessions.items() if now - session['last_seen'] > self.idle_seconds]
+            for sid in idle:
+                for handles, _ in self._sessions.pop(sid)['slots'].values():
+                    self._release(handles)
+            self._counters["idle_sessions_dropped"] += len(idle)
+
+    # The output with its long texts (at any depth of dicts and lists) moved to the blob store, to keep in session state
+    def store(self, session_id, slot, output):
+        handles = []
+        compact = self._compact(output, handles)
+        size = sum(ref.size for ref in handles)
+        with self._lock:
+            session = self._session(session_id, time.monotonic())
+            previous = session['slots'].pop(slot, None)
+            if previous is not None:
+                self._release(previous[0])
+            session['slots'][slot] = ([ref.handle for ref in handles], size)
+            # Oldest first, never the output being stored
+            while sum(bytes_ for _, bytes_ in session['slots'].values()) > self.budget and len(session['slots']) > 1:
+                _, (evicted, _) = session['slots'].popitem(last=False)
+                self._release(evicted)
+                self._counters["evictions"] += 1
+        return compact
+
+    # The output store() was given, or None if it has been evicted (or its session dropped) since
+    def load(self, session_id, slot, compact):
+        with self._lock:
+            session = self._session(session_id, time.monotonic())
+            if slot not in session['slots']:
+                return None
+            session['slots'].move_to_end(slot)
+        try:
+            return self._expand(compact)
+        except KeyError:
+            # Evicted by another rerun of the same session while it was being read
+            return None
+
+    def forget(self, session_id, slot):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            entry = session['slots'].pop(slot, None) if session else None
+            if entry is not None:
+                self._release(entry[0])
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            sessions = [{'session': session_id[:8], 'outputs': len(session['slots']),
+                         'bytes': sum(bytes_ for _, bytes_ in session['slots'].values()),
+                         'idle_seconds': round(now - session['last_seen'], 1)}
+                        for session_id, session in self._sessions.items()]
+            stats = dict(self._counters)
+        sessions.sort(key=lambda row: row['bytes'], reverse=True)
+        blobs = self.blobs.stats()
+        stats.update(sessions=sessions, session_count=len(sessions), budget=self.budget,
+                     referenced_bytes=sum(row['bytes'] for row in sessions), blob_count=blobs['blobs'],
+                     raw_bytes=blobs['raw_bytes'], stored_bytes=blobs['stored_bytes'], shared=blobs['shared'])
+        return stats
+
+    def prometheus_text(self):
+        stats = self.stats()
+        lines = []
+        for name, kind, help_text, value in (
+            ("sessions", "gauge", "Sessions with outputs kept between reruns.", stats["session_count"]),
+            ("referenced_bytes", "gauge", "Output bytes all sessions refer to, before sharing and compression.", stats["referenced_bytes"]),
+            ("stored_bytes", "gauge", "Compressed bytes in the shared blob store.", stats["stored_bytes"]),
+            ("blobs", "gauge", "Distinct texts in the shared blob store.", stats["blob_count"]),
+            ("evictions_total", "counter", "Outputs dropped to keep a session in its budget.", stats["evictions"]),
+            ("idle_sessions_dropped_total", "counter", "Sessions dropped after going idle.", stats["idle_sessions_dropped"]),
+        ):
+            lines += [f"# HELP codesnack_session_memory_{name} {help_text}", f"# TYPE codesnack_session_memory_{name} {kind}",
+                      f"codesnack_session_memory_{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def _compact(self, value, handles):
+        if isinstance(value, str) and len(value) >= self.min_bytes:
+            ref = BlobRef(self.blobs.put(value), len(value.encode("utf-8")))
+            handles.append(ref)
+            return ref
+        if isinstance(value, dict):
+            return {key: self._compact(item, handles) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._compact(item, handles) for item in value]
+        return value
+
+    def _expand(self, value):
+        if isinstance(value, BlobRef):
+            text = self.blobs.get(value.handle)
+            if text is None:
+                raise KeyError(value.handle)
+            return text
+        if isinstance(value, dict):
+            return {key: self._expand(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._expand(item) for item in value]
+        return value
+
+    # The helpers below expect the caller to hold the lock
+
+    def _session(self, session_id, now):
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = {'slots': OrderedDict(), 'last_seen': now}
+        session['last_seen'] = now
+        return session
+
+    def _release(self, handles):
+        for handle in handles:
+            self.blobs.release(handle)
+
+
+_session_memory = None
+_session_memory_lock = threading.Lock()
+
+
+#Function | Process-wide session memory manager shared by every Streamlit session
+def get_session_memory():
+    global _session_memory
+    with _session_memory_lock:
+        if _session_memory is None:
+            _session_memory = SessionMemory()
+            register_metrics(_session_memory.prometheus_text)
+        return _session_memory
@@ -0,0 +1,57 @@
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# ✅ Speculative mode: run the Gemini topic check and the generation at the same time
+SPECULATIVE_MODE = os.getenv("CODESNACK_SPECULATIVE", "false").lower() in ("1", "true", "yes", "on")
+SPECULATIVE_WORKERS = int(os.getenv("CODESNACK_SPECULATIVE_WORKERS", 8))
+
+# Shared by every session; module-level state survives Streamlit reruns
+_executor = ThreadPoolExecutor(max_workers=SPECULATIVE_WORKERS, thread_name_prefix="speculative")
+
+
+def _timed(fn, timings, name):
+    start = time.perf_counter()
+    try:
+        return fn()
+    finally:
+        timings[name] = time.perf_counter() - start
+
+
+#Function | Start classify() and generate() together; generate()'s result is only used if classify() says yes
+def run_speculative(classify, generate, timeout=None):
+    start = time.perf_counter()
+    timings = {}
+
+    # Each call runs in a copy of the caller's context, so trace labels set by the caller still apply
+    classifier_future = _executor.submit(contextvars.copy_context().run, _timed, classify, timings, 'classifier_time')
+    generation_future = _executor.submit(contextvars.copy_context().run, _timed, generate, timings, 'generation_time')
+
+    try:
+        answer = classifier_future.result(timeout=timeout)
+    except BaseException:
+        generation_future.cancel()
+        raise
+
+    response = None
+    if answer == "yes":
+        response = generation_future.result(timeout=timeout)
+        discarded = False
+    else:
+        # A call that already started cannot be interrupted; its result is simply thrown away
+        generation_future.cancel()
+        discarded = True
+
+    wall_time = time.perf_counter() - start
+    report = {
+        'wall_time': round(wall_time, 3),
+        'classifier_time': round(timings.get('classifier_time', 0.0), 3),
+        'discarded_generation': discarded
+    }
+    if not discarded:
+        sequential_time = timings['classifier_time'] + timings['generation_time']
+        report['generation_time'] = round(timings['generation_time'], 3)
+        report['sequential_time'] = round(sequential_time, 3)
+        report['time_saved'] = round(sequential_time - wall_time, 3)
+    return answer, response, report
@@ -0,0 +1,179 @@
+import os
+import random
+import time
+import zlib
+
+# Offline stand-ins for the remote APIs, switched on with CODESNACK_BACKEND=stub.
+# Latency, error rate and response size are configurable so pipelines can be exercised without keys.
+STUB_LATENCY_SECONDS = float(os.getenv("CODESNACK_STUB_LATENCY", 0.5))
+STUB_ERROR_RATE = float(os.getenv("CODESNACK_STUB_ERROR_RATE", 0.0))
+STUB_RESPONSE_CHARS = int(os.getenv("CODESNACK_STUB_RESPONSE_CHARS", 2000))
+STUB_CHUNK_CHARS = 200
+# Output speed: when set, every answer also takes len(answer) / this many seconds, as real generation does (0 = off)
+STUB_CHARS_PER_SECOND = float(os.getenv("CODESNACK_STUB_CHARS_PER_SECOND", 0))
+# A slow tail: this share of calls takes STUB_SLOW_LATENCY seconds instead (e.g. to exercise hedged requests)
+STUB_SLOW_RATE = float(os.getenv("CODESNACK_STUB_SLOW_RATE", 0.0))
+STUB_SLOW_LATENCY_SECONDS = float(os.getenv("CODESNACK_STUB_SLOW_LATENCY", 5.0))
+
+STUB_YOUTUBE_LATENCY_SECONDS = float(os.getenv("CODESNACK_STUB_YOUTUBE_LATENCY", 0.3))
+STUB_YOUTUBE_ERROR_RATE = float(os.getenv("CODESNACK_STUB_YOUTUBE_ERROR_RATE", 0.0))
+STUB_YOUTUBE_RESULTS = int(os.getenv("CODESNACK_STUB_YOUTUBE_RESULTS", 10))       # videos per search, at most maxResults
+
+STUB_REPLICATE_LATENCY_SECONDS = float(os.getenv("CODESNACK_STUB_REPLICATE_LATENCY", 1.0))
+STUB_REPLICATE_ERROR_RATE = float(os.getenv("CODESNACK_STUB_REPLICATE_ERROR_RATE", 0.0))
+STUB_REPLICATE_RESPONSE_CHARS = int(os.getenv("CODESNACK_STUB_REPLICATE_RESPONSE_CHARS", 1500))
+
+
+#Function | True when the app should talk to the stubs instead of the real services
+def stub_mode():
+    return os.getenv("CODESNACK_BACKEND", "").lower() == "stub"
+
+
+class StubUsage:
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class StubTokenCount:
+    def __init__(self, total_tokens):
+        self.total_tokens = total_tokens
+
+
+class StubResponse:
+    def __init__(self, text, prompt):
+        self.text = text
+        self.usage_metadata = StubUsage(max(1, len(prompt) // 4), max(1, len(text) // 4))
+
+
+class StubStream:
+    def __init__(self, text, prompt, chunk_delay):
+        self._text = text
+        self._chunk_delay = chunk_delay
+        self.usage_metadata = StubUsage(max(1, len(prompt) // 4), max(1, len(text) // 4))
+
+    def __iter__(self):
+        for i in range(0, len(self._text), STUB_CHUNK_CHARS):
+            time.sleep(self._chunk_delay)
+            yield StubResponse(self._text[i:i + STUB_CHUNK_CHARS], "")
+
+
+class StubGeminiModel:
+    """Mimics genai.GenerativeModel.generate_content closely enough for content.py."""
+
+    def __init__(self, model_name, latency=None, error_rate=None, response_chars=None, seed=None,
+                 slow_rate=None, slow_latency=None, chars_per_second=None):
+        self.model_name = model_name
+        self.latency = STUB_LATENCY_SECONDS if latency is None else latency
+        self.error_rate = STUB_ERROR_RATE if error_rate is None else error_rate
+        self.response_chars = STUB_RESPONSE_CHARS if response_chars is None else response_chars
+        self.slow_rate = STUB_SLOW_RATE if slow_rate is None else slow_rate
+        self.slow_latency = STUB_SLOW_LATENCY_SECONDS if slow_latency is None else slow_latency
+        self.chars_per_second = STUB_CHARS_PER_SECOND if chars_per_second is None else chars_per_second
+        self._random = random.Random(seed)
+
+    # Latency of one call: usually the configured one, now and then the slow tail
+    def _latency(self):
+        if self.slow_rate and self._random.random() < self.slow_rate:
+            return self.slow_latency
+        return self.latency
+
+    # Extra time spent writing the answer out
+    def _writing_time(self, text):
+        return len(text) / self.chars_per_second if self.chars_per_second else 0.0
+
+    def _maybe_fail(self):
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise RuntimeError("429 Resource has been exhausted (stub backend)")
+
+    def _answer(self, prompt, max_output_tokens=None):
+        # The topic check always passes; everything else gets filler text of the configured size
+        if prompt.startswith("Is the following topic related to programming"):
+            return "yes"
+        size = self.response_chars
+        # Outlines are a few lines; one section of a sectioned document is about a quarter of a whole one
+        if prompt.startswith("Write a short outline"):
+            size = min(size, 300)
+        elif prompt.startswith("You are writing one section"):
+            size //= 4
+        if max_output_tokens:
+            size = min(size, max_output_tokens * 4)
+        line = f"📘 **Stub answer** for: {prompt[:60]}\n"
+        return (line * (size // len(line) + 1))[:size]
+
+    def generate_content(self, prompt, generation_config=None, stream=False, **kwargs):
+        max_output_tokens = (generation_config or {}).get("max_output_tokens")
+        text = self._answer(prompt, max_output_tokens)
+        latency = self._latency()
+        if stream:
+            # Roughly half the latency before the first chunk, the rest and the writing spread over the chunks
+            time.sleep(latency / 2)
+            self._maybe_fail()
+            chunks = max(1, len(text) // STUB_CHUNK_CHARS)
+            return StubStream(text, prompt, (latency / 2 + self._writing_time(text)) / chunks)
+        time.sleep(latency + self._writing_time(text))
+        self._maybe_fail()
+        return StubResponse(text, prompt)
+
+    def count_tokens(self, contents):
+        return StubTokenCount(max(1, len(str(contents)) // 4))
+
+
+class StubYouTubeRequest:
+    def __init__(self, client, query, max_results):
+        self.client = client
+        self.query = query
+        self.max_results = max_results
+
+    # Same call shape as googleapiclient's HttpRequest.execute(http=...)
+    def execute(self, http=None, num_retries=0):
+        time.sleep(self.client.latency)
+        if self.client.error_rate and self.client._random.random() < self.client.error_rate:
+            raise RuntimeError("403 quotaExceeded (stub backend)")
+        items = []
+        for i in range(min(self.max_results, self.client.results)):
+            video_id = f"stub{zlib.crc32(f'{self.query}|{i}'.encode()) % 10**7:07d}"
+            items.append({
+                'id': {'kind': 'youtube#video', 'videoId': video_id},
+                'snippet': {
+                    'title': f"Stub tutorial {i + 1}: {self.query}",
+                    'thumbnails': {'default': {'url': f"https://i.ytimg.com/vi/{video_id}/default.jpg"}}
+                }
+            })
+        return {'kind': 'youtube#searchListResponse', 'items': items}
+
+
+class StubYouTubeClient:
+    """Mimics the parts of the YouTube Data API client used by content.fetch_youtube_videos."""
+
+    def __init__(self, latency=None, error_rate=None, results=None, seed=None):
+        self.latency = STUB_YOUTUBE_LATENCY_SECONDS if latency is None else latency
+        self.error_rate = STUB_YOUTUBE_ERROR_RATE if error_rate is None else error_rate
+        self.results = STUB_YOUTUBE_RESULTS if results is None else results
+        self._random = random.Random(seed)
+
+    def search(self):
+        return self
+
+    def list(self, part=None, q="", type=None, maxResults=5, **kwargs):
+        return StubYouTubeRequest(self, q, maxResults)
+
+
+class StubReplicateClient:
+    """Mimics replicate.Client.run() for the code-explaining copilot."""
+
+    def __init__(self, latency=None, error_rate=None, response_chars=None, seed=None):
+        self.latency = STUB_REPLICATE_LATENCY_SECONDS if latency is None else latency
+        self.error_rate = STUB_REPLICATE_ERROR_RATE if error_rate is None else error_rate
+        self.response_chars = STUB_REPLICATE_RESPONSE_CHARS if response_chars is None else response_chars
+        self._random = random.Random(seed)
+
+    # Language models on Replicate return their output as a list of text pieces
+    def run(self, model, input=None, **kwargs):
+        time.sleep(self.latency)
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise RuntimeError("Prediction failed: 503 (stub backend)")
+        line = "🛠️ Stub copilot: this code works; consider adding comments and semantic tags.\n"
+        text = (line * (self.response_chars // len(line) + 1))[:self.response_chars]
+        return [text[i:i + STUB_CHUNK_CHARS] for i in range(0, len(text), STUB_CHUNK_CHARS)]
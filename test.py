@@ -1,42 +1,39 @@
 import streamlit as st
 from io import BytesIO
 import time
-import os
 import re
-import google.generativeai as genai
 from dotenv import load_dotenv
-import replicate
- 
-from googleapiclient.discovery import build
- 
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
- 
-# ✅ Load environment variables from .env file
-load_dotenv()
+
+from assets import get_favicon, get_logo
+from resources import execute_request, get_gemini_model, get_replicate_client, get_youtube_client
+from tracing import span
  
-# ✅ Configure Gemini API with the loaded key
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+# ✅ Load environment variables from .env file (once per process; the Gemini SDK is configured by resources.py on first use)
+@st.cache_resource(show_spinner=False)
+def load_environment():
+    load_dotenv()
+
+load_environment()
  
  
 def replicate_copilot(code_snippet: str) -> str:
     model = "meta/codellama-70b-instruct:a279116fe47a0f65701a8817188601e2fe8f4b9e04a518789655ea7b995851bf"
-    output = replicate.run(
-        model,
-        input={
-            "prompt": f"Explain and improve this HTML/CSS/JS code, beginner‑friendly:\n{code_snippet}",
-            "temperature": 0.7,
-            "max_length": 512
-        },
-        token=os.getenv("REPLICATE_API_TOKEN")
-    )
+    with span("copilot", template="Replicate"):
+        output = get_replicate_client().run(
+            model,
+            input={
+                "prompt": f"Explain and improve this HTML/CSS/JS code, beginner‑friendly:\n{code_snippet}",
+                "temperature": 0.7,
+                "max_length": 512
+            }
+        )
     return output[0] if isinstance(output, list) else output
  
  
 def generate_content(prompt, temperature=0.7):
     start_time = time.time()
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        model = get_gemini_model('gemini-1.5-flash')
         response = model.generate_content(prompt, generation_config={"temperature": temperature})
         end_time = time.time()
         return {
@@ -63,6 +60,9 @@ def remove_all_asterisks(text):
  
 #Function | Convert to pdf
 def text_to_pdf(text, filename):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
     buffer = BytesIO()
     c = canvas.Canvas(buffer, pagesize=A4)
    
@@ -116,7 +116,7 @@ def text_to_pdf(text, filename):
  
 # Function to search for YouTube videos
 def search_youtube_videos(query):
-    youtube = build('youtube', 'v3', developerKey=os.getenv("YOUTUBE_API_KEY"))
+    youtube = get_youtube_client()
    
     request = youtube.search().list(
         part='snippet',
@@ -125,7 +125,7 @@ def search_youtube_videos(query):
         maxResults=1  # Adjust as needed
     )
    
-    response = request.execute()
+    response = execute_request(request)
    
     if response['items']:
         video = response['items'][0]
@@ -162,8 +162,8 @@ def get_prompt_template(template_type, topic, learner_level, context):
     return base_prompt
  
 # --- Streamlit UI ---
-st.set_page_config(page_title="CodeSnack", page_icon="favicon.ico", layout="centered")
-st.image("codesnack.png")
+st.set_page_config(page_title="CodeSnack", page_icon=get_favicon(), layout="centered")
+st.image(get_logo())
  
 # Practice Arena toggle
 show_practice_arena = st.sidebar.checkbox("🧪 Practice Arena")
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# Modules read their settings at import: point every cache at a scratch directory and use the offline stubs
+os.environ["CODESNACK_CACHE_DIR"] = tempfile.mkdtemp(prefix="codesnack_tests_")
+os.environ["CODESNACK_BACKEND"] = "stub"
+os.environ.setdefault("CODESNACK_STUB_LATENCY", "0")
+# The stubs answer at once; the rate limiter has its own tests (test_dispatcher.py)
+os.environ.setdefault("CODESNACK_GEMINI_RATE", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,42 @@
+import json
+
+import batch_generate
+from batch_generate import load_checkpoint, row_id, run_batch
+
+
+def row(template_type, topic):
+    return {'template_type': template_type, 'topic': topic, 'learner_level': "Beginner", 'context': ""}
+
+
+def read_checkpoint(out_dir):
+    with open(out_dir / "checkpoint.jsonl", encoding='utf-8') as f:
+        return {entry['topic']: entry for entry in map(json.loads, f)}
+
+
+def test_failing_rows_are_checkpointed_and_the_batch_carries_on(tmp_path, monkeypatch):
+    generate_content = batch_generate.generate_content
+
+    def flaky(prompt, temperature=0.7, topic=None):
+        if topic == "explode":
+            raise RuntimeError("connection reset")
+        return generate_content(prompt, temperature=temperature, topic=topic)
+
+    monkeypatch.setattr(batch_generate, "generate_content", flaky)
+    rows = [row("Topic Summary", "python loops"), row("Topic Summary", "explode"), row("Bogus", "python lists"),
+            row("Tutorials", "python sets"), row("Quiz Answer Sheet", "recursion")]
+    stats, _, _ = run_batch(rows, str(tmp_path), workers=2, pdf_workers=1, rate=100)
+
+    entries = read_checkpoint(tmp_path)
+    assert {topic: entry['status'] for topic, entry in entries.items()} == {
+        "python loops": 'ok', "explode": 'error', "python lists": 'skipped', "python sets": 'skipped', "recursion": 'ok'}
+    assert "connection reset" in entries["explode"]['error']
+    assert stats.stages['generate']['errors'] == 1
+    assert (tmp_path / entries["recursion"]['file']).exists()
+
+
+def test_rerun_resumes_only_unfinished_rows(tmp_path):
+    rows = [row("Topic Summary", "python loops"), row("Bogus", "python lists")]
+    run_batch(rows, str(tmp_path), workers=1, pdf_workers=1, rate=100)
+    assert load_checkpoint(str(tmp_path / "checkpoint.jsonl")) == {row_id(r) for r in rows}
+    _, _, skipped = run_batch(rows, str(tmp_path), workers=1, pdf_workers=1, rate=100)
+    assert skipped == 2
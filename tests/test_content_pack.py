@@ -0,0 +1,70 @@
+import hashlib
+
+from content_pack import ContentPack, ContentPackWriter
+from pdf_cache import PdfArtifactCache, pdf_artifact_key
+
+VERSION = hashlib.sha256(b"templates v1").hexdigest()
+
+
+def key(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def build(path, version=VERSION):
+    with ContentPackWriter(str(path), version) as writer:
+        writer.add_json(key("loops"), {'output': "Loops repeat code.", 'token_usage': {'total_tokens': 4}})
+        writer.add(key("bytes"), b"\x00raw bytes\xff" * 100)
+        writer.add(pdf_artifact_key("Prebuilt lesson"), b"%PDF-1.4 prebuilt")
+    return str(path)
+
+
+def test_pack_round_trip(tmp_path):
+    pack = ContentPack(build(tmp_path / "pack.bin"), VERSION)
+    assert pack.usable and pack.entries == 3
+    assert pack.get_json(key("loops")) == {'output': "Loops repeat code.", 'token_usage': {'total_tokens': 4}}
+    assert pack.get(key("bytes")) == b"\x00raw bytes\xff" * 100
+    assert key("loops") in pack and key("functions") not in pack
+    assert pack.get(key("functions")) is None
+    stats = pack.stats()
+    assert (stats["hits"], stats["misses"], stats["status"]) == (2, 1, "ok")
+    pack.close()
+
+
+def test_pack_of_other_templates_is_rejected(tmp_path):
+    pack = ContentPack(build(tmp_path / "pack.bin"), hashlib.sha256(b"templates v2").hexdigest())
+    assert pack.status == "stale" and not pack.usable
+    assert pack.get_json(key("loops")) is None
+    assert key("loops") not in pack
+
+
+def test_missing_and_broken_packs_are_not_used(tmp_path):
+    assert ContentPack(str(tmp_path / "nowhere.bin"), VERSION).status == "missing"
+    assert ContentPack(None, VERSION).status == "disabled"
+    truncated = tmp_path / "truncated.bin"
+    truncated.write_bytes(b"CSNK")
+    assert ContentPack(str(truncated), VERSION).status == "unreadable"
+    garbage = tmp_path / "garbage.bin"
+    garbage.write_bytes(b"not a pack" * 20)
+    assert ContentPack(str(garbage), VERSION).status == "unreadable"
+
+
+def test_failed_build_leaves_the_old_pack_in_place(tmp_path):
+    path = build(tmp_path / "pack.bin")
+    try:
+        with ContentPackWriter(path, VERSION) as writer:
+            writer.add(key("half"), b"half")
+            raise RuntimeError("build interrupted")
+    except RuntimeError:
+        pass
+    pack = ContentPack(path, VERSION)
+    assert pack.entries == 3 and key("half") not in pack
+    assert [p.name for p in tmp_path.iterdir()] == ["pack.bin"]
+
+
+def test_pack_serves_prebuilt_pdfs(tmp_path):
+    cache = PdfArtifactCache()
+    cache.add_source(ContentPack(build(tmp_path / "pack.bin"), VERSION))
+    assert pdf_artifact_key("Prebuilt lesson") in cache
+    assert cache.get("Prebuilt lesson") == b"%PDF-1.4 prebuilt"
+    stats = cache.stats()
+    assert (stats["prebuilt"], stats["renders"]) == (1, 0)
@@ -0,0 +1,73 @@
+from copilot_cache import CopilotCache, code_fingerprint, code_tokens, copilot_cache_key
+
+CODE = """<!-- greeting -->
+<p class="hello">Hi</p>
+<script>
+  // say hello
+  console.log("hi");  /* twice */
+</script>"""
+
+
+def test_whitespace_and_comments_keep_the_fingerprint():
+    reformatted = '<p  class="hello" >Hi</p>\n<script>console.log( "hi" );</script>'
+    assert code_fingerprint(reformatted) == code_fingerprint(CODE)
+    assert code_fingerprint(CODE.replace('"hi"', '"bye"')) != code_fingerprint(CODE)
+
+
+def test_comment_markers_inside_strings_and_urls_are_kept():
+    assert '"http://example.com // not a comment"' in code_tokens('let a = "http://example.com // not a comment";')
+    assert "example" in code_tokens('<a href=http://example.com>x</a>')
+
+
+def test_key_changes_with_model_instructions_and_temperature():
+    key = copilot_cache_key("model", "explain", CODE, 0.7)
+    assert key == copilot_cache_key("model", "explain", "  " + CODE + "\n", 0.7)
+    assert key != copilot_cache_key("other", "explain", CODE, 0.7)
+    assert key != copilot_cache_key("model", "review", CODE, 0.7)
+    assert key != copilot_cache_key("model", "explain", CODE, 0.2)
+
+
+def test_hits_and_misses_are_counted_once(tmp_path):
+    cache = CopilotCache(cache_dir=str(tmp_path))
+    key = copilot_cache_key("model", "explain", CODE, 0.7)
+    assert cache.get(key) is None
+    cache.set(key, {'output': "It greets.", 'token_usage': {'total_tokens': 3}})
+    assert cache.get(key)['output'] == "It greets."
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["hit_rate"]) == (1, 1, 1, 0.5)
+
+
+def test_precomputed_answers_leave_the_hit_rate_alone(tmp_path):
+    cache = CopilotCache(cache_dir=str(tmp_path))
+    key = copilot_cache_key("model", "explain", CODE, 0.7)
+    assert cache.get(key, count=False) is None
+    cache.set(key, {'output': "It greets.", 'token_usage': {}}, precomputed=True)
+    stats = cache.stats()
+    assert (stats["precomputed"], stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 0, 0, 0.0)
+
+
+def test_reformatted_code_is_explained_from_the_cache():
+    import content
+    first = content.explain_code("<h1>Copilot test</h1>\n<!-- title -->")
+    assert 'output' in first and not first.get('cached')
+    second = content.explain_code("<h1>Copilot test</h1>")
+    assert second['cached'] and second['output'] == first['output']
+
+
+def test_double_slash_outside_scripts_is_not_a_comment():
+    pairs = [
+        ('<script src=//cdn.example/a.js></script>', '<script src=//cdn.example/b.js></script>'),
+        ('<p>Read this // then that</p>', '<p>Read this // then the other</p>'),
+        ('<style>body { background: url(//cdn.example/a.png); }</style>',
+         '<style>body { background: url(//cdn.example/b.png); }</style>'),
+        ('<a href=//example.com/a>link</a>', '<a href=//example.com/b>link</a>'),
+        ('body { background: url(//cdn.example/a.png); }', 'body { background: url(//cdn.example/b.png); }'),
+    ]
+    for first, second in pairs:
+        assert code_fingerprint(first) != code_fingerprint(second), first
+
+
+def test_script_comments_are_still_dropped():
+    page = '<p>Hi</p>\n<script>\nlet a = 1; // one\n/* block */ let b = 2;\n</script>'
+    assert code_fingerprint(page) == code_fingerprint('<p>Hi</p><script>let a = 1; let b = 2;</script>')
+    assert code_fingerprint("let a = 1;// one\n// two\nlet b = a;") == code_fingerprint("let a = 1;\nlet b = a;")
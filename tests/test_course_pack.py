@@ -0,0 +1,41 @@
+import content
+from content import COURSE_PACK_TYPES, build_course_pack
+from tracing import get_tracer
+
+
+def test_every_content_type_is_returned():
+    items = dict(build_course_pack("python classes", "Beginner", ""))
+    assert sorted(items) == sorted(COURSE_PACK_TYPES + ["Tutorials"])
+    for pack_type in COURSE_PACK_TYPES:
+        assert items[pack_type]['output'], pack_type
+    assert 'error' not in items["Tutorials"]
+
+
+def test_failed_items_are_surfaced_next_to_the_others(monkeypatch):
+    generate_content = content.generate_content
+
+    def generate(prompt, *args, **kwargs):
+        if prompt.startswith("Provide an answer sheet"):
+            raise RuntimeError("quota exceeded")
+        return generate_content(prompt, *args, **kwargs)
+
+    def search(topic):
+        raise ConnectionError("YouTube is unreachable")
+
+    monkeypatch.setattr(content, "generate_content", generate)
+    monkeypatch.setattr(content, "search_youtube_videos", search)
+    items = dict(build_course_pack("python inheritance", "Beginner", ""))
+    assert items["Quiz Answer Sheet"] == {'error': "quota exceeded"}
+    assert items["Tutorials"] == {'error': "YouTube is unreachable"}
+    assert all('output' in items[pack_type] for pack_type in COURSE_PACK_TYPES if pack_type != "Quiz Answer Sheet")
+
+
+def test_streamed_chunks_and_spans_carry_their_content_type():
+    chunks = {}
+    items = dict(build_course_pack("python closures", "Advanced", "", refresh=True,
+                                   on_chunk=lambda pack_type, text: chunks.setdefault(pack_type, []).append(text)))
+    assert sorted(chunks) == sorted(COURSE_PACK_TYPES)
+    for pack_type in COURSE_PACK_TYPES:
+        assert "".join(chunks[pack_type]) == items[pack_type]['output']
+    templates = {row['template'] for row in get_tracer().snapshot() if row['stage'] == "generation"}
+    assert set(COURSE_PACK_TYPES) <= templates
@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+
+from dispatcher import Abandoned, BackendBusy, Dispatcher, is_transient
+from rate_limit import TokenBucket
+
+
+class ResourceExhausted(Exception):
+    pass
+
+
+def test_transient_errors_are_told_apart_from_the_rest():
+    assert is_transient(ResourceExhausted("quota"))
+    assert is_transient(RuntimeError("503 Service Unavailable"))
+    assert not is_transient(ValueError("400 invalid argument"))
+
+
+def test_bucket_allows_a_burst_then_refills_at_its_rate():
+    bucket = TokenBucket(rate=20, capacity=2)
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    waited = bucket.acquire()
+    assert 0.02 <= waited <= 0.2
+
+
+def test_transient_errors_are_retried_until_success():
+    dispatcher = Dispatcher("test", rate=0, attempts=3, base_delay=0.001)
+    failures = [ResourceExhausted("429"), ResourceExhausted("429")]
+
+    def call():
+        if failures:
+            raise failures.pop()
+        return "answer"
+
+    assert dispatcher.call(call) == "answer"
+    assert dispatcher.stats()["retries"] == 2
+
+
+def test_retries_give_up_as_backend_busy():
+    dispatcher = Dispatcher("test", rate=0, attempts=2, base_delay=0.001)
+    with pytest.raises(BackendBusy):
+        dispatcher.call(lambda: (_ for _ in ()).throw(ResourceExhausted("429")))
+    assert dispatcher.stats()["gave_up"] == 1
+
+
+def test_other_errors_are_not_retried():
+    dispatcher = Dispatcher("test", rate=0, attempts=3, base_delay=0.001)
+    with pytest.raises(ValueError):
+        dispatcher.call(lambda: (_ for _ in ()).throw(ValueError("bad prompt")))
+    assert dispatcher.stats()["calls"] == 1
+
+
+def test_identical_concurrent_requests_run_once():
+    dispatcher = Dispatcher("test", rate=0)
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return "answer"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(dispatcher.coalesce("key", slow))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert sorted(coalesced for _, coalesced in results) == [False, True, True, True]
+    assert {result for result, _ in results} == {"answer"}
+
+
+def test_a_waiter_takes_over_when_the_leader_abandons():
+    dispatcher = Dispatcher("test", rate=0)
+    started = threading.Event()
+
+    def abandon():
+        started.set()
+        time.sleep(0.1)
+        raise Abandoned()
+
+    leader = threading.Thread(target=lambda: pytest.raises(Abandoned, dispatcher.coalesce, "key", abandon))
+    leader.start()
+    started.wait()
+    assert dispatcher.coalesce("key", lambda: "answer") == ("answer", False)
+    leader.join()
@@ -0,0 +1,60 @@
+import pytest
+
+from history import GenerationHistory, fts_query
+
+
+def answer(output, **extra):
+    return dict({'output': output, 'generation_time': 1.5, 'token_usage': {'prompt_tokens': 90, 'completion_tokens': 400}},
+                **extra)
+
+
+@pytest.fixture
+def history(tmp_path):
+    return GenerationHistory(path=str(tmp_path / "history.sqlite3"))
+
+
+def test_fresh_answers_are_recorded_and_cached_ones_skipped(history):
+    entry_id = history.record("Lesson Plan", "Python loops", "Beginner", "prompt", answer("for loops repeat"))
+    assert history.record("Lesson Plan", "Python loops", "Beginner", "prompt", answer("x", cached=True)) is None
+    assert history.record("Lesson Plan", "Python loops", "Beginner", "prompt", answer("x", coalesced=True)) is None
+    assert history.record("Lesson Plan", "Python loops", "Beginner", "prompt", {'error': "quota"}) is None
+    entry = history.get(entry_id)
+    assert (entry['output'], entry['prompt_tokens'], entry['completion_tokens']) == ("for loops repeat", 90, 400)
+    assert history.stats()["entries"] == 1
+
+
+def test_lookup_matches_topics_ignoring_case_and_spacing(history):
+    history.record("Lesson Plan", "Python loops", "Beginner", "p", answer("a"))
+    history.record("Topic Summary", "python  LOOPS", "Advanced", "p", answer("b"))
+    history.record("Lesson Plan", "Recursion", "Beginner", "p", answer("c"))
+    assert [entry['learner_level'] for entry in history.lookup(topic="PYTHON loops")] == ["Advanced", "Beginner"]
+    assert [entry['topic'] for entry in history.lookup(template_type="Lesson Plan")] == ["Recursion", "Python loops"]
+
+
+def test_search_finds_words_and_prefixes_in_outputs(history):
+    history.record("Lesson Plan", "Python loops", "Beginner", "p", answer("Iterating over a list with enumerate"))
+    history.record("Lesson Plan", "Recursion", "Beginner", "p", answer("A function calling itself"))
+    assert [entry['topic'] for entry in history.search("enumer")] == ["Python loops"]
+    assert "**" in history.search("function")[0]['snippet']
+    assert history.search("function", template_type="Topic Summary") == []
+
+
+def test_search_input_cannot_break_the_query(history):
+    history.record("Lesson Plan", "Python loops", "Beginner", "p", answer("loops"))
+    assert fts_query('"unbalanced AND (') == '"unbalanced" "AND"*'
+    assert history.search('"unbalanced AND (') == []
+    assert len(history.search("  ")) == 1
+
+
+def test_oldest_entries_are_dropped_past_the_limit(tmp_path):
+    history = GenerationHistory(path=str(tmp_path / "history.sqlite3"), max_entries=2)
+    for topic in ("a", "b", "c"):
+        history.record("Lesson Plan", topic, "Beginner", "p", answer(topic))
+    assert [entry['topic'] for entry in history.lookup()] == ["c", "b"]
+    assert [entry['topic'] for entry in history.search("a")] == []
+
+
+def test_popular_topics_come_back_as_last_typed(history):
+    for topic in ("python loops", "Recursion", "Python Loops"):
+        history.record("Lesson Plan", topic, "Beginner", "p", answer("x"))
+    assert history.popular_topics(5) == [("Python Loops", 2), ("Recursion", 1)]
@@ -0,0 +1,133 @@
+import threading
+import time
+
+from jobs import CANCELLED, DONE, FAILED, QUEUED, RUNNING, JobQueue
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def blocking(started, release):
+    def work(job):
+        started.set()
+        while not release.wait(0.01):
+            job.check_cancelled()
+        return "released"
+    return work
+
+
+def test_job_reports_progress_and_finishes_with_its_result():
+    queue = JobQueue(lane_workers={"generate": 2})
+
+    def work(job, topic):
+        job.report(partial=f"{topic}...")
+        return f"{topic} done"
+
+    job = queue.submit("generate", work, "loops", topic="loops")
+    wait_until(lambda: job.finished)
+    assert (job.status, job.result, job.error) == (DONE, "loops done", None)
+    assert job.progress == {'partial': "loops..."} and job.meta == {'topic': "loops"}
+    assert queue.collect(job.id) is job and queue.get(job.id) is None
+
+
+def test_exception_fails_the_job():
+    queue = JobQueue(lane_workers={"generate": 1})
+
+    def work(job):
+        raise ValueError("quota exceeded")
+
+    job = queue.submit("generate", work)
+    wait_until(lambda: job.finished)
+    assert (job.status, job.result, job.error) == (FAILED, None, "quota exceeded")
+
+
+def test_running_job_stops_at_its_next_check():
+    queue = JobQueue(lane_workers={"generate": 1})
+    started, release = threading.Event(), threading.Event()
+    job = queue.submit("generate", blocking(started, release))
+    started.wait(5)
+    assert job.status == RUNNING
+    queue.cancel(job.id)
+    assert job.cancel_requested
+    wait_until(lambda: job.finished)
+    assert (job.status, job.result) == (CANCELLED, None)
+
+
+def test_queued_job_is_cancelled_without_running():
+    queue = JobQueue(lane_workers={"generate": 1})
+    started, release = threading.Event(), threading.Event()
+    first = queue.submit("generate", blocking(started, release))
+    started.wait(5)
+    ran = []
+    second = queue.submit("generate", lambda job: ran.append(job))
+    assert second.status == QUEUED and queue.stats()["queue_depth"] == 1
+    queue.cancel(second.id)
+    assert second.status == CANCELLED and queue.stats()["queue_depth"] == 0
+    release.set()
+    wait_until(lambda: first.finished)
+    assert first.status == DONE and ran == []
+
+
+def test_each_kind_of_job_has_its_own_pool():
+    queue = JobQueue(lane_workers={"generate": 1, "pdf": 1})
+    started, release = threading.Event(), threading.Event()
+    generation = queue.submit("generate", blocking(started, release))
+    started.wait(5)
+    waiting = queue.submit("generate", lambda job: "second")
+    pdf = queue.submit("pdf", lambda job: "pdf")
+    wait_until(lambda: pdf.finished)
+    assert pdf.status == DONE and waiting.status == QUEUED
+    lanes = {row['kind']: row for row in queue.stats()["lanes"]}
+    assert (lanes["generate"]["running"], lanes["generate"]["queue_depth"], lanes["pdf"]["running"]) == (1, 1, 0)
+    release.set()
+    wait_until(lambda: waiting.finished)
+    assert generation.status == DONE
+
+
+def test_unlisted_kind_gets_the_default_pool_size():
+    queue = JobQueue(lane_workers={"generate": 3}, default_workers=2)
+    job = queue.submit("tutorial", lambda job: None)
+    wait_until(lambda: job.finished)
+    stats = queue.stats()
+    assert {row['kind']: row['workers'] for row in stats["lanes"]} == {"tutorial": 2}
+    assert stats["workers"] == 5
+
+
+def test_uncollected_jobs_are_pruned_after_their_ttl():
+    queue = JobQueue(lane_workers={"generate": 1}, result_ttl=0.05)
+    finished = queue.submit("generate", lambda job: "old")
+    wait_until(lambda: finished.finished)
+    time.sleep(0.1)
+    queue.submit("generate", lambda job: "new")
+    assert queue.get(finished.id) is None
+
+
+def test_cancelled_job_waits_for_its_session_like_any_finished_job():
+    queue = JobQueue(lane_workers={"generate": 1}, result_ttl=60)
+    started, release = threading.Event(), threading.Event()
+    running = queue.submit("generate", blocking(started, release))
+    started.wait(5)
+    queued = queue.submit("generate", lambda job: None)
+    queue.cancel(queued.id)
+    queue.cancel(running.id)
+    wait_until(lambda: running.finished)
+    queue.submit("generate", lambda job: None)
+    assert queue.get(queued.id).status == CANCELLED
+    assert queue.collect(running.id).status == CANCELLED
+
+
+def test_counters_and_metrics():
+    queue = JobQueue(lane_workers={"generate": 2, "pdf": 1})
+    done = queue.submit("generate", lambda job: "ok")
+    failed = queue.submit("pdf", lambda job: 1 / 0)
+    wait_until(lambda: done.finished and failed.finished)
+    stats = queue.stats()
+    assert (stats["submitted"], stats["completed"], stats["failed"], stats["cancelled"]) == (2, 1, 1, 0)
+    assert (stats["queue_depth"], stats["running"], stats["uncollected"], stats["workers"]) == (0, 0, 2, 3)
+    text = queue.prometheus_text()
+    assert "codesnack_jobs_submitted_total 2" in text
+    assert 'codesnack_jobs_lane_workers{kind="pdf"} 1' in text
@@ -0,0 +1,52 @@
+import pdf_cache
+from pdf_cache import PdfArtifactCache, pdf_artifact_key
+
+
+def test_key_depends_on_text_and_layout():
+    assert pdf_artifact_key("Loops") == pdf_artifact_key("Loops")
+    assert pdf_artifact_key("Loops") != pdf_artifact_key("Loops!")
+    assert pdf_artifact_key("Loops") != pdf_artifact_key("Loops", font_size=14)
+
+
+def test_pdf_is_rendered_once_and_then_reused():
+    cache = PdfArtifactCache()
+    first = cache.get("Python loops")
+    assert first.startswith(b"%PDF")
+    assert cache.get("Python loops") is first
+    stats = cache.stats()
+    assert (stats["renders"], stats["hits"]) == (1, 1)
+
+
+def test_cache_stays_within_its_byte_budget():
+    cache = PdfArtifactCache()
+    size = len(cache.get("first"))
+    cache.max_bytes = size * 2 + size // 2
+    for text in ("second", "third", "fourth"):
+        cache.get(text)
+    stats = cache.stats()
+    assert stats["bytes"] <= cache.max_bytes
+    assert stats["evictions"] == 2
+    assert pdf_artifact_key("first") not in cache
+
+
+def test_offers_are_remembered_within_a_bound(monkeypatch):
+    monkeypatch.setattr(pdf_cache, "OFFER_MEMORY", 3)
+    cache = PdfArtifactCache()
+    for text in ("a", "b", "c", "d", "e"):
+        cache.offer(pdf_artifact_key(text))
+    cache.get("e")
+    assert len(cache._offers) == 3
+    # a and b were forgotten unrendered, c and d are still waiting, e was rendered
+    assert cache.stats()["renders_deferred"] == 4
+
+
+def test_prebuilt_source_is_asked_before_rendering():
+    class Source(dict):
+        pass
+
+    key = pdf_artifact_key("packed")
+    cache = PdfArtifactCache()
+    cache.add_source(Source({key: b"%PDF-prebuilt"}))
+    assert key in cache
+    assert cache.get("packed", key) == b"%PDF-prebuilt"
+    assert (cache.stats()["prebuilt"], cache.stats()["renders"]) == (1, 0)
@@ -0,0 +1,86 @@
+import re
+
+import pytest
+
+from pdf_render import (BOTTOM_MARGIN, FONT_SIZE, LEFT_MARGIN, PAGE_SIZE, RIGHT_MARGIN, TOP_MARGIN, font_files,
+                        get_font_chain, layout_lines, render_text_pdf, wrap_line)
+
+MAX_WIDTH = PAGE_SIZE[0] - LEFT_MARGIN - RIGHT_MARGIN
+LINES_PER_PAGE = int((PAGE_SIZE[1] - TOP_MARGIN - BOTTOM_MARGIN) // (FONT_SIZE * 1.2)) + 1
+needs_text_font = pytest.mark.skipif(font_files()[0] is None, reason="no Unicode text font installed")
+
+
+@pytest.fixture(scope="module")
+def chain():
+    return get_font_chain()
+
+
+def page_count(text):
+    return int(re.search(rb"/Count (\d+)", render_text_pdf(text).getvalue()).group(1))
+
+
+def test_short_line_is_kept_whole(chain):
+    assert wrap_line("Loops repeat code.", chain, MAX_WIDTH) == ["Loops repeat code."]
+
+
+def test_long_line_breaks_at_spaces_within_the_width(chain):
+    line = " ".join(f"word{i}" for i in range(200))
+    lines = wrap_line(line, chain, MAX_WIDTH)
+    assert len(lines) > 1 and " ".join(lines) == line
+    assert all(chain.width(part) <= MAX_WIDTH for part in lines)
+    # Each line is as full as it can be: the next word would not have fitted
+    first_word_of_next = lines[1].split(" ")[0]
+    assert chain.width(lines[0] + " " + first_word_of_next) > MAX_WIDTH
+
+
+def test_over_long_word_is_split_character_by_character(chain):
+    word = "https://example.com/" + "a" * 300
+    lines = wrap_line("see " + word, chain, MAX_WIDTH)
+    assert lines[0] == "see" and "".join(lines[1:]) == word
+    assert all(chain.width(part) <= MAX_WIDTH for part in lines)
+
+
+def test_tabs_become_spaces_the_line_can_break_at(chain):
+    lines = [line for line, _ in layout_lines("\tindented\n" + "\t".join(["column"] * 60), chain, MAX_WIDTH)]
+    assert lines[0] == "    indented"
+    assert len(lines) > 2 and all("\t" not in line for line in lines)
+    assert all(line.strip().split() == ["column"] * len(line.strip().split()) for line in lines[1:])
+
+
+def test_characters_no_font_draws_are_dropped(chain):
+    # Variation selectors and zero-width joiners only matter to colour-emoji shaping
+    assert chain.prepare("done ✔️‍!")[0] == "done ✔!" or chain.font_index("✔") is None
+    text, plain = chain.prepare("café \U0010fffd")
+    assert (text, plain) == ("café ", True)
+
+
+@needs_text_font
+def test_text_font_draws_what_helvetica_cannot(chain):
+    assert chain.font_index("a") == 0 and chain.font_index("Ω") == 1
+    text, plain = chain.prepare("Ω is omega")
+    assert (text, plain) == ("Ω is omega", False)
+    assert list(chain.runs(text)) == [(chain.fonts[1][0], "Ω"), ("Helvetica", " is omega")]
+
+
+def test_cjk_and_emoji_use_a_fallback_font_or_are_dropped(chain):
+    for ch in ("你", "\U0001f600"):
+        text, _ = chain.prepare(f"a{ch}b")
+        if chain.font_index(ch) is None:
+            assert text == "ab"
+        else:
+            assert text == f"a{ch}b" and chain.fonts[chain.font_index(ch)][0] != "Helvetica"
+            assert "".join(run for _, run in chain.runs(text)) == text
+
+
+def test_pages_break_after_a_full_page_of_lines(chain):
+    assert page_count("\n".join(["line"] * LINES_PER_PAGE)) == 1
+    assert page_count("\n".join(["line"] * (LINES_PER_PAGE + 1))) == 2
+    # Wrapped lines count towards the page too
+    paragraph = " ".join(["word"] * 2000)
+    lines = len(wrap_line(paragraph, chain, MAX_WIDTH))
+    assert lines > 2 * LINES_PER_PAGE
+    assert page_count(paragraph) == -(-lines // LINES_PER_PAGE)
+
+
+def test_empty_text_renders_a_pdf():
+    assert render_text_pdf("").getvalue().startswith(b"%PDF")
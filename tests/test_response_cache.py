@@ -0,0 +1,47 @@
+import response_cache
+from response_cache import ResponseCache, make_cache_key
+
+
+def test_cache_key_ignores_whitespace_only_differences():
+    assert make_cache_key("m", "Explain  loops\n", 0.7) == make_cache_key("m", "Explain loops", 0.7)
+    assert make_cache_key("m", "Explain loops", 0.7) != make_cache_key("m", "Explain loops", 0.2)
+
+
+def test_miss_then_memory_hit_then_disk_hit(tmp_path):
+    path = str(tmp_path / "responses.sqlite3")
+    cache = ResponseCache(path=path)
+    assert cache.get("a") is None
+    cache.set("a", {'output': "loops"})
+    assert cache.get("a") == {'output': "loops"}
+    # A new process has an empty memory tier and reads the row back from SQLite
+    assert ResponseCache(path=path).get("a") == {'output': "loops"}
+    stats = cache.stats()
+    assert (stats["misses"], stats["memory_hits"]) == (1, 1)
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "responses.sqlite3"), ttl=-1)
+    cache.set("a", {'output': "loops"})
+    assert cache.get("a") is None
+
+
+def test_memory_tier_keeps_most_recent_entries(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "responses.sqlite3"), max_memory_entries=2)
+    for key in "abc":
+        cache.set(key, key)
+    assert cache.stats()["memory_entries"] == 2
+    assert cache.get("a") == "a"    # still on disk
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_disk_eviction_keeps_entries_hit_in_memory(tmp_path, monkeypatch):
+    monkeypatch.setattr(response_cache, "TOUCH_BATCH", 1000)
+    cache = ResponseCache(path=str(tmp_path / "responses.sqlite3"), max_disk_entries=3)
+    for key in "abc":
+        cache.set(key, key)
+    assert cache.get("a") == "a"    # memory hit: "a" is now the most recently used
+    cache.set("d", "d")             # over the limit: the least recently used row goes
+    assert cache.stats()["evictions"] == 1
+    fresh = ResponseCache(path=cache.path)
+    assert fresh.get("a") == "a"
+    assert fresh.get("b") is None
@@ -0,0 +1,93 @@
+import time
+
+import pytest
+
+from router import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, ModelRouter, get_model_router
+
+
+class FakeBackend:
+    def __init__(self, name, latency=0.0, fail=False):
+        self.name = name
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        self.calls += 1
+        time.sleep(self.latency)
+        if self.fail:
+            raise RuntimeError(f"{self.name} is down")
+        return f"{self.name}: {prompt}"
+
+
+def test_failing_primary_fails_over_to_the_next_backend():
+    router = ModelRouter([FakeBackend("primary", fail=True), FakeBackend("secondary")], hedge=False)
+    response, route = router.generate("loops")
+    assert response == "secondary: loops"
+    assert (route['backend'], route['failover']) == ("secondary", True)
+    assert router.stats()["failovers"] == 1
+
+
+def test_error_from_every_backend_is_raised():
+    router = ModelRouter([FakeBackend("primary", fail=True), FakeBackend("secondary", fail=True)], hedge=False)
+    with pytest.raises(RuntimeError, match="secondary is down"):
+        router.generate("loops")
+    assert router.stats()["failed"] == 1
+
+
+def test_breaker_opens_after_repeated_failures_and_skips_the_backend():
+    primary, secondary = FakeBackend("primary", fail=True), FakeBackend("secondary")
+    router = ModelRouter([primary, secondary], hedge=False, breaker_failures=2, breaker_cooldown=60)
+    for _ in range(4):
+        router.generate("loops")
+    assert primary.calls == 2
+    assert router.stats()["backends"][0]["breaker"] == OPEN
+
+
+def test_breaker_lets_one_trial_through_after_its_cooldown():
+    breaker = CircuitBreaker(failures=1, cooldown=0.05)
+    breaker.record_failure()
+    assert (breaker.state, breaker.allow()) == (OPEN, False)
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_slow_primary_is_hedged_and_the_faster_answer_wins():
+    router = ModelRouter([FakeBackend("primary", latency=0.5), FakeBackend("secondary")], hedge_default=0.05, hedge_min=0.05)
+    response, route = router.generate("loops")
+    assert response == "secondary: loops"
+    assert route['hedged'] and route['hedged_after'] < 0.5
+    assert router.stats()["fallback_wins"] == 1
+
+
+def test_failover_backend_is_hedged_on_its_own_latency():
+    primary, secondary, third = FakeBackend("primary", latency=0.1), FakeBackend("secondary", latency=0.2), FakeBackend("third")
+    router = ModelRouter([primary, secondary, third], hedge_min_samples=3, hedge_default=1.0, hedge_min=0.0)
+    for _ in range(3):
+        router.generate("loops")
+    # The primary answers in ~0.1s, then fails after 0.05s: the secondary gets its own (default 1s) delay,
+    # not what was left of the primary's
+    primary.latency, primary.fail = 0.05, True
+    response, route = router.generate("loops")
+    assert response == "secondary: loops"
+    assert route['failover'] and not route['hedged']
+    assert third.calls == 0
+
+
+def test_streamed_and_whole_answers_are_hedged_on_their_own_latency():
+    router = ModelRouter([FakeBackend("primary", latency=0.01)], hedge_min_samples=3, hedge_min=0.0)
+    for _ in range(3):
+        router.generate("loops", stream=True)
+    state = router._states[0]
+    assert len(state.latency[True].samples) == 3 and not state.latency[False].samples
+    assert router.hedge_delay(state, stream=True) < router.hedge_default
+    assert router.hedge_delay(state) == router.hedge_default
+
+
+def test_one_router_per_model():
+    assert get_model_router("model-a") is get_model_router("model-a")
+    assert get_model_router("model-a") is not get_model_router("model-b")
+    assert 'model="model-b"' in get_model_router("model-b").prometheus_text()
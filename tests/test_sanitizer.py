@@ -0,0 +1,43 @@
+import pytest
+
+from content import OutputSanitizer, remove_all_asterisks, sanitize_output_html
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("**bold** and *italic*", "bold and italic"),
+    ("***both***", "both"),
+    ("*a **b** c*", "a b c"),
+    ("2 * 3 = 6", "2 * 3 = 6"),
+    ("*unclosed", "*unclosed"),
+    ("*a\nb*", "*a\nb*"),
+])
+def test_asterisk_pairs_are_removed_within_a_line(text, expected):
+    assert remove_all_asterisks(text) == expected
+
+
+def test_html_box_escapes_tags_and_keeps_line_breaks():
+    assert sanitize_output_html("<b>**x**</b>\nnext") == "&lt;b&gt;x&lt;/b&gt;<br>next"
+
+
+def feed_all(chunks):
+    sanitizer, html = OutputSanitizer(), ""
+    for chunk in chunks:
+        html = sanitizer.feed(chunk)
+    return html
+
+
+@pytest.mark.parametrize("chunks", [
+    ["**bo", "ld** text\n", "*it", "alic*"],
+    ["*", "*x*", "*\n"],
+    ["line <one>\n", "\n", "* bullet **strong", "**\n"],
+    ["a\r", "\n**x**\r\n"],
+])
+def test_streaming_matches_one_shot_across_chunk_boundaries(chunks):
+    assert feed_all(chunks) == sanitize_output_html("".join(chunks))
+
+
+def test_unfinished_line_is_shown_provisionally_and_fixed_at_its_newline():
+    sanitizer = OutputSanitizer()
+    assert sanitizer.feed("*bo") == "*bo"
+    assert sanitizer.feed("ld*") == "bold"
+    assert sanitizer.feed(" done\nnext *") == "bold done<br>next *"
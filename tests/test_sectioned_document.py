@@ -0,0 +1,70 @@
+import time
+
+import content
+from content import SECTIONED_TEMPLATES, build_sectioned_document
+
+HEADINGS = [heading for heading, _ in SECTIONED_TEMPLATES["Study Guide"]]
+
+
+# generate_content against the stub backend, with a section's answer held back (or replaced) by heading
+def patched_generation(monkeypatch, delays=None, replies=None):
+    generate_content = content.generate_content
+
+    def generate(prompt, *args, **kwargs):
+        for heading in HEADINGS:
+            if f"Write only the '{heading}' section" in prompt:
+                time.sleep((delays or {}).get(heading, 0))
+                reply = (replies or {}).get(heading)
+                if isinstance(reply, Exception):
+                    raise reply
+                if reply is not None:
+                    return reply
+        return generate_content(prompt, *args, **kwargs)
+
+    monkeypatch.setattr(content, "generate_content", generate)
+
+
+def test_sections_are_joined_in_template_order_whatever_order_they_finish_in(monkeypatch):
+    # The first section finishes last
+    patched_generation(monkeypatch, delays={HEADINGS[0]: 0.3, HEADINGS[1]: 0.15})
+    finished = []
+    result = build_sectioned_document("Study Guide", "python dictionaries", "Beginner", "", refresh=True,
+                                      on_section=lambda heading, section: finished.append(heading))
+    assert finished == HEADINGS[::-1]
+    positions = [result['output'].index(heading) for heading in HEADINGS]
+    assert positions == sorted(positions) and result['output'].startswith(HEADINGS[0])
+    assert [section['heading'] for section in result['sections']] == HEADINGS
+    # The sections ran at the same time: the document took about as long as its slowest section, not 0.45s
+    assert result['parallel']['wall_time'] < 0.4
+
+
+def test_every_section_streams_its_chunks_under_its_heading(monkeypatch):
+    chunks = {}
+    result = build_sectioned_document("Study Guide", "python sets", "Beginner", "", refresh=True,
+                                      on_chunk=lambda heading, text: chunks.setdefault(heading, []).append(text))
+    assert sorted(chunks) == sorted(HEADINGS)
+    for heading in HEADINGS:
+        assert f"{heading}\n{''.join(chunks[heading]).strip()}" in result['output']
+
+
+def test_one_failing_section_fails_the_document(monkeypatch):
+    patched_generation(monkeypatch, replies={HEADINGS[1]: {'error': "quota exceeded"}})
+    finished = []
+    result = build_sectioned_document("Study Guide", "python tuples", "Beginner", "", refresh=True,
+                                      on_section=lambda heading, section: finished.append((heading, 'error' in section)))
+    assert result == {'error': f"{HEADINGS[1]}: quota exceeded"}
+    assert sorted(finished) == sorted((heading, heading == HEADINGS[1]) for heading in HEADINGS)
+
+
+def test_section_that_raises_is_reported_by_its_heading(monkeypatch):
+    patched_generation(monkeypatch, replies={HEADINGS[2]: RuntimeError("connection reset")})
+    result = build_sectioned_document("Study Guide", "python strings", "Beginner", "", refresh=True)
+    assert result == {'error': f"{HEADINGS[2]}: connection reset"}
+
+
+def test_second_request_is_answered_from_the_cache():
+    first = build_sectioned_document("Study Guide", "python generators", "Intermediate", "")
+    second = build_sectioned_document("Study Guide", "python generators", "Intermediate", "")
+    assert not first['cached'] and second['cached']
+    assert second['output'] == first['output']
+    assert second['token_usage']['total_tokens'] == first['token_usage']['total_tokens']
@@ -0,0 +1,60 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from semantic_cache import SemanticCache, embed_topic, prompt_shape, topic_terms
+
+SHAPE = prompt_shape("gemini", "Summarize 'python loops' for Beginner students", "python loops", 0.7)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SemanticCache(path=str(tmp_path / "semantic.sqlite3"))
+
+
+@pytest.mark.parametrize("plural, singular", [("dictionaries", "dictionary"), ("queries", "query"),
+                                              ("classes", "class"), ("loops", "loop")])
+def test_plurals_fold_to_their_singular(plural, singular):
+    assert topic_terms(plural) == topic_terms(singular) == [singular]
+
+
+def test_short_words_and_symbols_are_kept():
+    assert topic_terms("The CSS of C++ and C#") == ["css", "c++", "c#"]
+
+
+def test_prompt_shape_ignores_only_the_topic():
+    other_topic = prompt_shape("gemini", "Summarize 'recursion' for Beginner students", "recursion", 0.7)
+    other_level = prompt_shape("gemini", "Summarize 'python loops' for Advanced students", "python loops", 0.7)
+    assert other_topic == SHAPE
+    assert other_level != SHAPE
+    assert prompt_shape("gemini", "Summarize loops", "recursion", 0.7) is None
+
+
+def test_rephrased_topic_hits_and_a_different_one_misses(cache):
+    cache.add(SHAPE, "Python dictionaries", "key-1")
+    assert cache.lookup(SHAPE, "dictionary in python")['key'] == "key-1"
+    assert cache.lookup(SHAPE, "JavaScript promises") is None
+    assert cache.lookup("another shape", "Python dictionaries") is None
+
+
+def test_least_recently_used_topics_are_evicted(tmp_path):
+    cache = SemanticCache(path=str(tmp_path / "semantic.sqlite3"), max_entries=2)
+    cache.add(SHAPE, "python loops", "loops")
+    cache.add(SHAPE, "recursion", "recursion")
+    assert cache.lookup(SHAPE, "python loops")['key'] == "loops"
+    cache.add(SHAPE, "linked lists", "lists")
+    assert cache.lookup(SHAPE, "recursion") is None
+    assert SemanticCache(path=cache.path, max_entries=2).stats()["entries"] == 2
+
+
+def test_vectors_of_an_older_embedding_are_rebuilt_on_load(cache):
+    cache.add(SHAPE, "Python dictionaries", "key-1")
+    with sqlite3.connect(cache.path) as db:
+        db.execute("UPDATE topics SET vector = ?", (embed_topic("something else").tobytes(),))
+        db.execute("PRAGMA user_version = 1")
+    reloaded = SemanticCache(path=cache.path)
+    assert reloaded.lookup(SHAPE, "python dictionary")['key'] == "key-1"
+    with sqlite3.connect(cache.path) as db:
+        stored = np.frombuffer(db.execute("SELECT vector FROM topics").fetchone()[0], dtype=np.float32)
+    assert np.allclose(stored, embed_topic("Python dictionaries"))
@@ -0,0 +1,83 @@
+import time
+
+import session_memory
+from session_memory import BlobRef, SessionMemory
+
+
+def output(text):
+    return {'kind': 'text', 'prompt': "loops", 'clean': text, 'html': [f"<p>{text}</p>"], 'token_usage': {'total': 3}}
+
+
+def test_long_texts_move_to_the_blob_store_and_come_back():
+    memory = SessionMemory(budget=10_000, min_bytes=100)
+    original = output("Loops repeat code. " * 20)
+    compact = memory.store("session", "sidebar_output", original)
+    assert isinstance(compact['clean'], BlobRef) and isinstance(compact['html'][0], BlobRef)
+    assert compact['prompt'] == "loops" and compact['token_usage'] == {'total': 3}
+    assert memory.load("session", "sidebar_output", compact) == original
+
+
+def test_short_texts_stay_in_session_state():
+    memory = SessionMemory(budget=10_000, min_bytes=100)
+    compact = memory.store("session", "sidebar_output", output("short"))
+    assert compact == output("short")
+    assert memory.stats()["blob_count"] == 0
+
+
+def test_identical_texts_are_stored_once():
+    memory = SessionMemory(budget=10_000, min_bytes=100)
+    lesson = output("Functions group code. " * 20)
+    for session_id in ("first", "second", "third"):
+        memory.store(session_id, "sidebar_output", lesson)
+    stats = memory.stats()
+    assert stats["blob_count"] == 2 and stats["shared"] == 4
+    assert stats["referenced_bytes"] == 3 * stats["raw_bytes"]
+    assert memory.blobs.stats()["references"] == 6
+
+
+def test_least_recently_shown_output_is_evicted_first():
+    memory = SessionMemory(budget=1_000, min_bytes=100)
+    compact = {slot: memory.store("session", slot, {'clean': slot * 400})
+               for slot in ("a", "b")}
+    assert memory.load("session", "a", compact["a"]) is not None
+    memory.store("session", "c", {'clean': "c" * 400})
+    assert memory.load("session", "b", compact["b"]) is None
+    assert memory.load("session", "a", compact["a"]) == {'clean': "a" * 400}
+    stats = memory.stats()
+    assert (stats["evictions"], stats["blob_count"]) == (1, 2)
+
+
+def test_output_larger_than_the_budget_is_kept():
+    memory = SessionMemory(budget=1_000, min_bytes=100)
+    memory.store("session", "a", {'clean': "a" * 400})
+    compact = memory.store("session", "big", {'clean': "b" * 5_000})
+    assert memory.load("session", "big", compact) == {'clean': "b" * 5_000}
+    assert memory.stats()["evictions"] == 1
+
+
+def test_blobs_are_freed_when_nothing_refers_to_them():
+    memory = SessionMemory(budget=1_000, min_bytes=100)
+    shared = {'clean': "s" * 400}
+    memory.store("first", "a", shared)
+    memory.store("second", "a", shared)
+    memory.forget("first", "a")
+    assert memory.stats()["blob_count"] == 1
+    memory.store("second", "a", {'clean': "t" * 400})      # overwrite
+    memory.store("second", "b", {'clean': "u" * 400})
+    memory.store("second", "c", {'clean': "v" * 400})      # evicts "a"
+    memory.forget("second", "b")
+    memory.forget("second", "c")
+    assert memory.stats()["blob_count"] == 0
+    assert memory.blobs.stats()["references"] == 0
+
+
+def test_idle_sessions_are_dropped(monkeypatch):
+    monkeypatch.setattr(session_memory, "SWEEP_INTERVAL_SECONDS", 0)
+    memory = SessionMemory(budget=10_000, idle_seconds=0.05, min_bytes=100)
+    compact = memory.store("idle", "a", {'clean': "i" * 400})
+    memory.store("active", "a", {'clean': "j" * 400})
+    time.sleep(0.1)
+    memory.touch("active")
+    stats = memory.stats()
+    assert (stats["idle_sessions_dropped"], stats["session_count"], stats["blob_count"]) == (1, 1, 1)
+    assert memory.load("idle", "a", compact) is None
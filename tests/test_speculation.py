@@ -0,0 +1,64 @@
+import threading
+import time
+from concurrent.futures import TimeoutError
+
+import pytest
+
+from speculation import run_speculative
+
+
+def slow(value, seconds):
+    def call():
+        time.sleep(seconds)
+        if isinstance(value, Exception):
+            raise value
+        return value
+    return call
+
+
+def test_yes_keeps_the_generation_started_alongside_the_check():
+    answer, response, report = run_speculative(slow("yes", 0.2), slow("lesson", 0.2))
+    assert (answer, response) == ("yes", "lesson")
+    assert not report['discarded_generation']
+    # Both calls ran at once: well under the 0.4s they would take one after the other
+    assert report['wall_time'] < 0.35 and report['sequential_time'] >= 0.4 and report['time_saved'] > 0
+
+
+def test_no_drops_the_generation_still_in_flight():
+    release = threading.Event()
+    generated = []
+
+    def generate():
+        release.wait(5)
+        generated.append("draft")
+        return "draft"
+
+    answer, response, report = run_speculative(lambda: "no", generate)
+    assert (answer, response, report['discarded_generation']) == ("no", None, True)
+    assert 'generation_time' not in report and generated == []
+    release.set()
+
+
+def test_generation_error_reaches_the_caller_on_yes():
+    with pytest.raises(RuntimeError, match="backend down"):
+        run_speculative(lambda: "yes", slow(RuntimeError("backend down"), 0))
+
+
+def test_generation_error_is_ignored_on_no():
+    answer, response, report = run_speculative(slow("no", 0.05), slow(RuntimeError("backend down"), 0))
+    assert (answer, response, report['discarded_generation']) == ("no", None, True)
+
+
+def test_classifier_error_reaches_the_caller():
+    with pytest.raises(ValueError, match="classifier failed"):
+        run_speculative(slow(ValueError("classifier failed"), 0), slow("lesson", 0.05))
+
+
+def test_slow_classifier_times_out():
+    with pytest.raises(TimeoutError):
+        run_speculative(slow("yes", 0.5), slow("lesson", 0), timeout=0.05)
+
+
+def test_slow_generation_times_out_after_a_yes():
+    with pytest.raises(TimeoutError):
+        run_speculative(lambda: "yes", slow("lesson", 0.5), timeout=0.05)
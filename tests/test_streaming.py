@@ -0,0 +1,60 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from content import consume_stream
+
+
+class FakeStream:
+    """Chunks with .text, a pause before each one, and usage_metadata once read to the end (like Gemini's)."""
+
+    def __init__(self, texts, delay=0.0, fail_after=None, usage=None):
+        self.texts = texts
+        self.delay = delay
+        self.fail_after = fail_after
+        self.usage = usage
+
+    def __iter__(self):
+        for index, text in enumerate(self.texts):
+            if index == self.fail_after:
+                raise ConnectionError("stream dropped")
+            time.sleep(self.delay)
+            yield SimpleNamespace(text=text)
+        if self.usage is not None:
+            self.usage_metadata = SimpleNamespace(prompt_token_count=10, candidates_token_count=self.usage)
+
+
+def test_chunks_reach_on_chunk_in_order_and_join_into_the_output():
+    received = []
+    output, streaming = consume_stream(FakeStream(["Loops ", "", "repeat ", "code."]), received.append, time.time())
+    assert output == "Loops repeat code."
+    assert received == ["Loops ", "repeat ", "code."]
+    assert streaming['total_time'] >= streaming['time_to_first_token'] >= 0
+
+
+def test_time_to_first_token_counts_from_the_request():
+    start = time.time() - 1.0
+    _, streaming = consume_stream(FakeStream(["a", "b"], delay=0.05), lambda text: None, start)
+    assert 1.0 <= streaming['time_to_first_token'] < 1.1
+    assert streaming['total_time'] >= 1.1
+
+
+def test_tokens_per_second_uses_the_reported_count():
+    _, streaming = consume_stream(FakeStream(["x" * 40] * 3, delay=0.05, usage=50), lambda text: None, time.time())
+    # 50 tokens over the ~0.1s between the first and the last chunk
+    assert 100 < streaming['tokens_per_sec'] < 1000
+
+
+def test_empty_stream():
+    received = []
+    output, streaming = consume_stream(FakeStream([]), received.append, time.time())
+    assert (output, received, streaming['tokens_per_sec']) == ("", [], None)
+    assert streaming['time_to_first_token'] == streaming['total_time']
+
+
+def test_error_mid_stream_reaches_the_caller_after_the_chunks_before_it():
+    received = []
+    with pytest.raises(ConnectionError, match="stream dropped"):
+        consume_stream(FakeStream(["one ", "two ", "three"], fail_after=2), received.append, time.time())
+    assert received == ["one ", "two "]
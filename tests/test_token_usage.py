@@ -0,0 +1,98 @@
+from types import SimpleNamespace
+
+import pytest
+
+from dispatcher import Dispatcher
+from token_usage import TokenBudgetExceeded, TokenLedger, enforce_prompt_budget, usage_from_response
+
+
+class CountingModel:
+    """count_tokens of one token per word; fails the first `failures` calls with a 503."""
+
+    def __init__(self, failures=0):
+        self.counted = []
+        self.failures = failures
+
+    def count_tokens(self, prompt):
+        self.counted.append(prompt)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("503 The service is unavailable")
+        return SimpleNamespace(total_tokens=len(prompt.split()))
+
+
+def dispatcher():
+    return Dispatcher("test", rate=0, base_delay=0)
+
+
+def test_every_prompt_is_counted_through_the_dispatcher_without_a_budget():
+    model, calls = CountingModel(failures=1), dispatcher()
+    assert enforce_prompt_budget(model, "explain python loops", max_tokens=0, dispatcher=calls) == \
+        ("explain python loops", 3, False)
+    stats = calls.stats()
+    assert (stats["calls"], stats["retries"]) == (2, 1)
+
+
+def test_failed_count_without_a_budget_falls_back_to_the_estimate():
+    model = CountingModel()
+    model.count_tokens = lambda prompt: 1 / 0
+    assert enforce_prompt_budget(model, "loops", max_tokens=0, dispatcher=dispatcher()) == ("loops", None, False)
+
+
+def test_count_can_be_turned_off():
+    model = CountingModel()
+    assert enforce_prompt_budget(model, "loops", max_tokens=0, preflight=False) == ("loops", None, False)
+    assert model.counted == []
+
+
+def test_prompt_far_below_the_budget_is_not_counted():
+    model = CountingModel()
+    assert enforce_prompt_budget(model, "word " * 10, max_tokens=1000, dispatcher=dispatcher())[1:] == (None, False)
+    assert model.counted == []
+
+
+def test_prompt_near_the_budget_is_counted_and_kept():
+    model = CountingModel()
+    prompt = "word " * 90
+    assert enforce_prompt_budget(model, prompt, max_tokens=100, dispatcher=dispatcher()) == (prompt, 90, False)
+
+
+def test_prompt_over_the_budget_is_rejected():
+    with pytest.raises(TokenBudgetExceeded, match="150 tokens, over the 100 token limit"):
+        enforce_prompt_budget(CountingModel(), "word " * 150, max_tokens=100, overflow="reject", dispatcher=dispatcher())
+
+
+def test_prompt_over_the_budget_is_truncated_and_recounted():
+    model, calls = CountingModel(), dispatcher()
+    prompt, count, truncated = enforce_prompt_budget(model, "word " * 150, max_tokens=100, overflow="truncate",
+                                                     dispatcher=calls)
+    assert truncated and count <= 100 and count == len(prompt.split())
+    assert "word " * 150 != prompt and ("word " * 150).startswith(prompt)
+    assert calls.stats()["calls"] == len(model.counted) == 2
+
+
+def test_token_dense_head_is_cut_again():
+    model = CountingModel()
+    prompt = "x " * 200 + "explanation " * 20
+    prompt, count, truncated = enforce_prompt_budget(model, prompt, max_tokens=100, overflow="truncate",
+                                                     dispatcher=dispatcher())
+    assert truncated and count <= 100 and len(model.counted) == 3
+
+
+def test_usage_comes_from_the_response_metadata():
+    usage = SimpleNamespace(prompt_token_count=12, candidates_token_count=30, total_token_count=42)
+    assert usage_from_response(SimpleNamespace(usage_metadata=usage)) == \
+        {'prompt_tokens': 12, 'completion_tokens': 30, 'total_tokens': 42}
+    assert usage_from_response(SimpleNamespace()) is None
+
+
+def test_ledger_keeps_daily_totals_and_enforces_the_daily_budget(tmp_path):
+    ledger = TokenLedger(str(tmp_path / "tokens.sqlite3"), daily_budget=100)
+    ledger.record(prompt_tokens=20, completion_tokens=40)
+    ledger.record(classifier_tokens=5, requests=0)
+    today = ledger.today()
+    assert (today['requests'], today['total_tokens'], today['classifier_tokens']) == (1, 65, 5)
+    ledger.check_daily_budget()
+    ledger.record(prompt_tokens=10, completion_tokens=25)
+    with pytest.raises(TokenBudgetExceeded):
+        ledger.check_daily_budget()
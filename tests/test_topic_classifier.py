@@ -0,0 +1,43 @@
+import pytest
+
+from topic_classifier import classify_locally, classify_topic, vocabulary_hits
+
+
+@pytest.mark.parametrize("topic", ["Python loops", "C++ pointers", "for-loops in JavaScript", "Swift programming",
+                                   "python flask", "SQL joins"])
+def test_programming_vocabulary_accepts_locally(topic):
+    result = classify_locally(topic)
+    assert (result['verdict'], result['source']) == ('yes', 'vocabulary')
+
+
+@pytest.mark.parametrize("topic", ["python snake habitats", "java island history", "cooking recipes website",
+                                   "ruby gemstones", "swift birds migration"])
+def test_lone_ambiguous_term_is_not_accepted_locally(topic):
+    assert classify_locally(topic)['verdict'] is None
+
+
+def test_lone_ambiguous_term_is_never_rejected_locally():
+    assert classify_locally("ruby")['verdict'] != 'no'
+
+
+@pytest.mark.parametrize("topic", ["French revolution", "Poetry analysis", "Climate change"])
+def test_clear_off_topic_subjects_are_rejected_locally(topic):
+    assert classify_locally(topic)['verdict'] == 'no'
+
+
+def test_vocabulary_keeps_symbols_and_hyphens():
+    assert {"c#", "node.js", "for-loops"} <= vocabulary_hits("C# and Node.js for-loops")
+
+
+def test_undecided_topics_ask_the_remote_check_once():
+    calls = []
+
+    def remote_check(text):
+        calls.append(text)
+        return 'no'
+
+    first = classify_topic("Python snake habitats in Borneo", remote_check)
+    second = classify_topic("python  snake habitats in borneo", remote_check)
+    assert (first['source'], first['verdict']) == ('gemini', 'no')
+    assert (second['source'], second['verdict']) == ('cache', 'no')
+    assert len(calls) == 1
@@ -0,0 +1,76 @@
+import json
+import time
+
+import pytest
+
+from tracing import ALL_TEMPLATES, RollingHistogram, Tracer, metrics_text, register_metrics, span, trace_labels
+
+
+def test_percentiles_are_nearest_rank_over_the_window():
+    histogram = RollingHistogram(window=100)
+    for seconds in range(100, 0, -1):
+        histogram.observe(float(seconds))
+    assert histogram.percentiles() == {0.5: 51.0, 0.95: 96.0, 0.99: 100.0}
+    assert RollingHistogram().percentiles() == {0.5: None, 0.95: None, 0.99: None}
+
+
+def test_window_keeps_the_latest_samples_and_totals_keep_everything():
+    histogram = RollingHistogram(window=10)
+    for seconds in range(1, 101):
+        histogram.observe(float(seconds), error=seconds % 10 == 0)
+    assert histogram.percentiles()[0.5] == 96.0
+    assert (histogram.count, histogram.total, histogram.errors) == (100, 5050.0, 10)
+
+
+def test_spans_are_kept_per_template_and_for_all_templates():
+    tracer = Tracer(window=50)
+    with trace_labels(template="Lesson Plan"):
+        tracer.record("generation", 2.0)
+    tracer.record("generation", 4.0, template="Study Guide", error=True)
+    rows = {(row['stage'], row['template']): row for row in tracer.snapshot()}
+    assert set(rows) == {("generation", ALL_TEMPLATES), ("generation", "Lesson Plan"), ("generation", "Study Guide")}
+    everything = rows[("generation", ALL_TEMPLATES)]
+    assert (everything['count'], everything['errors'], everything['mean'], everything['p99']) == (2, 1, 3.0, 4.0)
+    assert rows[("generation", "Lesson Plan")]['p50'] == 2.0
+
+
+def test_prometheus_text():
+    tracer = Tracer()
+    tracer.record("classifier", 0.25, template='Say "hi"')
+    tracer.record("classifier", 0.75, template='Say "hi"', error=True)
+    lines = tracer.prometheus_text().splitlines()
+    labels = 'stage="classifier",template="Say \\"hi\\""'
+    assert "# TYPE codesnack_stage_duration_seconds summary" in lines
+    assert f'codesnack_stage_duration_seconds{{{labels},quantile="0.5"}} 0.750000' in lines
+    assert f"codesnack_stage_duration_seconds_sum{{{labels}}} 1.000000" in lines
+    assert f"codesnack_stage_duration_seconds_count{{{labels}}} 2" in lines
+    assert f"codesnack_stage_errors_total{{{labels}}} 1" in lines
+    assert 'codesnack_stage_errors_total{stage="classifier",template="all"} 1' in lines
+
+
+def test_span_times_the_block_and_flags_errors():
+    with span("test_span_ok"):
+        time.sleep(0.02)
+    with pytest.raises(ValueError):
+        with span("test_span_error"):
+            raise ValueError("boom")
+    text = metrics_text()
+    assert 'codesnack_stage_errors_total{stage="test_span_error",template="all"} 1' in text
+    assert 'codesnack_stage_errors_total{stage="test_span_ok",template="all"} 0' in text
+
+
+def test_registered_sources_are_added_to_metrics():
+    source = lambda: "codesnack_test_gauge 1\n"
+    register_metrics(source)
+    register_metrics(source)
+    assert metrics_text().count("codesnack_test_gauge 1") == 1
+
+
+def test_spans_are_logged_as_json_lines(tmp_path):
+    log = tmp_path / "spans.jsonl"
+    tracer = Tracer(log_path=str(log))
+    with trace_labels(template="Topic Summary"):
+        tracer.record("pdf_build", 0.5, kind="pdf")
+    entry = json.loads(log.read_text())
+    assert {key: entry[key] for key in ("stage", "seconds", "error", "template", "kind")} == \
+        {"stage": "pdf_build", "seconds": 0.5, "error": False, "template": "Topic Summary", "kind": "pdf"}
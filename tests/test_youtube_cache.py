@@ -0,0 +1,73 @@
+import threading
+import time
+
+from youtube_cache import SEARCH_COST_UNITS, QuotaMeter, YouTubeSearchCache
+
+VIDEOS = [{'url': "https://www.youtube.com/watch?v=a", 'title': "Loops", 'thumbnail': ""}]
+
+
+def test_quota_is_never_overspent_by_concurrent_searches(tmp_path):
+    quota = QuotaMeter(str(tmp_path / "quota.sqlite3"), daily_limit=1000, reserve=200)
+    granted = []
+    threads = [threading.Thread(target=lambda: granted.append(quota.try_spend(100))) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert granted.count(True) == 8
+    assert quota.used_today() == 800
+
+
+def test_identical_concurrent_misses_share_one_call(tmp_path):
+    cache = YouTubeSearchCache(cache_dir=str(tmp_path))
+    calls = []
+
+    def fetch(query, max_results):
+        calls.append(query)
+        time.sleep(0.2)
+        return VIDEOS
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.search("Python loops", fetch))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert [result['videos'] for result in results] == [VIDEOS] * 4
+    stats = cache.stats()
+    assert (stats["coalesced"], stats["units_spent"]) == (3, SEARCH_COST_UNITS)
+
+
+def test_failed_search_serves_stale_result_with_its_reason(tmp_path):
+    cache = YouTubeSearchCache(cache_dir=str(tmp_path))
+    cache.results.ttl = -1      # everything cached is already past its TTL, but within the stale TTL
+    cache.search("python loops", lambda query, max_results: VIDEOS)
+
+    def failing(query, max_results):
+        raise RuntimeError("503 backend error")
+
+    result = cache.search("python loops", failing)
+    assert (result['source'], result['reason'], result['videos']) == ('stale', 'error', VIDEOS)
+
+
+def test_exhausted_quota_serves_stale_result_with_its_reason(tmp_path):
+    cache = YouTubeSearchCache(cache_dir=str(tmp_path))
+    cache.quota.daily_limit, cache.quota.reserve = SEARCH_COST_UNITS, 0
+    cache.results.ttl = -1
+    cache.search("python loops", lambda query, max_results: VIDEOS)
+    result = cache.search("python loops", lambda query, max_results: [])
+    assert (result['source'], result['reason']) == ('stale', 'quota')
+    assert cache.stats()["refused"] == 1
+
+
+def test_refused_search_without_a_saved_result_keeps_its_reason(tmp_path, monkeypatch):
+    import content
+    cache = YouTubeSearchCache(cache_dir=str(tmp_path))
+    cache.quota.daily_limit, cache.quota.reserve = 0, 0
+    monkeypatch.setattr(content, "get_youtube_search_cache", lambda: cache)
+    assert content.search_youtube_videos("python loops") == {'alternates': [], 'source': 'none', 'reason': 'quota'}
+    # A search that ran and found nothing is still just None
+    cache.quota.daily_limit = 10 * SEARCH_COST_UNITS
+    monkeypatch.setattr(content, "fetch_youtube_videos", lambda query, max_results: [])
+    assert content.search_youtube_videos("python sorting") is None
@@ -0,0 +1,147 @@
+import os
+import sqlite3
+import threading
+from datetime import date
+
+from dispatcher import get_gemini_dispatcher
+from response_cache import get_cache_dir
+
+# ✅ Token budgets (0 = no limit)
+MAX_PROMPT_TOKENS = int(os.getenv("CODESNACK_MAX_PROMPT_TOKENS", 0))        # per request, checked before sending
+PROMPT_OVERFLOW = os.getenv("CODESNACK_PROMPT_OVERFLOW", "reject").lower()  # "reject" or "truncate"
+MAX_OUTPUT_TOKENS = int(os.getenv("CODESNACK_MAX_OUTPUT_TOKENS", 0))        # passed to Gemini as max_output_tokens
+SESSION_TOKEN_BUDGET = int(os.getenv("CODESNACK_SESSION_TOKEN_BUDGET", 0))  # per browser session (enforced in App.py)
+DAILY_TOKEN_BUDGET = int(os.getenv("CODESNACK_DAILY_TOKEN_BUDGET", 0))      # whole app, per local calendar day
+
+PREFLIGHT_COUNT = os.getenv("CODESNACK_PREFLIGHT_COUNT", "true").lower() in ("1", "true", "yes", "on")  # exact count of every prompt
+
+# Gemini tokens average about 4 characters of English text
+CHARS_PER_TOKEN = 4
+# The exact pre-flight count is a round trip to the API; under a prompt budget it is skipped while the local
+# estimate stays below this fraction of the budget, where it cannot matter
+PREFLIGHT_FRACTION = float(os.getenv("CODESNACK_PREFLIGHT_FRACTION", 0.5))
+
+
+class TokenBudgetExceeded(Exception):
+    pass
+
+
+#Function | Rough local token count (no API call)
+def estimate_tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+#Function | Token counts from a Gemini response's usage_metadata (None when the response has none)
+def usage_from_response(response):
+    usage = getattr(response, 'usage_metadata', None)
+    prompt_tokens = getattr(usage, 'prompt_token_count', None)
+    completion_tokens = getattr(usage, 'candidates_token_count', None)
+    if not prompt_tokens and not completion_tokens:
+        return None
+    prompt_tokens = prompt_tokens or 0
+    completion_tokens = completion_tokens or 0
+    return {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': getattr(usage, 'total_token_count', None) or prompt_tokens + completion_tokens
+    }
+
+
+#Function | Exact token count of a prompt, through the Gemini dispatcher (rate limit and retries)
+def count_prompt_tokens(model, prompt, dispatcher=None):
+    dispatcher = dispatcher or get_gemini_dispatcher()
+    return dispatcher.call(lambda: model.count_tokens(prompt).total_tokens)
+
+
+#Function | Count the prompt's tokens before it is sent and, over MAX_PROMPT_TOKENS, reject or truncate it
+# Returns (prompt to send, pre-flight token count or None when only estimated, truncated flag)
+def enforce_prompt_budget(model, prompt, max_tokens=MAX_PROMPT_TOKENS, overflow=PROMPT_OVERFLOW,
+                          preflight=PREFLIGHT_COUNT, dispatcher=None):
+    if not max_tokens:
+        if not preflight:
+            return prompt, None, False
+        try:
+            return prompt, count_prompt_tokens(model, prompt, dispatcher), False
+        except Exception:
+            # Nothing depends on the count without a budget; the estimate stands in for it
+            return prompt, None, False
+    if estimate_tokens(prompt) < max_tokens * PREFLIGHT_FRACTION:
+        return prompt, None, False
+
+    count = count_prompt_tokens(model, prompt, dispatcher)
+    if count <= max_tokens:
+        return prompt, count, False
+    if overflow != "truncate":
+        raise TokenBudgetExceeded(f"The prompt is {count} tokens, over the {max_tokens} token limit.")
+
+    # Cut in proportion to the overshoot, then re-check once in case the tail was token-dense
+    prompt = prompt[:int(len(prompt) * max_tokens / count * 0.95)]
+    count = count_prompt_tokens(model, prompt, dispatcher)
+    if count > max_tokens:
+        prompt = prompt[:max_tokens * CHARS_PER_TOKEN // 2]
+        count = count_prompt_tokens(model, prompt, dispatcher)
+    return prompt, count, True
+
+
+class TokenLedger:
+    """Persistent per-day token totals, split into generation and classifier tokens."""
+
+    def __init__(self, path, daily_budget=DAILY_TOKEN_BUDGET):
+        self.daily_budget = daily_budget
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tokens ("
+            " day TEXT PRIMARY KEY, requests INTEGER NOT NULL DEFAULT 0,"
+            " prompt_tokens INTEGER NOT NULL DEFAULT 0, completion_tokens INTEGER NOT NULL DEFAULT 0,"
+            " classifier_tokens INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.commit()
+
+    def _today(self):
+        return date.today().isoformat()
+
+    def record(self, prompt_tokens=0, completion_tokens=0, classifier_tokens=0, requests=1):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO tokens (day, requests, prompt_tokens, completion_tokens, classifier_tokens) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT(day) DO UPDATE SET "
+                "requests = requests + excluded.requests, prompt_tokens = prompt_tokens + excluded.prompt_tokens, "
+                "completion_tokens = completion_tokens + excluded.completion_tokens, "
+                "classifier_tokens = classifier_tokens + excluded.classifier_tokens",
+                (self._today(), requests, prompt_tokens, completion_tokens, classifier_tokens),
+            )
+            self._db.commit()
+
+    def today(self):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT requests, prompt_tokens, completion_tokens, classifier_tokens FROM tokens WHERE day = ?",
+                (self._today(),),
+            ).fetchone()
+        requests, prompt_tokens, completion_tokens, classifier_tokens = row or (0, 0, 0, 0)
+        return {
+            'requests': requests,
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'classifier_tokens': classifier_tokens,
+            'total_tokens': prompt_tokens + completion_tokens + classifier_tokens,
+            'daily_budget': self.daily_budget
+        }
+
+    def check_daily_budget(self):
+        if self.daily_budget and self.today()['total_tokens'] >= self.daily_budget:
+            raise TokenBudgetExceeded(f"Today's token budget ({self.daily_budget} tokens) has been used up.")
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+#Function | Process-wide token ledger shared by every Streamlit session
+def get_token_ledger():
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = TokenLedger(os.path.join(get_cache_dir(), "tokens.sqlite3"))
+        return _ledger
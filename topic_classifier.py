@@ -0,0 +1,227 @@
+import os
+import re
+import threading
+import zlib
+
+import numpy as np
+
+from response_cache import ResponseCache, get_cache_dir, normalize_prompt
+
+# ✅ Local classifier settings
+YES_THRESHOLD = float(os.getenv("CODESNACK_CLASSIFIER_YES", 0.85))
+NO_THRESHOLD = float(os.getenv("CODESNACK_CLASSIFIER_NO", 0.1))
+VERDICT_TTL_SECONDS = int(os.getenv("CODESNACK_VERDICT_TTL", 30 * 24 * 3600))
+HASH_BUCKETS = 2 ** 14
+
+# Curated programming vocabulary: a single hit is enough to accept a topic without asking Gemini
+PROGRAMMING_TERMS = {
+    # languages and runtimes
+    "javascript", "typescript", "c++", "c#", "golang", "kotlin", "php", "haskell", "powershell", "sql", "html", "css", "sass", "json", "xml", "yaml",
+    "node.js", "nodejs", "deno", "jvm", "webassembly", "r programming", "swift programming",
+    "rust programming", "ruby on rails",
+    # language concepts
+    "loop", "loops", "for loop", "while loop", "for-loop", "for-loops", "recursion", "closures",
+    "oop", "object-oriented", "object oriented programming", "encapsulation", "string methods", "list comprehension",
+    "dictionaries", "tuple", "tuples", "enum", "async", "await", "asynchronous", "concurrency",
+    "multithreading", "coroutine", "iterator", "iterators", "decorators", "compiler",
+    "debugging", "debugger", "refactoring", "unit test", "unit testing", "tdd", "data types",
+    "conditionals", "if statement", "if statements", "exception handling",
+    # data structures and algorithms
+    "algorithm", "algorithms", "data structure", "data structures", "linked list", "linked lists",
+    "binary tree", "binary search", "hash table", "hash map", "hashmap", "graph algorithm",
+    "bubble sort", "merge sort", "quicksort", "big o", "big-o", "dynamic programming",
+    "breadth-first search", "depth-first search",
+    # web, tools and platforms
+    "api", "apis", "rest api", "graphql", "http", "frontend", "front-end", "backend", "back-end",
+    "full stack", "full-stack", "vue", "svelte", "django", "fastapi",
+    "spring boot", "express.js", "next.js", "tailwind", "jquery", "ajax", "git", "github", "gitlab",
+    "version control", "docker", "kubernetes", "ci/cd", "devops", "command line", "shell scripting",
+    "npm", "virtual environment", "database", "databases", "mysql", "postgresql", "sqlite", "mongodb",
+    "redis", "orm", "machine learning", "deep learning", "neural network", "numpy", "tensorflow",
+    "pytorch", "cybersecurity", "oauth", "jwt", "web development", "app development", "mobile app",
+    "android development", "ios development", "game development", "software engineering", "source code",
+    "vs code", "visual studio", "microservices", "cloud computing", "responsive design", "flexbox", "css grid",
+}
+
+# Programming terms that are everyday words too ("python snake habitats", "java island history", "cooking
+# recipes website"): they count towards a match, but one of them alone never accepts a topic
+AMBIGUOUS_TERMS = {
+    "python", "java", "ruby", "swift", "rust", "scala", "perl", "lua", "bash", "react", "angular", "flask",
+    "software", "programming", "coding", "developer", "website", "web page", "inheritance", "polymorphism",
+    "generics", "pointer", "pointers", "array", "arrays", "lambda", "interpreter",
+}
+
+# Seed corpus for the hashed n-gram model (kept small so training at import takes milliseconds)
+_POSITIVE_SEEDS = [
+    "python loops", "introduction to variables", "writing functions", "object oriented design",
+    "building a web page with html and css", "javascript events", "sorting algorithms", "recursion basics",
+    "debugging techniques", "version control with git", "rest apis", "sql joins", "linked lists",
+    "hash tables", "binary search trees", "react components", "flask web app", "unit testing",
+    "asynchronous programming", "exception handling", "regular expressions", "data structures",
+    "command line basics", "docker containers", "machine learning models", "mobile app development",
+    "game loop in unity", "responsive layouts", "css selectors", "dom manipulation",
+    "type systems", "memory management", "garbage collection", "compilers and interpreters",
+    "software testing", "code review practices", "design patterns", "clean code", "continuous integration",
+    "database normalization", "network sockets", "http requests", "json parsing", "file handling",
+    "string manipulation", "arrays and lists", "conditional statements", "boolean logic in code",
+    "event driven programming", "scripting automation", "web scraping", "cloud deployment",
+    "api authentication", "encryption algorithms", "operating system processes", "threads and locks",
+    "frontend frameworks", "backend servers", "full stack development", "pair programming",
+    "agile software development", "user interface programming",
+    "arduino programming", "robotics coding", "chatbot development", "data visualization with code",
+]
+_NEGATIVE_SEEDS = [
+    "french revolution", "photosynthesis", "world war two", "cooking pasta", "baking bread",
+    "football tactics", "basketball rules", "knitting patterns", "gardening tips", "poetry analysis",
+    "shakespeare plays", "ancient egypt", "roman empire", "climate change", "volcanoes",
+    "human anatomy", "the water cycle", "solar system planets", "fractions and decimals",
+    "long division", "algebraic equations", "geometry of triangles", "spelling practice",
+    "english grammar", "creative writing", "music theory", "playing guitar", "painting landscapes",
+    "african history", "south african history", "apartheid", "nelson mandela", "geography of africa",
+    "rivers and mountains", "animal habitats", "dinosaurs", "nutrition and diet", "yoga poses",
+    "meditation", "personal finance", "stock market investing", "job interview tips", "dating advice",
+    "fashion trends", "makeup tutorial", "car repair", "plumbing", "woodworking", "travel tips",
+    "wedding planning", "pet care", "dog training", "chemistry reactions", "periodic table",
+    "physics of motion", "electricity basics", "biology cells", "genetics", "economics supply and demand",
+    "philosophy of mind", "religious studies", "life orientation", "first aid", "swimming lessons",
+    "celebrity gossip", "movie reviews", "soccer world cup", "rugby", "cricket", "recipes for dinner",
+]
+
+_TOKEN_RE = re.compile(r"[a-z0-9+#./-]+")
+
+
+#Function | Split text into lower-case tokens (keeps c++, c#, node.js, ci/cd intact)
+def _tokens(text):
+    return [t.strip("./-") or t for t in _TOKEN_RE.findall(text.lower())]
+
+
+#Function | Look up curated vocabulary terms (single words and two/three word phrases)
+def vocabulary_hits(text):
+    words = _tokens(text)
+    hits = set()
+    for n in (1, 2, 3):
+        for i in range(len(words) - n + 1):
+            term = " ".join(words[i:i + n])
+            if term in PROGRAMMING_TERMS or term in AMBIGUOUS_TERMS:
+                hits.add(term)
+    # Hyphenated / dotted forms such as "for-loops" are matched on the raw text too
+    for raw in re.findall(r"[a-z0-9+#]+(?:[./-][a-z0-9+#]+)+", text.lower()):
+        if raw in PROGRAMMING_TERMS or raw in AMBIGUOUS_TERMS:
+            hits.add(raw)
+    return hits
+
+
+#Function | Hash word unigrams/bigrams and character 3-5 grams into a fixed-size, L2-normalised vector
+def _featurize(text):
+    vector = np.zeros(HASH_BUCKETS, dtype=np.float32)
+    words = _tokens(text)
+    features = list(words)
+    features += [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        for n in (3, 4, 5):
+            features += [padded[i:i + n] for i in range(len(padded) - n + 1)]
+    for feature in features:
+        vector[zlib.crc32(feature.encode("utf-8")) % HASH_BUCKETS] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class NGramScorer:
+    """Logistic regression over hashed n-grams, trained on the seed corpus."""
+
+    def __init__(self, positives=_POSITIVE_SEEDS, negatives=_NEGATIVE_SEEDS, epochs=300, learning_rate=10.0):
+        X = np.stack([_featurize(t) for t in list(positives) + list(negatives)])
+        y = np.concatenate([np.ones(len(positives)), np.zeros(len(negatives))]).astype(np.float32)
+        self.weights = np.zeros(HASH_BUCKETS, dtype=np.float32)
+        self.bias = 0.0
+        for _ in range(epochs):
+            p = 1.0 / (1.0 + np.exp(-(X @ self.weights + self.bias)))
+            gradient = p - y
+            self.weights -= learning_rate * (X.T @ gradient) / len(y)
+            self.bias -= learning_rate * float(gradient.mean())
+
+    def probability(self, text):
+        score = float(_featurize(text) @ self.weights + self.bias)
+        return float(1.0 / (1.0 + np.exp(-score)))
+
+
+#Function | Decide locally; verdict is 'yes', 'no' or None when the topic is ambiguous
+# (vocabulary accepts on one unambiguous term or any two terms; a lone ambiguous term is left to the n-gram model)
+def classify_locally(text):
+    hits = vocabulary_hits(text)
+    if hits - AMBIGUOUS_TERMS or len(hits) >= 2:
+        return {
+            'verdict': 'yes',
+            'confidence': round(min(0.99, 0.9 + 0.03 * len(hits)), 2),
+            'source': 'vocabulary',
+            'matches': sorted(hits)
+        }
+
+    probability = get_scorer().probability(text)
+    if probability >= YES_THRESHOLD:
+        verdict = 'yes'
+    elif probability <= NO_THRESHOLD and not hits:
+        # A topic naming a programming term is never turned away without asking Gemini
+        verdict = 'no'
+    else:
+        verdict = None
+    return {
+        'verdict': verdict,
+        'confidence': round(abs(probability - 0.5) * 2, 2),
+        'source': 'ngram',
+        'probability': round(probability, 3)
+    }
+
+
+#Function | Local verdict first, then the persistent verdict cache; None means Gemini has to decide
+def lookup_topic_verdict(text):
+    local = classify_locally(text)
+    if local['verdict'] is not None:
+        return local
+
+    cached = get_verdict_cache().get(normalize_prompt(text).lower())
+    if cached is not None:
+        return dict(cached, source='cache')
+    return None
+
+
+#Function | Store Gemini's yes/no answer for a topic and return it as a verdict
+def record_remote_verdict(text, answer):
+    result = {
+        'verdict': 'yes' if answer == 'yes' else 'no',
+        'confidence': 1.0,
+        'source': 'gemini',
+        'answer': answer
+    }
+    get_verdict_cache().set(normalize_prompt(text).lower(), {'verdict': result['verdict'], 'confidence': 1.0, 'answer': answer})
+    return result
+
+
+#Function | Full check: local rules, verdict cache, then the remote check
+def classify_topic(text, remote_check):
+    verdict = lookup_topic_verdict(text)
+    if verdict is not None:
+        return verdict
+    return record_remote_verdict(text, remote_check(text))
+
+
+_scorer = None
+_verdict_cache = None
+_lock = threading.Lock()
+
+
+def get_scorer():
+    global _scorer
+    with _lock:
+        if _scorer is None:
+            _scorer = NGramScorer()
+        return _scorer
+
+
+def get_verdict_cache():
+    global _verdict_cache
+    with _lock:
+        if _verdict_cache is None:
+            _verdict_cache = ResponseCache(path=os.path.join(get_cache_dir(), "verdicts.sqlite3"), ttl=VERDICT_TTL_SECONDS)
+        return _verdict_cache
@@ -0,0 +1,193 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ✅ Tracing settings
+TRACE_WINDOW = int(os.getenv("CODESNACK_TRACE_WINDOW", 1000))       # samples kept per histogram for the percentiles
+TRACE_LOG = os.getenv("CODESNACK_TRACE_LOG", "")                     # append every span to this JSONL file
+METRICS_PORT = int(os.getenv("CODESNACK_METRICS_PORT", 0))           # serve /metrics (Prometheus text) on this port
+
+QUANTILES = (0.5, 0.95, 0.99)
+ALL_TEMPLATES = "all"
+
+# Labels (currently just the template type) attached to every span recorded in this context.
+# Thread pools do not inherit them: submit through contextvars.copy_context().run to carry them over.
+_labels = contextvars.ContextVar("codesnack_trace_labels", default={})
+
+
+class RollingHistogram:
+    """Latency samples for one (stage, template): totals since start, percentiles over the last `window` calls."""
+
+    def __init__(self, window=TRACE_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+
+    def observe(self, seconds, error=False):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        self.errors += int(error)
+
+    # Nearest-rank percentiles over the rolling window
+    def percentiles(self, quantiles=QUANTILES):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {q: None for q in quantiles}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in quantiles}
+
+
+class Tracer:
+    """Process-wide span registry shared by every Streamlit session."""
+
+    def __init__(self, window=TRACE_WINDOW, log_path=TRACE_LOG):
+        self.window = window
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._histograms = {}   # (stage, template) -> RollingHistogram
+        self._log = None
+
+    def record(self, stage, seconds, error=False, **labels):
+        labels = {**_labels.get(), **labels}
+        template = labels.get("template") or ALL_TEMPLATES
+        keys = {(stage, ALL_TEMPLATES), (stage, template)}
+        with self._lock:
+            for key in keys:
+                if key not in self._histograms:
+                    self._histograms[key] = RollingHistogram(self.window)
+                self._histograms[key].observe(seconds, error)
+            if self.log_path:
+                self._write_log({"ts": round(time.time(), 3), "stage": stage, "seconds": round(seconds, 4),
+                                 "error": error, **labels})
+
+    def _write_log(self, entry):
+        if self._log is None:
+            self._log = open(self.log_path, "a", encoding="utf-8", buffering=1)
+        self._log.write(json.dumps(entry) + "\n")
+
+    # One row per (stage, template), with the rolling percentiles in seconds
+    def snapshot(self):
+        rows = []
+        with self._lock:
+            for (stage, template), histogram in sorted(self._histograms.items()):
+                percentiles = histogram.percentiles()
+                rows.append({
+                    "stage": stage,
+                    "template": template,
+                    "count": histogram.count,
+                    "errors": histogram.errors,
+                    "mean": round(histogram.total / histogram.count, 4) if histogram.count else None,
+                    **{f"p{int(q * 100)}": None if value is None else round(value, 4) for q, value in percentiles.items()},
+                })
+        return rows
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP codesnack_stage_duration_seconds Time spent in each request stage (quantiles over the rolling window).",
+            "# TYPE codesnack_stage_duration_seconds summary",
+        ]
+        errors = ["# HELP codesnack_stage_errors_total Calls to each stage that raised an error.",
+                  "# TYPE codesnack_stage_errors_total counter"]
+        with self._lock:
+            for (stage, template), histogram in sorted(self._histograms.items()):
+                labels = f'stage="{stage}",template="{_escape_label(template)}"'
+                for q, value in histogram.percentiles().items():
+                    if value is not None:
+                        lines.append(f'codesnack_stage_duration_seconds{{{labels},quantile="{q}"}} {value:.6f}')
+                lines.append(f"codesnack_stage_duration_seconds_sum{{{labels}}} {histogram.total:.6f}")
+                lines.append(f"codesnack_stage_duration_seconds_count{{{labels}}} {histogram.count}")
+                errors.append(f"codesnack_stage_errors_total{{{labels}}} {histogram.errors}")
+        return "\n".join(lines + errors) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_tracer = Tracer()
+_metric_sources = []    # extra callables returning Prometheus text, appended to /metrics
+
+
+#Function | Process-wide tracer
+def get_tracer():
+    return _tracer
+
+
+#Function | Record a finished stage that was timed by the caller
+def record_span(stage, seconds, error=False, **labels):
+    _tracer.record(stage, seconds, error=error, **labels)
+
+
+#Function | Time a block as one span of `stage`; start= lets a span begin before the block (e.g. a call already in flight)
+@contextmanager
+def span(stage, start=None, **labels):
+    start = time.perf_counter() if start is None else start
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        _tracer.record(stage, time.perf_counter() - start, error=error, **labels)
+
+
+#Function | Add another component's Prometheus text (a callable) to the /metrics output
+def register_metrics(source):
+    if source not in _metric_sources:
+        _metric_sources.append(source)
+
+
+#Function | Everything served on /metrics: the stage histograms plus every registered source
+def metrics_text():
+    return _tracer.prometheus_text() + "".join(source() for source in list(_metric_sources))
+
+
+#Function | Attach labels (e.g. template="Lesson Plan") to every span recorded inside the block
+@contextmanager
+def trace_labels(**labels):
+    token = _labels.set({**_labels.get(), **labels})
+    try:
+        yield
+    finally:
+        _labels.reset(token)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = metrics_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+
+
+#Function | Serve the Prometheus text format on http://<host>:<port>/metrics from a daemon thread (started once per process)
+def start_metrics_server(port=METRICS_PORT, host="0.0.0.0"):
+    global _metrics_server
+    with _metrics_server_lock:
+        if _metrics_server is None and port:
+            _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            threading.Thread(target=_metrics_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _metrics_server
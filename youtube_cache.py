@@ -0,0 +1,142 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from dispatcher import Dispatcher
+from response_cache import ResponseCache, get_cache_dir, normalize_prompt
+
+# ✅ YouTube Data API quota settings (search.list costs 100 units, the default project quota is 10,000/day)
+SEARCH_COST_UNITS = 100
+DAILY_QUOTA_UNITS = int(os.getenv("YOUTUBE_DAILY_QUOTA", 10000))
+QUOTA_RESERVE_UNITS = int(os.getenv("YOUTUBE_QUOTA_RESERVE", 1000))
+SEARCH_BATCH_SIZE = int(os.getenv("YOUTUBE_SEARCH_BATCH", 10))
+SEARCH_TTL_SECONDS = int(os.getenv("YOUTUBE_SEARCH_TTL", 3 * 24 * 3600))
+SEARCH_STALE_TTL_SECONDS = int(os.getenv("YOUTUBE_SEARCH_STALE_TTL", 30 * 24 * 3600))
+
+# The quota resets at midnight Pacific time
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+
+class QuotaMeter:
+    """Persistent count of YouTube quota units spent per (Pacific) day."""
+
+    def __init__(self, path, daily_limit=DAILY_QUOTA_UNITS, reserve=QUOTA_RESERVE_UNITS):
+        self.daily_limit = daily_limit
+        self.reserve = reserve
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS quota (day TEXT PRIMARY KEY, units INTEGER NOT NULL)")
+        self._db.commit()
+
+    def _today(self):
+        return datetime.now(QUOTA_TIMEZONE).date().isoformat()
+
+    def used_today(self):
+        with self._lock:
+            row = self._db.execute("SELECT units FROM quota WHERE day = ?", (self._today(),)).fetchone()
+        return row[0] if row else 0
+
+    # Books the units if they fit today's budget; keeps `reserve` units back so the app never runs the project
+    # fully dry. Check and booking happen under one lock, so concurrent searches cannot overspend together.
+    def try_spend(self, units):
+        with self._lock:
+            day = self._today()
+            row = self._db.execute("SELECT units FROM quota WHERE day = ?", (day,)).fetchone()
+            if (row[0] if row else 0) + units > self.daily_limit - self.reserve:
+                return False
+            self._db.execute(
+                "INSERT INTO quota (day, units) VALUES (?, ?) "
+                "ON CONFLICT(day) DO UPDATE SET units = units + excluded.units",
+                (day, units),
+            )
+            self._db.commit()
+            return True
+
+
+class YouTubeSearchCache:
+    """Caches a batch of search results per normalized query and meters the quota spent on misses."""
+
+    def __init__(self, cache_dir=None):
+        cache_dir = cache_dir or get_cache_dir()
+        self.results = ResponseCache(
+            path=os.path.join(cache_dir, "youtube.sqlite3"),
+            ttl=SEARCH_TTL_SECONDS,
+            stale_ttl=SEARCH_STALE_TTL_SECONDS,
+        )
+        self.quota = QuotaMeter(os.path.join(cache_dir, "youtube_quota.sqlite3"))
+        # Only its single-flight coalescing is used: identical misses overlapping in time share one API call
+        self._flights = Dispatcher("YouTube", rate=0)
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "coalesced": 0, "stale_served": 0, "refused": 0,
+                          "units_spent": 0, "units_saved": 0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    # fetch(query, max_results) performs the real API call and returns a list of video dicts
+    def search(self, query, fetch):
+        key = normalize_prompt(query).lower()
+        videos = self.results.get(key)
+        if videos is not None:
+            self._count("hits")
+            self._count("units_saved", SEARCH_COST_UNITS)
+            return {'videos': videos, 'source': 'cache'}
+
+        self._count("misses")
+        result, coalesced = self._flights.coalesce(key, lambda: self._fetch(key, query, fetch))
+        if coalesced:
+            self._count("coalesced")
+            self._count("units_saved", SEARCH_COST_UNITS)
+        return result
+
+    def _fetch(self, key, query, fetch):
+        # The units are booked before the call: YouTube charges for failed searches too
+        if not self.quota.try_spend(SEARCH_COST_UNITS):
+            # Near the daily limit: degrade to whatever we have, even if it is past its TTL
+            self._count("refused")
+            return self._stale_or_empty(key, 'quota')
+        self._count("units_spent", SEARCH_COST_UNITS)
+
+        try:
+            videos = fetch(query, SEARCH_BATCH_SIZE)
+        except Exception:
+            stale = self._stale_or_empty(key, 'error')
+            if stale['videos']:
+                return stale
+            raise
+
+        self.results.set(key, videos)
+        return {'videos': videos, 'source': 'youtube'}
+
+    def _stale_or_empty(self, key, reason):
+        videos = self.results.get(key, allow_stale=True)
+        if videos is not None:
+            self._count("stale_served")
+            self._count("units_saved", SEARCH_COST_UNITS)
+            return {'videos': videos, 'source': 'stale', 'reason': reason}
+        return {'videos': [], 'source': 'none', 'reason': reason}
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["quota_used_today"] = self.quota.used_today()
+        stats["quota_limit"] = self.quota.daily_limit
+        return stats
+
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+
+#Function | Process-wide YouTube search cache shared by every Streamlit session
+def get_youtube_search_cache():
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = YouTubeSearchCache()
+        return _search_cache